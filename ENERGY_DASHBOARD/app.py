@@ -2,53 +2,97 @@
 app.py
 Flask application factory.
 
-Startup sequence:
-  1. Load artefacts produced by train_models.py (pkl files).
-  2. Initialise price thresholds in utils.py module globals.
-  3. Build first-day LP schedule → STATE.
-  4. Register all API routes.
+Startup sequence (create_app returns at once; steps 1–4 and 6 run as
+timed phases in a background thread, see startup.py):
+  1. Load artefacts produced by train_models.py (models from the slim
+     registry, sim frame and prices memory-mapped from the columnar store).
+  2. Build one PriceBandModel per market: the trained thresholds
+     ("default") plus any tariffs in Config.PRICE_MARKETS.
+  3. Index the sim frame by date (SimFrameIndex).
+  4. Build first-day LP schedule → the initial STATE of every household,
+     kept in the state store (Config.STATE_STORE; shared across workers
+     unless "memory").  The app is ready from here on.
+  5. Create the per-date schedule cache (optionally warmed in background).
+  6. Create the on-demand forecaster (dates outside the sim frame).
+  7. Create the plug-event queue (coalesces bursts into one reschedule).
+  8. Register all API routes.
+
+Every route takes an optional household (?household= or JSON
+"household", default Config.DEFAULT_HOUSEHOLD) selecting whose STATE
+it reads or updates.
 
 Routes (exact parity with notebook cell 14):
   GET  /                      → dashboard.html
-  GET  /health                → health-check JSON
-  GET  /api/status            → current sim-row snapshot
+  GET  /health                → health-check JSON (503 until ready)
+  GET  /health/live           → liveness probe (process is up)
+  GET  /health/ready          → readiness probe + startup phase timings
+  GET  /metrics               → Prometheus text: route / stage / LP metrics
+  GET  /api/status            → current sim-row snapshot (?market=)
   GET  /api/plan              → appliance plan + hourly chart
   GET  /api/schedule          → full schedule + override history
-  POST /api/event             → smart-plug or manual override
+  GET  /api/stream            → SSE: state snapshot, then diffs on change
+  POST /api/event             → smart-plug or manual override (coalesced;
+                                "async": true returns a ticket at once)
+  GET  /api/event/<ticket>    → poll an event ticket
+  GET  /api/event/<ticket>/stream → SSE: ticket status until it resolves
   GET  /api/available_dates   → list of schedulable dates
-  POST /api/regenerate        → regenerate LP for a given date
-  POST /api/next              → advance simulation hour (demo)
+  GET  /api/forecast          → 24 h forecast for any date (?date=&days=)
+  POST /api/regenerate        → regenerate LP for a given date and market
+                                (forecast-backed outside the sim frame)
+  POST /api/next              → advance simulation slot (demo); slides and
+                                re-solves the rolling plan (rolling.py)
 """
 from __future__ import annotations
 
+import json
 import logging
 import os
+import re
+import time
 from datetime import datetime
 from pathlib import Path
 
 import joblib
 import numpy as np
 import pandas as pd
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
 
+from app.artefacts import ArtefactStore
 from app.config import Config
+from app.event_queue import EventQueue
+from app.forecast import Forecaster
+from app.metrics import HTTP_SECONDS, render as render_metrics, stage
+from app.model_registry import load_registry, registry_exists, registry_version
 from app.utils import (
-    get_price_band_from_price,
-    set_price_thresholds,
+    PriceBandModel,
+    dumps_json,
     make_serializable,
     get_recommendation,
     get_energy_state,
+    format_hhmm,
     parse_hhmm,
+    price_markets,
+    resample_sim_frame,
+    slot_label,
 )
+from app.payload_cache import PayloadCache
 from app.optimizer import (
     ApplianceSpec,
     generate_morning_schedule,
     handle_smart_plug_event,
 )
+from app.rolling import RollingPlan
+from app.schedule_cache import ScheduleCache
+from app.sim_index import SimFrameIndex
+from app.startup import Startup
+from app.state_store import StaleStateError, open_state_store
 
 logger = logging.getLogger(__name__)
 
+# ?household= / "household" values (also used as state-store keys)
+_HOUSEHOLD_RE = re.compile(r"[A-Za-z0-9_.:-]{1,64}")
+
 
 # ══════════════════════════════════════════════════════════════════
 # Logging
@@ -74,44 +118,102 @@ def _setup_logging() -> None:
 
 def _load_artefacts() -> tuple:
     """
-    Load the four pkl files produced by train_models.py.
+    Load the artefacts produced by train_models.py.
+    Models come from the slim registry (train/test frames stay on disk);
+    the sim frame and df_fac are memory-mapped from the columnar store.
+    The sim frame is resampled to Config.SLOT_MINUTES, priced from df_fac
+    where it has sub-hourly prices.
+    Deployments trained before either existed fall back to the legacy
+    joblib pickles.
     Raises FileNotFoundError with a clear message if training hasn't run.
     """
     logger.info("Loading model artefacts from %s …", Config.MODELS_DIR)
 
-    if not Config.SIM_FRAME_PATH.exists():
+    if ArtefactStore.exists():
+        store      = ArtefactStore()
+        sim        = store.table("sim_frame")
+        price_meta = store.price_meta()
+    elif Config.SIM_FRAME_PATH.exists():
+        logger.warning("No artefact store — loading legacy joblib sim frame")
+        sim        = joblib.load(Config.SIM_FRAME_PATH)
+        price_meta = joblib.load(Config.PRICE_META_PATH)
+    else:
         raise FileNotFoundError(
-            f"Simulation frame not found: {Config.SIM_FRAME_PATH}\n"
+            f"Simulation frame not found in {Config.ARTEFACT_STORE_DIR}\n"
             "Run `python -m app.train_models` first, or let entrypoint.sh do it."
         )
 
-    trained_models = joblib.load(Config.TRAINED_MODELS_PATH)
-    solar_model    = joblib.load(Config.SOLAR_MODEL_PATH)
-    sim            = joblib.load(Config.SIM_FRAME_PATH)
-    price_meta     = joblib.load(Config.PRICE_META_PATH)
+    if registry_exists():
+        trained_models, solar_model = load_registry()
+    else:
+        logger.warning("No model registry — loading legacy trained_models.pkl")
+        trained_models = joblib.load(Config.TRAINED_MODELS_PATH)
+        solar_model    = joblib.load(Config.SOLAR_MODEL_PATH)
 
-    # Restore module-level price thresholds
-    set_price_thresholds(price_meta["p33"], price_meta["p67"])
+    bands = PriceBandModel.from_meta(price_meta)
+    sim   = resample_sim_frame(sim, Config.SLOT_MINUTES, bands, price_meta.get("df_fac"))
 
     logger.info(
         "✅ Artefacts loaded — models=%d | sim=%d rows | p33=%.4f p67=%.4f",
-        len(trained_models), len(sim),
-        price_meta["p33"], price_meta["p67"],
+        len(trained_models), len(sim), bands.p33, bands.p67,
     )
-    return trained_models, solar_model, sim, price_meta
+    return trained_models, solar_model, sim, bands
+
+
+def _price_markets(default: PriceBandModel) -> dict:
+    """{market: PriceBandModel} — the trained thresholds plus Config.PRICE_MARKETS."""
+    markets = price_markets(default, Config.PRICE_MARKETS)
+    if len(markets) == 1:
+        return markets
+    for m in markets.values():
+        logger.info("Market %-10s p33=%.4f p67=%.4f", m.name, m.p33, m.p67)
+    return markets
+
+
+def _build_forecaster(trained_models: dict, solar_model) -> Forecaster | None:
+    """Forecaster over the store's history tables; None for legacy artefacts."""
+    if not (ArtefactStore.exists() and registry_exists()):
+        return None
+    try:
+        return Forecaster.from_store(
+            trained_models, solar_model, ArtefactStore(), registry_version(),
+        )
+    except ValueError as exc:
+        logger.warning("Forecasts disabled: %s", exc)
+        return None
 
 
 # ══════════════════════════════════════════════════════════════════
 # Initial STATE builder
 # ══════════════════════════════════════════════════════════════════
 
-def _build_initial_state(sim: pd.DataFrame, trained_models: dict) -> dict:
+def _appliance_schedule(sched: dict) -> dict:
+    """{appliance name: active hours and status} of a schedule's items."""
+    return {
+        item["name"]: {
+            "hours":        item["active_hours"],
+            "display":      ", ".join([format_hhmm(h) for h in item["active_hours"]]),
+            "total_energy": item["total_energy"],
+            "is_free":      item["is_free"],
+            "price_band":   item["price_band"],
+            "scenario":     item.get("scenario", ""),
+            "shifted":      item["shifted"],
+            "status":       item["status"],
+        }
+        for item in sched.get("schedule", [])
+    }
+
+
+def _build_initial_state(
+    index:          SimFrameIndex,
+    trained_models: dict,
+    bands:          PriceBandModel,
+) -> dict:
     """
     Generate the first-day LP schedule and populate STATE.
     Exact reproduction of notebook cell 13 initialisation block.
     """
-    first_date = pd.to_datetime(sim["timestamp"]).dt.date.iloc[0]
-    day_sim    = sim[pd.to_datetime(sim["timestamp"]).dt.date == first_date].copy()
+    day_sim = index.day(index.first_date)
 
     appliance_specs = []
     for key, name in [
@@ -132,29 +234,17 @@ def _build_initial_state(sim: pd.DataFrame, trained_models: dict) -> dict:
         ))
 
     morning_data = generate_morning_schedule(
-        sim_frame=sim,
+        sim_frame=index.frame,
+        bands=bands,
         start_hour=6,
         target_date=None,
         specs=appliance_specs,
         current_hour=0,
+        index=index,
     )
 
     # Enrich with appliance_schedule for /api/schedule compatibility
-    morning_data["appliance_schedule"] = {
-        item["name"]: {
-            "hours":        item["active_hours"],
-            "display":      ", ".join(
-                [f"{h:02d}:00" for h in item["active_hours"]]
-            ),
-            "total_energy": item["total_energy"],
-            "is_free":      item["is_free"],
-            "price_band":   item["price_band"],
-            "scenario":     item.get("scenario", ""),
-            "shifted":      item["shifted"],
-            "status":       item["status"],
-        }
-        for item in morning_data.get("schedule", [])
-    }
+    morning_data["appliance_schedule"] = _appliance_schedule(morning_data)
     morning_data["override_history"] = []
 
     return {
@@ -163,6 +253,7 @@ def _build_initial_state(sim: pd.DataFrame, trained_models: dict) -> dict:
         "override_history": [],
         "current_hour":     6,
         "sim_index":        0,
+        "market":           bands.name,
     }
 
 
@@ -182,9 +273,46 @@ def create_app() -> Flask:
 
     CORS(app, origins=Config.CORS_ORIGINS)
 
-    # ── Load artefacts once at startup ────────────────────────
-    trained_models, solar_model, sim, price_meta = _load_artefacts()
-    STATE = _build_initial_state(sim, trained_models)
+    # ── Staged startup ────────────────────────────────────────
+    # The phases below fill these in (in the background by default);
+    # requests other than the health probes get a 503 until ready.
+    startup        = Startup()
+    trained_models = solar_model = sim = bands = sim_index = initial = None
+    markets: dict  = {}
+    forecaster     = None
+    store          = open_state_store(Config.STATE_STORE)
+    schedule_cache = ScheduleCache(Config.SCHEDULE_CACHE_SIZE)
+    payloads       = PayloadCache(Config.PAYLOAD_CACHE_SIZE)
+
+    def _load_phase() -> None:
+        nonlocal trained_models, solar_model, sim, bands, markets
+        trained_models, solar_model, sim, bands = _load_artefacts()
+        markets = _price_markets(bands)
+
+    def _index_phase() -> None:
+        nonlocal sim_index, sim
+        sim_index = SimFrameIndex.build(sim)
+        sim       = sim_index.frame
+
+    def _schedule_phase() -> None:
+        nonlocal initial
+        initial = _build_initial_state(sim_index, trained_models, bands)
+        store.get_or_create(Config.DEFAULT_HOUSEHOLD, lambda: initial)
+
+    def _forecaster_phase() -> None:
+        nonlocal forecaster
+        forecaster = _build_forecaster(trained_models, solar_model)
+
+    phases = [
+        ("artefacts",      _load_phase),
+        ("sim_index",      _index_phase),
+        ("first_schedule", _schedule_phase),
+    ]
+    after = [("forecaster", _forecaster_phase)]
+    if Config.SCHEDULE_CACHE_WARMUP:
+        after.append(("cache_warmup", lambda: schedule_cache.warm(
+            sim, sim_index.date_list(), bands,
+        )))
 
     # ─────────────────────────────────────────────────────────
     # Helpers
@@ -197,64 +325,97 @@ def create_app() -> Flask:
         except Exception:
             return default
 
-    # ─────────────────────────────────────────────────────────
-    # Routes
-    # ─────────────────────────────────────────────────────────
-
-    @app.route("/")
-    def index():
-        return send_from_directory(str(Config.STATIC_DIR), "dashboard.html")
+    def _state(household: str) -> dict:
+        """A household's STATE (read-only — write through _update)."""
+        return store.get_or_create(household, lambda: initial).state
+
+    def _update(household: str, change):
+        """
+        Run change(STATE) under the store's optimistic lock and encode the
+        new version's GET payloads right away (reads far outnumber writes).
+        """
+        result, current = store.update(household, change, lambda: initial)
+        if current.state["current_schedule"]:
+            for route in _PAYLOADS:
+                _payload(household, current.version, current.state, route)
+        return result
+
+    def _plan_hour(STATE: dict) -> float:
+        """Current slot in the household schedule's hours (continuous in a rolling plan)."""
+        rolling = (STATE["morning_schedule"] or {}).get("rolling")
+        return rolling["now_hour"] if rolling else STATE["current_hour"]
+
+    def _forecast_index(date: str, days: int) -> SimFrameIndex:
+        """Forecast of `days` dates from `date`, at the schedule slot length."""
+        if forecaster is None:
+            raise ValueError("Forecasts unavailable")
+        return SimFrameIndex.build(resample_sim_frame(
+            forecaster.forecast(date, days=days), Config.SLOT_MINUTES, bands,
+        ))
 
-    # ── Health check ──────────────────────────────────────────
-    @app.route("/health")
-    def health():
-        return jsonify({
-            "status":      "ok",
-            "timestamp":   datetime.now().isoformat(),
-            "sim_rows":    len(sim),
-            "models":      list(trained_models.keys()),
-            "current_hour": STATE["current_hour"],
-        })
+    def _schedule_index(sched: dict) -> SimFrameIndex:
+        """
+        Index a schedule is planned on: the sim frame, or — for a date
+        outside it — the forecast from that date, long enough for the
+        next slide of its rolling window.  Raises ValueError without one.
+        """
+        if "forecast_from" not in sched:
+            return sim_index
+        spd     = sim_index.slots_per_day
+        rolling = sched.get("rolling")
+        if rolling:
+            last = rolling["now"] + 1 + rolling["horizon"]
+        else:
+            last = 2 * spd + round(Config.ROLLING_HORIZON_HOURS / sim_index.slot_hours)
+        return _forecast_index(sched["forecast_from"], last // spd + 1)
 
-    # ── Current simulation status ─────────────────────────────
-    @app.route("/api/status")
-    def status():
-        idx = min(STATE["sim_index"], len(sim) - 1)
-        row = sim.iloc[idx]
-        ts  = pd.to_datetime(row["timestamp"])
+    def _market(name: str | None, STATE: dict) -> PriceBandModel | None:
+        """PriceBandModel of a market (the household's if name is empty)."""
+        return markets.get(name or STATE["market"])
 
-        return jsonify({
+    def _schedule_body(STATE: dict, sched: dict) -> dict:
+        with stage("serialize"):
+            out = make_serializable(sched)
+        out["override_history"] = list(STATE["override_history"])
+        out["current_hour"]     = STATE["current_hour"]
+        return out
+
+    def _status_body(STATE: dict, market: PriceBandModel) -> dict:
+        idx   = min(STATE["sim_index"], len(sim) - 1)
+        row   = sim.iloc[idx]
+        ts    = sim_index.timestamp(idx)
+        price = float(row["price_eur_kwh"])
+        band  = market.band(price)
+        state = (str(row["energy_state"])
+                 if pd.notna(row.get("energy_state")) else "BALANCED")
+        scenario, recommendation = get_recommendation(state, band)
+
+        return {
+            "market":            market.name,
             "current_hour":      STATE["current_hour"],
             "date_str":          ts.strftime("%A %d %B %Y"),
             "time_str":          ts.strftime("%H:%M"),
             "solar_now":         _safe_float(row["predicted_solar_kwh"]),
             "consumption_now":   _safe_float(row["predicted_consumption_kwh"]),
             "price_now":         _safe_float(row["price_eur_kwh"]),
-            "price_band":        str(row["price_band"])
-                                 if pd.notna(row.get("price_band")) else "LOW",
-            "energy_state":      str(row["energy_state"])
-                                 if pd.notna(row.get("energy_state")) else "BALANCED",
-            "scenario":          str(row.get("scenario", "BALANCED_VALLE")),
-            "recommendation":    str(row.get("recommendation",
-                                            "✅ NORMAL: No action needed")),
-            "is_golden":         bool(row.get("is_golden_window", False)),
-            "is_danger":         bool(row.get("is_danger_window", False)),
-            "opportunity_score": _safe_float(row.get("opportunity_score", 0)),
-        })
-
-    # ── Appliance plan + hourly chart data ────────────────────
-    @app.route("/api/plan")
-    def plan():
-        sched = STATE["current_schedule"]
-        if not sched:
-            return jsonify({"error": "No schedule yet"}), 404
+            "price_band":        band,
+            "energy_state":      state,
+            "scenario":          scenario,
+            "recommendation":    recommendation,
+            "is_golden":         state == "SURPLUS" and band == "HIGH",
+            "is_danger":         state == "DEFICIT" and band == "HIGH",
+            "opportunity_score": _safe_float(
+                row["predicted_solar_kwh"] * market.weight(price)
+            ),
+        }
 
+    def _plan_body(sched: dict) -> dict:
         appl_sched: dict = {}
         for item in sched.get("schedule", []):
             appl_sched[item["name"]] = {
                 "hours":        item.get("active_hours", [item["scheduled_hour"]]),
                 "display":      ", ".join([
-                    f"{h:02d}:00"
+                    format_hhmm(h)
                     for h in item.get("active_hours", [item["scheduled_hour"]])
                 ]),
                 "total_energy": item["total_energy"],
@@ -265,7 +426,8 @@ def create_app() -> Flask:
                 "status":       item["status"],
             }
 
-        chart = sched.get("chart_data", [])
+        chart  = sched.get("chart_data", [])
+        slot_h = sched.get("slot_minutes", 60) / 60
         hourly_plan = [
             {
                 "hour":        c["hour"],
@@ -274,14 +436,14 @@ def create_app() -> Flask:
                 "price_band":  c["price_band"],
                 "consumption": c["consumption"],
                 "scenario":    get_recommendation(
-                    get_energy_state(c["solar"] - c["consumption"]),
+                    get_energy_state((c["solar"] - c["consumption"]) / slot_h),
                     c["price_band"],
                 )[0],
             }
             for c in chart
         ]
 
-        return jsonify({
+        return {
             "date":               sched.get("day_display", ""),
             "generated_at":       sched.get("generated_at", ""),
             "baseline_cost":      sched.get("baseline_cost", 0),
@@ -289,21 +451,336 @@ def create_app() -> Flask:
             "daily_saving":       sched.get("daily_saving", 0),
             "appliance_schedule": appl_sched,
             "hourly_plan":        hourly_plan,
-            "schedule_items":     make_serializable(sched.get("schedule", [])),
+            "schedule_items":     sched.get("schedule", []),
+        }
+
+    # Bodies served from the payload cache, by route
+    _PAYLOADS = {
+        "plan":     lambda STATE: _plan_body(STATE["current_schedule"]),
+        "schedule": lambda STATE: {
+            **STATE["current_schedule"],
+            "override_history": STATE["override_history"],
+            "current_hour":     STATE["current_hour"],
+        },
+    }
+
+    def _payload(household: str, version: int, STATE: dict, route: str) -> bytes:
+        def build() -> bytes:
+            body = _PAYLOADS[route](STATE)
+            with stage("serialize"):
+                return dumps_json(body)
+
+        return payloads.get_or_build(household, version, route, build)
+
+    def _conditional(tag: str, build):
+        """
+        ETag / If-None-Match: 304 when the client already holds `tag`,
+        otherwise build() (a view return value) tagged with it.
+        """
+        if request.if_none_match.contains(tag):
+            resp = Response(status=304)
+        else:
+            resp = app.make_response(build())
+        if resp.status_code in (200, 304):
+            resp.set_etag(tag)
+        return resp
+
+    def _state_tag(household: str, version: int, *parts) -> str:
+        return "-".join(map(str, (store.epoch, household, version, *parts)))
+
+    def _versioned_get(name: str, build, *parts):
+        """
+        GET tagged with the household's state version: a client holding the
+        current version gets its 304 before the state is even loaded, and a
+        payload route already cached for that version is served as is;
+        otherwise build(STATE, version) makes the response.
+        """
+        household = g.household
+        version   = store.version(household)
+        state     = None
+        if not request.if_none_match.contains(_state_tag(household, version, name, *parts)):
+            cached = payloads.peek(household, version, name) if name in _PAYLOADS else None
+            if cached is not None:
+                return _conditional(
+                    _state_tag(household, version, name, *parts),
+                    lambda: Response(cached, mimetype="application/json"),
+                )
+            current        = store.get_or_create(household, lambda: initial)
+            version, state = current.version, current.state
+        return _conditional(
+            _state_tag(household, version, name, *parts), lambda: build(state, version),
+        )
+
+    def _stream_doc(STATE: dict) -> dict:
+        """What /api/stream keeps clients in sync with."""
+        sched = STATE["current_schedule"] or {}
+        return {
+            "status":   _status_body(STATE, _market(None, STATE)),
+            "plan":     _plan_body(sched) if sched else {},
+            "schedule": _schedule_body(STATE, sched) if sched else {},
+        }
+
+    def _diff(old: dict, new: dict) -> dict:
+        """{"section.key": value} for every top-level key of a section that changed."""
+        changed, removed = {}, []
+        for section, body in new.items():
+            before = old.get(section, {})
+            for key, value in body.items():
+                if before.get(key) != value:
+                    changed[f"{section}.{key}"] = value
+            removed += [f"{section}.{key}" for key in before if key not in body]
+        return {"changed": changed, "removed": removed}
+
+    def _apply_events(household: str, batch: list) -> dict:
+        """
+        EventQueue callback: one handle_smart_plug_event per merged event,
+        each chained onto the previous one's LP so later overrides see the
+        earlier locks.  Returns the body every ticket of the batch gets.
+        """
+        def change(STATE: dict) -> dict:
+            for ev in batch:
+                logger.info(
+                    "⚡ EVENT: %s — %s at %02d:00",
+                    ev["event_type"], ev["appliance_key"], ev["hour"],
+                )
+                result = handle_smart_plug_event(
+                    appliance_key  = ev["appliance_key"],
+                    detected_hour  = ev["hour"],
+                    current_hour   = _plan_hour(STATE),
+                    morning_data   = STATE["morning_schedule"],
+                    sim_frame      = sim,
+                    trained_models = trained_models,
+                    bands          = _market(None, STATE),
+                    event_type     = ev["event_type"],
+                    detected_time  = ev["detected_time"],
+                )
+                if result.get("lp_results_raw"):
+                    STATE["morning_schedule"]["lp_results_raw"] = result["lp_results_raw"]
+                if result.get("lp_model") is not None:
+                    STATE["morning_schedule"]["lp_model"] = result["lp_model"]
+
+                STATE["current_schedule"] = result
+                STATE["override_history"].append({
+                    "time":       ev["received"],
+                    "appliance":  ev["appliance_key"],
+                    "hour":       ev["hour"],
+                    "minute":     ev["minute"],
+                    "event_type": ev["event_type"],
+                    "trigger":    result.get("trigger", ""),
+                })
+            return _schedule_body(STATE, result)
+
+        return _update(household, change)
+
+    def _ticket_body(ticket) -> dict:
+        if ticket.status == "duplicate":
+            STATE = _state(ticket.household)
+            out   = _schedule_body(STATE, STATE["current_schedule"])
+            out["duplicate"] = True
+        elif ticket.status == "error":
+            out = {"error": ticket.error}
+        else:
+            out = dict(ticket.result)
+        out["ticket"] = ticket.id
+        out["merged"] = ticket.merged
+        return out
+
+    def _ticket_response(ticket):
+        return jsonify(_ticket_body(ticket)), 500 if ticket.status == "error" else 200
+
+    events = EventQueue(_apply_events)
+
+    # ─────────────────────────────────────────────────────────
+    # Routes
+    # ─────────────────────────────────────────────────────────
+
+    @app.before_request
+    def _start_timer():
+        g.t0 = time.perf_counter()
+
+    @app.after_request
+    def _record_timing(resp):
+        # streamed responses are timed to their first byte
+        if "t0" in g:
+            HTTP_SECONDS.observe(
+                time.perf_counter() - g.t0,
+                route=request.url_rule.rule if request.url_rule else "unmatched",
+                method=request.method, status=resp.status_code,
+            )
+        return resp
+
+    @app.before_request
+    def _readiness_gate():
+        if startup.ready or request.endpoint in ("index", "static", "health", "live", "ready", "metrics"):
+            return None
+        resp = jsonify({
+            "error":   "Startup failed" if startup.failed else "Starting up — retry shortly",
+            "startup": startup.snapshot(),
+        })
+        resp.status_code = 503
+        resp.headers["Retry-After"] = "5"
+        return resp
+
+    @app.before_request
+    def _resolve_household():
+        household = (
+            request.args.get("household")
+            or (request.get_json(silent=True) or {}).get("household")
+            or Config.DEFAULT_HOUSEHOLD
+        )
+        if not isinstance(household, str) or not _HOUSEHOLD_RE.fullmatch(household):
+            return jsonify({"error": f"Invalid household: {household!r}"}), 400
+        g.household = household
+
+    @app.errorhandler(StaleStateError)
+    def _stale_state(exc):
+        return jsonify({"error": str(exc)}), 409
+
+    @app.route("/")
+    def index():
+        return send_from_directory(str(Config.STATIC_DIR), "dashboard.html")
+
+    # ── Health check ──────────────────────────────────────────
+    @app.route("/health")
+    def health():
+        if not startup.ready:
+            return jsonify({
+                "status":  "failed" if startup.failed else "starting",
+                "startup": startup.snapshot(),
+            }), 503
+        STATE = _state(g.household)
+        return jsonify({
+            "status":      "ok",
+            "startup":     startup.snapshot(),
+            "timestamp":   datetime.now().isoformat(),
+            "sim_rows":    len(sim),
+            "models":      list(trained_models.keys()),
+            "current_hour": STATE["current_hour"],
+            "market":       STATE["market"],
+            "markets":      {name: m.meta() for name, m in markets.items()},
+            "payload_cache": {
+                "size":   len(payloads),
+                "hits":   payloads.hits,
+                "misses": payloads.misses,
+            },
+            "state_store": {
+                "backend":    store.backend,
+                "households": len(store.households()),
+            },
+            "schedule_cache": {
+                "size":   len(schedule_cache),
+                "hits":   schedule_cache.hits,
+                "misses": schedule_cache.misses,
+            },
+            "events": {
+                "pending":    events.pending(),
+                "batches":    events.batches,
+                "coalesced":  events.coalesced,
+                "duplicates": events.duplicates,
+            },
+            "forecast": None if forecaster is None else {
+                "history_end": forecaster.history_end.isoformat(),
+                "cached":      len(forecaster),
+                "hits":        forecaster.hits,
+                "misses":      forecaster.misses,
+            },
         })
 
+    # ── Orchestrator probes ───────────────────────────────────
+    @app.route("/health/live")
+    def live():
+        return jsonify({"status": "alive", "uptime": startup.snapshot()["uptime"]})
+
+    @app.route("/health/ready")
+    def ready():
+        snap = startup.snapshot()
+        if startup.ready:
+            return jsonify({"status": "ready", **snap})
+        return jsonify({"status": "failed" if startup.failed else "starting", **snap}), 503
+
+    # ── Prometheus scrape ─────────────────────────────────────
+    @app.route("/metrics")
+    def metrics():
+        if not Config.METRICS_ENABLED:
+            return jsonify({"error": "Metrics disabled"}), 404
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+    # ── Current simulation status ─────────────────────────────
+    @app.route("/api/status")
+    def status():
+        market_arg = request.args.get("market")
+
+        def build(STATE: dict, version: int):
+            market = _market(market_arg, STATE)
+            if market is None:
+                return jsonify({"error": f"Unknown market: {market_arg}"}), 400
+            return jsonify(_status_body(STATE, market))
+
+        return _versioned_get("status", build, market_arg or "")
+
+    # ── Appliance plan + hourly chart data ────────────────────
+    @app.route("/api/plan")
+    def plan():
+        def build(STATE: dict, version: int):
+            if not STATE["current_schedule"]:
+                return jsonify({"error": "No schedule yet"}), 404
+            return Response(
+                _payload(g.household, version, STATE, "plan"), mimetype="application/json",
+            )
+
+        return _versioned_get("plan", build)
+
     # ── Full current schedule ─────────────────────────────────
     @app.route("/api/schedule")
     def get_schedule():
-        sched = STATE["current_schedule"]
-        if not sched:
-            return jsonify({"error": "No schedule yet"}), 404
-        out = make_serializable(sched)
-        out["current_hour"]     = STATE["current_hour"]
-        out["override_history"] = STATE["override_history"]
-        return jsonify(out)
+        def build(STATE: dict, version: int):
+            if not STATE["current_schedule"]:
+                return jsonify({"error": "No schedule yet"}), 404
+            return Response(
+                _payload(g.household, version, STATE, "schedule"), mimetype="application/json",
+            )
+
+        return _versioned_get("schedule", build)
+
+    # ── Live updates: snapshot, then diffs on every state change ──
+    @app.route("/api/stream")
+    def stream():
+        household = g.household
+        last_id   = request.headers.get("Last-Event-ID", "")
+
+        def _events():
+            yield "retry: 2000\n\n"
+            current  = store.get_or_create(household, lambda: initial)
+            doc      = _stream_doc(current.state)
+            tag      = _state_tag(household, current.version)
+            if tag != last_id:
+                yield f"id: {tag}\nevent: snapshot\ndata: {dumps_json(doc).decode()}\n\n"
+
+            version  = current.version
+            deadline = time.monotonic() + Config.STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                latest = store.wait_for_change(household, version, Config.STREAM_HEARTBEAT_SECONDS)
+                if latest == version:
+                    yield ": heartbeat\n\n"
+                    continue
+                current = store.get(household)
+                new_doc = _stream_doc(current.state)
+                diff    = _diff(doc, new_doc)
+                doc, version = new_doc, current.version
+                if diff["changed"] or diff["removed"]:
+                    tag = _state_tag(household, version)
+                    yield f"id: {tag}\nevent: diff\ndata: {dumps_json(diff).decode()}\n\n"
+
+        return Response(
+            stream_with_context(_events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     # ── Smart-plug detected or manual user override ───────────
+    # Events go through the coalescing queue; by default the POST waits
+    # for its ticket so the response is the rescheduled plan, with
+    # "async": true it returns the ticket at once (poll or stream it).
     @app.route("/api/event", methods=["POST"])
     def plug_event():
         data       = request.get_json() or {}
@@ -321,125 +798,194 @@ def create_app() -> Flask:
             hour, minute  = int(raw_hour), 0
             detected_time = f"{hour:02d}:00"
         else:
-            hour, minute  = STATE["current_hour"], 0
-            detected_time = f"{hour:02d}:00"
+            now           = _state(g.household)["current_hour"]
+            hour, minute  = int(now), int(round(now % 1 * 60))
+            detected_time = format_hhmm(now)
 
         valid_keys = ["wm", "boiler", "ac1", "ac2"]
         if key not in valid_keys:
             return jsonify({"error": f"Unknown appliance key: {key}"}), 400
 
-        # ── Deduplication: block identical event within 60 s ──
-        now = datetime.now()
-        for past in STATE["override_history"]:
-            if (
-                past["appliance"]  == key
-                and past["hour"]   == hour
-                and past["event_type"] == event_type
-            ):
-                try:
-                    past_dt = datetime.strptime(
-                        f"{now.strftime('%Y-%m-%d')} {past['time']}",
-                        "%Y-%m-%d %H:%M",
-                    )
-                    if abs((now - past_dt).total_seconds()) < 60:
-                        logger.info("DUPLICATE blocked: %s at %02d:00", key, hour)
-                        out = make_serializable(STATE["current_schedule"])
-                        out["override_history"] = STATE["override_history"]
-                        out["current_hour"]     = STATE["current_hour"]
-                        out["duplicate"]        = True
-                        return jsonify(out)
-                except Exception:
-                    pass
-
-        logger.info("⚡ EVENT: %s — %s at %02d:00", event_type, key, hour)
-
-        result = handle_smart_plug_event(
-            appliance_key  = key,
-            detected_hour  = hour,
-            current_hour   = STATE["current_hour"],
-            morning_data   = STATE["morning_schedule"],
-            sim_frame      = sim,
-            trained_models = trained_models,
-            event_type     = event_type,
-            detected_time  = detected_time,
-        )
-
-        # Chain lp_results_raw so subsequent overrides are aware of prior locks
-        if result.get("lp_results_raw"):
-            STATE["morning_schedule"]["lp_results_raw"] = result["lp_results_raw"]
-
-        STATE["current_schedule"] = result
-        STATE["override_history"].append({
-            "time":       now.strftime("%H:%M"),
-            "appliance":  key,
-            "hour":       hour,
-            "minute":     minute,
-            "event_type": event_type,
-            "trigger":    result.get("trigger", ""),
+        ticket = events.submit(g.household, {
+            "appliance_key": key,
+            "hour":          hour,
+            "minute":        minute,
+            "event_type":    event_type,
+            "detected_time": detected_time,
+            "received":      datetime.now().strftime("%H:%M"),
         })
-
-        out = make_serializable(result)
-        out["override_history"] = STATE["override_history"]
-        out["current_hour"]     = STATE["current_hour"]
-        return jsonify(out)
+        if ticket.status == "duplicate":
+            logger.info("DUPLICATE blocked: %s at %02d:00", key, hour)
+            original = events.get(ticket.duplicate_of)
+            if original is not None:
+                original.wait(Config.EVENT_WAIT_SECONDS)
+        elif data.get("async") or not ticket.wait(Config.EVENT_WAIT_SECONDS):
+            return jsonify(ticket.summary()), 202
+        return _ticket_response(ticket)
+
+    @app.route("/api/event/<ticket_id>")
+    def event_ticket(ticket_id: str):
+        ticket = events.get(ticket_id)
+        if ticket is None:
+            return jsonify({"error": f"Unknown ticket: {ticket_id}"}), 404
+        if not ticket.finished:
+            return jsonify(ticket.summary()), 202
+        return _ticket_response(ticket)
+
+    @app.route("/api/event/<ticket_id>/stream")
+    def event_ticket_stream(ticket_id: str):
+        ticket = events.get(ticket_id)
+        if ticket is None:
+            return jsonify({"error": f"Unknown ticket: {ticket_id}"}), 404
+
+        def _stream():
+            yield f"event: status\ndata: {json.dumps(ticket.summary())}\n\n"
+            deadline = time.monotonic() + Config.EVENT_WAIT_SECONDS
+            while not ticket.wait(min(1.0, max(deadline - time.monotonic(), 0))):
+                if time.monotonic() >= deadline:
+                    yield f"event: timeout\ndata: {json.dumps(ticket.summary())}\n\n"
+                    return
+                yield ": waiting\n\n"
+            yield f"event: {ticket.status}\ndata: {json.dumps(_ticket_body(ticket))}\n\n"
+
+        return Response(
+            stream_with_context(_stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
 
     # ── Available dates ───────────────────────────────────────
     @app.route("/api/available_dates")
     def available_dates():
-        dates = sorted(
-            pd.to_datetime(sim["timestamp"])
-            .dt.strftime("%Y-%m-%d")
-            .unique()
-            .tolist()
+        dates = sim_index.date_list()
+        return _conditional(
+            f"dates-{len(dates)}-{dates[0] if dates else ''}-{dates[-1] if dates else ''}",
+            lambda: jsonify({"dates": dates, "count": len(dates)}),
         )
-        return jsonify({"dates": dates, "count": len(dates)})
+
+    # ── On-demand forecast ────────────────────────────────────
+    @app.route("/api/forecast")
+    def forecast():
+        if forecaster is None:
+            if not startup.done:
+                return jsonify({"error": "Forecasts still loading — retry shortly"}), 503
+            return jsonify({"error": "Forecasts unavailable — retrain to add history"}), 404
+        date = request.args.get("date") or None
+        try:
+            days = min(max(int(request.args.get("days", 1)), 1), Config.FORECAST_MAX_DAYS_AHEAD)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+
+        def build():
+            try:
+                frame = forecaster.forecast(date, days=days)
+            except ValueError as exc:
+                return jsonify({"error": str(exc)}), 400
+            rows = frame.assign(
+                timestamp=frame["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+            ).to_dict("records")
+            return jsonify({
+                "date":        str(frame["timestamp"].iloc[0].date()),
+                "days":        days,
+                "version":     forecaster.version,
+                "history_end": forecaster.history_end.isoformat(),
+                "rows":        make_serializable(rows),
+            })
+
+        return _conditional(f"forecast-{forecaster.version}-{date or ''}-{days}", build)
 
     # ── (Re-)generate schedule for a specific date ────────────
     @app.route("/api/regenerate", methods=["POST"])
     def regenerate():
         data        = request.get_json() or {}
         target_date = data.get("target_date", None)
+        market      = _market(data.get("market"), _state(g.household))
+        if market is None:
+            return jsonify({"error": f"Unknown market: {data.get('market')}"}), 400
 
         if target_date:
             logger.info("Generating schedule for: %s", target_date)
         else:
             logger.info("Regenerating schedule (next available day) …")
 
-        m = generate_morning_schedule(
-            sim, start_hour=6, target_date=target_date
+        index = sim_index
+        if target_date and target_date not in sim_index.slices and not startup.done:
+            return jsonify({"error": "Forecasts still loading — retry shortly"}), 503
+        forecast = bool(target_date and target_date not in sim_index.slices and forecaster is not None)
+        if forecast:
+            # outside the sim frame: plan on a forecast (06:00 → 06:00 spans 2 days)
+            try:
+                index = _forecast_index(target_date, days=2)
+            except ValueError as exc:
+                return jsonify({"error": str(exc)}), 400
+
+        m = schedule_cache.get_or_solve(
+            index, market, target_date=target_date, start_hour=6
         )
+        if forecast:
+            m["forecast_from"] = target_date       # /api/next rolls on the forecast too
         # Enrich with appliance_schedule
-        m["appliance_schedule"] = {
-            item["name"]: {
-                "hours":        item["active_hours"],
-                "display":      ", ".join([f"{h:02d}:00" for h in item["active_hours"]]),
-                "total_energy": item["total_energy"],
-                "is_free":      item["is_free"],
-                "price_band":   item["price_band"],
-                "scenario":     item.get("scenario", ""),
-                "shifted":      item["shifted"],
-                "status":       item["status"],
-            }
-            for item in m.get("schedule", [])
-        }
+        m["appliance_schedule"] = _appliance_schedule(m)
         m["override_history"] = []
 
-        STATE["morning_schedule"]  = m
-        STATE["current_schedule"]  = m
-        STATE["override_history"]  = []
+        def change(STATE: dict) -> int:
+            STATE["morning_schedule"]  = m
+            STATE["current_schedule"]  = m
+            STATE["override_history"]  = []
+            STATE["market"]            = market.name
+            return STATE["current_hour"]
+
+        current_hour = _update(g.household, change)
+        events.forget(g.household)
 
-        logger.info("✅ Schedule ready: %s", m.get("day_display", "?"))
+        logger.info("✅ Schedule ready: %s (%s)", m.get("day_display", "?"), market.name)
 
         out = make_serializable(m)
-        out["current_hour"] = STATE["current_hour"]
+        out["current_hour"] = current_hour
         return jsonify(out)
 
-    # ── Advance simulation hour (demo / testing) ──────────────
+    # ── Advance simulation slot (demo / testing) ──────────────
+    # With Config.ROLLING_HORIZON_HOURS the household's plan slides along
+    # (rolling.py): executed slots are frozen and the rest is re-solved.
+    # A forecast-backed schedule rolls on its forecast; when the plan
+    # cannot slide, "reason" says why.
     @app.route("/api/next", methods=["POST"])
     def next_hour():
-        STATE["current_hour"] = (STATE["current_hour"] + 1) % 24
-        STATE["sim_index"]    = min(STATE["sim_index"] + 1, len(sim) - 1)
-        logger.debug("Hour → %02d:00", STATE["current_hour"])
-        return jsonify({"current_hour": STATE["current_hour"]})
+        def change(STATE: dict) -> tuple:
+            sched = STATE["morning_schedule"]
+            plan  = index = reason = None
+            if Config.ROLLING_HORIZON_HOURS <= 0:
+                reason = "Rolling planning is disabled (ROLLING_HORIZON_HOURS=0)"
+            elif not sched:
+                reason = "No schedule to roll"
+            else:
+                try:
+                    index = _schedule_index(sched)
+                    plan  = RollingPlan.resume(index, sched, STATE["current_hour"])
+                    if plan is None:
+                        reason = f"No sim or forecast rows for {sched.get('actual_date')}"
+                except ValueError as exc:
+                    reason = f"No forecast to roll on: {exc}"
+            STATE["current_hour"] = slot_label((STATE["current_hour"] + sim_index.slot_hours) % 24)
+            STATE["sim_index"]    = min(STATE["sim_index"] + 1, len(sim) - 1)
+            if plan is None:
+                return STATE["current_hour"], reason
+
+            plan = plan.advance(index, sched)
+            m    = plan.solve(index, _market(None, STATE), sched)
+            m["appliance_schedule"] = _appliance_schedule(m)
+            if "forecast_from" in sched:
+                m["forecast_from"] = sched["forecast_from"]
+            STATE["morning_schedule"] = STATE["current_schedule"] = m
+            STATE["current_hour"]     = slot_label(m["rolling"]["now_hour"] % 24)
+            return STATE["current_hour"], None
+
+        current_hour, reason = _update(g.household, change)
+        logger.debug("Hour → %s%s", format_hhmm(current_hour), f" ({reason})" if reason else " (re-planned)")
+        out = {"current_hour": current_hour, "replanned": reason is None}
+        if reason:
+            out["reason"] = reason
+        return jsonify(out)
 
+    startup.run(phases, after)
     return app
@@ -0,0 +1,206 @@
+"""
+artefacts.py — columnar, memory-mapped store for the sim frame and prices.
+
+Replaces sim_frame.pkl / price_meta.pkl.  Every column is one uncompressed
+.npy file, opened with np.load(mmap_mode="r"), so loading costs no I/O up
+front and every gunicorn worker maps the same page-cache copy instead of
+decompressing its own.
+
+Layout under Config.ARTEFACT_STORE_DIR:
+    manifest.json                          — schema, thresholds, generation
+    <generation>/<table>/<NNN>.npy         — one file per column
+
+A save writes a new generation directory and then swaps manifest.json
+atomically.  The generation it replaced is kept, because readers open
+tables lazily: a worker that read the old manifest can still map its
+tables until the next save.  Older generations are removed (workers that
+still map them keep their pages until they exit).
+
+Column kinds:
+    numeric / bool → stored as is
+    datetime       → int64 in its own unit (unit / tz recorded in the manifest)
+    anything else  → categorical: int16/int32 codes + categories in manifest
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+# ══════════════════════════════════════════════════════════════════
+# Writer
+# ══════════════════════════════════════════════════════════════════
+
+def _write_column(path: Path, s: pd.Series) -> dict:
+    """Write one column; returns its manifest entry (without the file name)."""
+    dtype = s.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        utc = s.dt.tz_convert("UTC").dt.tz_localize(None)
+        np.save(path, utc.to_numpy(dtype="datetime64[ns]").view("i8"))
+        return {"kind": "datetime", "tz": str(dtype.tz)}
+    if isinstance(dtype, np.dtype) and dtype.kind == "M":
+        unit = np.datetime_data(dtype)[0]
+        np.save(path, s.to_numpy().view("i8"))
+        return {"kind": "datetime", "tz": None, "unit": unit}
+    if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+        np.save(path, s.to_numpy())
+        return {"kind": "array"}
+    if pd.api.types.is_numeric_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype):
+        # nullable extension dtypes (Int64, Float64, boolean) → float64 + NaN
+        np.save(path, s.astype("float64").to_numpy())
+        return {"kind": "array"}
+
+    cat   = s.astype("category")
+    codes = cat.cat.codes.to_numpy()
+    np.save(path, codes.astype(np.int16 if len(cat.cat.categories) < 2**15 else np.int32))
+    return {
+        "kind":       "category",
+        "categories": [c.item() if hasattr(c, "item") else c
+                       for c in cat.cat.categories],
+        "dtype":      None if isinstance(dtype, pd.CategoricalDtype) else str(dtype),
+    }
+
+
+def save_store(
+    tables: dict,
+    meta:   dict,
+    root:   Optional[Path] = None,
+) -> Path:
+    """
+    Persist {name: DataFrame} plus JSON-serialisable meta (p33, p67 …)
+    as a new generation and point manifest.json at it.
+    """
+    root = Path(root or Config.ARTEFACT_STORE_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+
+    generation = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    gen_dir    = root / generation
+    manifest   = {
+        "format":     FORMAT_VERSION,
+        "generation": generation,
+        "created":    datetime.now().isoformat(timespec="seconds"),
+        "meta":       meta,
+        "tables":     {},
+    }
+
+    for name, df in tables.items():
+        tdir = gen_dir / name
+        tdir.mkdir(parents=True)
+        df   = df.reset_index(drop=True)
+        cols = []
+        for i, col in enumerate(df.columns):
+            fname = f"{i:03d}.npy"
+            entry = _write_column(tdir / fname, df[col])
+            cols.append({"name": col, "file": fname, **entry})
+        manifest["tables"][name] = {"rows": len(df), "columns": cols}
+        logger.info("  store: %-10s %d rows × %d cols", name, len(df), len(cols))
+
+    keep = {generation}
+    if ArtefactStore.exists(root):
+        keep.add(json.loads((root / "manifest.json").read_text()).get("generation"))
+
+    tmp = root / f".manifest-{generation}.json"
+    tmp.write_text(json.dumps(manifest, indent=1))
+    os.replace(tmp, root / "manifest.json")
+
+    # the replaced generation stays for readers that have not mapped it yet
+    for old in root.iterdir():
+        if old.is_dir() and old.name not in keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+    return root / "manifest.json"
+
+
+# ══════════════════════════════════════════════════════════════════
+# Reader
+# ══════════════════════════════════════════════════════════════════
+
+def _read_column(path: Path, entry: dict, mmap: bool, categorical: bool) -> object:
+    arr = np.load(path, mmap_mode="r" if mmap else None)
+    kind = entry["kind"]
+    if kind == "datetime":
+        values = arr.view(f"datetime64[{entry.get('unit', 'ns')}]")
+        if entry.get("tz"):
+            return pd.DatetimeIndex(values).tz_localize("UTC").tz_convert(entry["tz"])
+        return values
+    if kind == "category":
+        cat = pd.Categorical.from_codes(arr, categories=entry["categories"])
+        if not categorical and entry.get("dtype"):
+            return pd.Series(cat).astype(entry["dtype"])
+        return cat
+    return arr
+
+
+class ArtefactStore:
+    """
+    Read side of the store.  Tables are mapped on first access and the
+    resulting DataFrames wrap the read-only memmaps without copying.
+    """
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = Path(root or Config.ARTEFACT_STORE_DIR)
+        self.manifest = json.loads((self.root / "manifest.json").read_text())
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported artefact store format {self.manifest.get('format')} "
+                f"in {self.root} (expected {FORMAT_VERSION}) — retrain."
+            )
+        self._tables: dict = {}
+
+    @staticmethod
+    def exists(root: Optional[Path] = None) -> bool:
+        return (Path(root or Config.ARTEFACT_STORE_DIR) / "manifest.json").exists()
+
+    @property
+    def generation(self) -> str:
+        return self.manifest["generation"]
+
+    @property
+    def meta(self) -> dict:
+        return self.manifest.get("meta", {})
+
+    @property
+    def tables(self) -> list:
+        return list(self.manifest["tables"])
+
+    def table(self, name: str, mmap: bool = True, categorical: bool = True) -> pd.DataFrame:
+        """
+        categorical=False turns category columns back into their original
+        dtype (object / str) — for frames that must match the writer's.
+        """
+        key = (name, mmap, categorical)
+        if key in self._tables:
+            return self._tables[key]
+        spec = self.manifest["tables"][name]
+        tdir = self.root / self.manifest["generation"] / name
+        df   = pd.DataFrame(
+            {c["name"]: _read_column(tdir / c["file"], c, mmap, categorical)
+             for c in spec["columns"]},
+            copy=False,
+        )
+        if len(df) != spec["rows"]:
+            raise ValueError(f"{name}: expected {spec['rows']} rows, got {len(df)}")
+        self._tables[key] = df
+        return df
+
+    def price_meta(self) -> dict:
+        """Same shape as the legacy price_meta.pkl: {p33, p67, df_fac}."""
+        out = {"p33": float(self.meta["p33"]), "p67": float(self.meta["p67"])}
+        if "df_fac" in self.manifest["tables"]:
+            out["df_fac"] = self.table("df_fac")
+        return out
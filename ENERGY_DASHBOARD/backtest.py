@@ -0,0 +1,303 @@
+"""
+backtest.py — replay the LP scheduler over every date of the sim frame.
+
+    python -m app.backtest [--markets default,pt] [--start 2023-01-01 --end 2023-12-31]
+        [--start-hour 0] [--workers 8] [--out backtest.parquet]
+
+Each date is scheduled exactly as /api/regenerate would (auto specs,
+generate_morning_schedule) once per market, and reduced to one row of
+the result table:
+
+  date, market, slots, error
+  baseline_cost, optimized_cost, saving          € over the horizon
+  flexible_kwh                                   energy of the flexible appliances
+  shifted_kwh                                    part of it moved to other slots
+  base_{low,medium,high}_kwh                     flexible energy per price band,
+  opt_{low,medium,high}_kwh                        before / after the LP
+
+The frame is partitioned into runs of Config.BACKTEST_CHUNK_DAYS dates
+(plus the following day, into which a start_hour > 0 horizon spills).
+Only a partition's rows are sent to a worker, and the number of
+partitions in flight is capped so that their estimated footprint stays
+within Config.BACKTEST_MEMORY_MB — the parent never holds more than
+that many slices, whatever the length of the frame.  Workers return
+their rows column-wise; the table is written as Parquet (.parquet) or
+CSV and summed per market on stdout.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Allow running as `python -m app.backtest` or `python app/backtest.py`
+if __name__ == "__main__" and __package__ is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.artefacts import ArtefactStore
+from app.config import Config
+from app.optimizer import generate_morning_schedule
+from app.sim_index import SimFrameIndex
+from app.utils import PRICE_BANDS, PriceBandModel, price_markets, resample_sim_frame
+
+logger = logging.getLogger(__name__)
+
+_BANDS = [b.lower() for b in PRICE_BANDS]
+
+COLUMNS = [
+    "date", "market", "slots", "baseline_cost", "optimized_cost", "saving",
+    "flexible_kwh", "shifted_kwh",
+    *(f"base_{b}_kwh" for b in _BANDS),
+    *(f"opt_{b}_kwh" for b in _BANDS),
+    "error",
+]
+
+# A partition costs its rows in the parent, once more pickled on the
+# call queue and again in the worker (plus that worker's index).
+_FOOTPRINT = 3
+
+
+# ══════════════════════════════════════════════════════════════════
+# Inputs
+# ══════════════════════════════════════════════════════════════════
+
+def load_sim_frame() -> tuple[pd.DataFrame, PriceBandModel]:
+    """
+    (sim frame at Config.SLOT_MINUTES, trained PriceBandModel) from the
+    artefact store or legacy pickles.
+    """
+    if ArtefactStore.exists():
+        store      = ArtefactStore()
+        sim, meta  = store.table("sim_frame"), store.price_meta()
+    elif Config.SIM_FRAME_PATH.exists():
+        logger.warning("No artefact store — loading legacy joblib sim frame")
+        sim, meta  = joblib.load(Config.SIM_FRAME_PATH), joblib.load(Config.PRICE_META_PATH)
+    else:
+        raise FileNotFoundError(
+            f"Simulation frame not found in {Config.ARTEFACT_STORE_DIR}\n"
+            "Run `python -m app.train_models` first."
+        )
+    bands = PriceBandModel.from_meta(meta)
+    return resample_sim_frame(sim, Config.SLOT_MINUTES, bands, meta.get("df_fac")), bands
+
+
+def select_dates(index: SimFrameIndex, start: Optional[str] = None, end: Optional[str] = None) -> list:
+    """Dates of the frame within [start, end] (either may be None)."""
+    return [d for d in index.date_list()
+            if (start is None or d >= start) and (end is None or d <= end)]
+
+
+def partitions(index: SimFrameIndex, dates: list, chunk_days: int) -> Iterator[tuple[list, int, int]]:
+    """
+    (dates, start row, end row) per run of chunk_days dates; the row range
+    also covers the day after the run so spilling horizons stay complete.
+    """
+    all_dates = index.date_list()
+    position  = {d: i for i, d in enumerate(all_dates)}
+    chunk_days = max(int(chunk_days), 1)
+    for i in range(0, len(dates), chunk_days):
+        chunk = dates[i:i + chunk_days]
+        start = index.slices[chunk[0]][0]
+        after = position[chunk[-1]] + 1
+        end   = (index.slices[all_dates[after]][1] if after < len(all_dates)
+                 else index.slices[chunk[-1]][1])
+        yield chunk, start, end
+
+
+# ══════════════════════════════════════════════════════════════════
+# Per-day evaluation
+# ══════════════════════════════════════════════════════════════════
+
+def day_row(index: SimFrameIndex, date: str, bands: PriceBandModel, start_hour: int) -> dict:
+    """One result row: cost, shifted energy and band usage of one date's schedule."""
+    row = dict.fromkeys(COLUMNS, np.nan)
+    row.update(date=date, market=bands.name, error="")
+    try:
+        sched = generate_morning_schedule(
+            index.frame, bands, start_hour=start_hour, target_date=date, index=index,
+        )
+    except Exception as exc:
+        logger.exception("Backtest failed for %s / %s", date, bands.name)
+        row.update(slots=0, error=f"{type(exc).__name__}: {exc}")
+        return row
+
+    band  = np.array([c["price_band"] for c in sched["chart_data"]], dtype=object)
+    base  = np.zeros(len(band))
+    opt   = np.zeros(len(band))
+    shift = 0.0
+    for res in sched["lp_results_raw"].values():
+        o, x   = np.asarray(res["original"], dtype=float), np.asarray(res["optimized"], dtype=float)
+        base  += o
+        opt   += x
+        shift += float(np.maximum(o - x, 0.0).sum())
+
+    row.update(
+        slots          = sched["n_slots"],
+        baseline_cost  = sched["baseline_cost"],
+        optimized_cost = sched["optimized_cost"],
+        saving         = sched["daily_saving"],
+        flexible_kwh   = float(base.sum()),
+        shifted_kwh    = shift,
+    )
+    for b, name in zip(_BANDS, PRICE_BANDS):
+        row[f"base_{b}_kwh"] = float(base[band == name].sum())
+        row[f"opt_{b}_kwh"]  = float(opt[band == name].sum())
+    return row
+
+
+def solve_partition(part: pd.DataFrame, dates: list, markets: list, start_hour: int) -> dict:
+    """Columns {name: values} of every (date, market) row of one partition."""
+    index = SimFrameIndex.build(part)
+    cols: dict = {c: [] for c in COLUMNS}
+    for date in dates:
+        for bands in markets:
+            for c, v in day_row(index, date, bands, start_hour).items():
+                cols[c].append(v)
+    return cols
+
+
+# ══════════════════════════════════════════════════════════════════
+# Driver
+# ══════════════════════════════════════════════════════════════════
+
+def map_partitions(
+    index:      SimFrameIndex,
+    dates:      list,
+    task:       Callable,
+    args:       tuple,
+    workers:    int = Config.BACKTEST_WORKERS,
+    chunk_days: int = Config.BACKTEST_CHUNK_DAYS,
+    memory_mb:  int = Config.BACKTEST_MEMORY_MB,
+) -> Iterator[tuple[list, object]]:
+    """
+    Yield (dates, task(rows, dates, *args)) for every partition of `dates`,
+    in completion order.  task must be a module-level function so spawned
+    workers can import it; workers=0 runs it in-process.
+    """
+    if not dates:
+        return
+    parts = partitions(index, dates, chunk_days)
+    if workers <= 0:
+        for chunk, s, e in parts:
+            yield chunk, task(index.frame.iloc[s:e], chunk, *args)
+        return
+
+    _, s, e    = next(partitions(index, dates, chunk_days))
+    per_part   = _FOOTPRINT * int(index.frame.iloc[s:e].memory_usage(deep=True).sum())
+    max_flight = max(int(memory_mb * 2**20 // max(per_part, 1)), 1)
+    logger.info(
+        "%d dates on %d workers, ≤%d partitions of %d days in flight (~%.1f MB each)",
+        len(dates), workers, max_flight, chunk_days, per_part / 2**20,
+    )
+    # spawn, as in ScheduleCache: safe whatever threads the parent runs
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending: dict = {}
+        for chunk, s, e in parts:
+            if len(pending) >= max_flight:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    yield pending.pop(fut), fut.result()
+            pending[pool.submit(task, index.frame.iloc[s:e], chunk, *args)] = chunk
+        for fut in wait(pending).done:
+            yield pending[fut], fut.result()
+
+
+def run_backtest(
+    sim:        pd.DataFrame,
+    markets:    list,
+    start:      Optional[str] = None,
+    end:        Optional[str] = None,
+    start_hour: int = 0,
+    workers:    int = Config.BACKTEST_WORKERS,
+    chunk_days: int = Config.BACKTEST_CHUNK_DAYS,
+    memory_mb:  int = Config.BACKTEST_MEMORY_MB,
+) -> pd.DataFrame:
+    """Result table (COLUMNS) of every date in [start, end] × market."""
+    index = SimFrameIndex.build(sim)
+    dates = select_dates(index, start, end)
+    cols: dict = {c: [] for c in COLUMNS}
+
+    t0, done = time.perf_counter(), 0
+    for chunk, part_cols in map_partitions(
+        index, dates, solve_partition, (markets, start_hour), workers, chunk_days, memory_mb,
+    ):
+        for c in COLUMNS:
+            cols[c].extend(part_cols[c])
+        done += len(chunk)
+        logger.info("Backtest: %d / %d dates (%.1fs)", done, len(dates), time.perf_counter() - t0)
+
+    table = pd.DataFrame(cols)
+    return table.sort_values(["date", "market"], kind="stable").reset_index(drop=True)
+
+
+def summarize(table: pd.DataFrame) -> pd.DataFrame:
+    """Per-market totals over the solved (error-free) days."""
+    ok  = table[table["error"] == ""]
+    agg = ok.groupby("market").agg(
+        days           = ("date", "count"),
+        baseline_cost  = ("baseline_cost", "sum"),
+        optimized_cost = ("optimized_cost", "sum"),
+        saving         = ("saving", "sum"),
+        flexible_kwh   = ("flexible_kwh", "sum"),
+        shifted_kwh    = ("shifted_kwh", "sum"),
+        **{f"{p}_{b}_kwh": (f"{p}_{b}_kwh", "sum") for p in ("base", "opt") for b in _BANDS},
+    )
+    agg["saving_pct"] = 100 * agg["saving"] / agg["baseline_cost"].where(agg["baseline_cost"] != 0)
+    agg["failed"]     = table[table["error"] != ""].groupby("market").size().reindex(agg.index, fill_value=0)
+    return agg
+
+
+def write_table(table: pd.DataFrame, path: Path) -> None:
+    if path.suffix == ".parquet":
+        table.to_parquet(path, index=False)
+    else:
+        table.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the LP scheduler over the sim frame")
+    parser.add_argument("--markets", help="Comma-separated markets (default: all configured)")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--start-hour", type=int, default=0,
+                        help="Horizon start hour; 0 schedules each calendar day")
+    parser.add_argument("--workers", type=int, default=Config.BACKTEST_WORKERS,
+                        help="Solver processes (0 = in-process)")
+    parser.add_argument("--chunk-days", type=int, default=Config.BACKTEST_CHUNK_DAYS)
+    parser.add_argument("--memory-mb", type=int, default=Config.BACKTEST_MEMORY_MB,
+                        help="Budget for the partitions in flight")
+    parser.add_argument("--out", type=Path, default=Path("backtest.parquet"),
+                        help=".parquet or .csv")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s  %(levelname)s  %(name)s — %(message)s")
+    logging.getLogger("app.optimizer").setLevel(logging.WARNING)     # one line per day otherwise
+
+    sim, bands = load_sim_frame()
+    markets    = price_markets(bands, Config.PRICE_MARKETS)
+    if args.markets:
+        names   = [m.strip() for m in args.markets.split(",") if m.strip()]
+        unknown = sorted(set(names) - set(markets))
+        if unknown:
+            parser.error(f"unknown market(s) {unknown}; configured: {sorted(markets)}")
+        markets = {n: markets[n] for n in names}
+
+    table = run_backtest(
+        sim, list(markets.values()), args.start, args.end, args.start_hour,
+        args.workers, args.chunk_days, args.memory_mb,
+    )
+    write_table(table, args.out)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(summarize(table).round(3).to_string())
+    print(f"\nWrote {len(table)} rows to {args.out}")
@@ -0,0 +1,273 @@
+"""
+benchmark.py — reproducible benchmarks of the scheduling and training
+hot paths on synthetic data.
+
+    python -m app.benchmark --days 30 --appliances 4 --repeat 5 \\
+        --out bench.json [--baseline previous.json]
+
+Benchmarked functions:
+  run_lp_day                one horizon of `slots` slots
+  generate_morning_schedule one day (`slots` rows) of the synthetic sim frame
+  handle_smart_plug_event   one manual override on that day's schedule
+  build_features            calendar + lag/rolling features, `days` × 24 h
+  build_sim_frame           sim-frame assembly from (constant) models
+
+Synthetic frames are seeded, so a run is reproducible on the same
+machine; sizes come from --days, --slots (per day) and --appliances
+(how many of the flexible appliances have load).  Models are
+ConstantPredictors: build_sim_frame is measured for its frame work, not
+for XGBoost inference.
+
+Per function the JSON records wall time over --repeat runs (min /
+median / mean), peak traced memory of one extra run (tracemalloc) and
+the time spent inside linprog (metrics.LP_SOLVE_SECONDS).  --baseline
+prints the ratio of each median against an earlier result file.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import scipy
+
+# Allow running as `python -m app.benchmark` or `python app/benchmark.py`
+if __name__ == "__main__" and __package__ is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.metrics import LP_SOLVE_SECONDS, LP_SOLVES
+from app.optimizer import (
+    ApplianceSpec,
+    generate_morning_schedule,
+    handle_smart_plug_event,
+    run_lp_day,
+)
+from app.sim_index import SimFrameIndex
+from app.train_models import build_features, build_sim_frame
+from app.utils import ConstantPredictor, PriceBandModel, enrich_sim_frame
+
+logger = logging.getLogger(__name__)
+
+# Flexible appliances in the order --appliances enables them, with the
+# synthetic load scale (kWh per hour) of each
+_APPLIANCES = [("wm", 0.15), ("boiler", 0.25), ("ac1", 0.3), ("ac2", 0.2)]
+
+
+# ══════════════════════════════════════════════════════════════════
+# Synthetic data
+# ══════════════════════════════════════════════════════════════════
+
+def _timestamps(days: int, slots: int) -> pd.DatetimeIndex:
+    return pd.date_range("2023-06-01", periods=days * slots, freq=pd.Timedelta(days=1) / slots)
+
+
+def _prices(ts: pd.DatetimeIndex, rng: np.random.Generator) -> np.ndarray:
+    h = ts.hour.to_numpy()
+    return (0.10 + 0.10 * ((h >= 10) & (h < 14)) + 0.15 * ((h >= 18) & (h < 22))
+            + rng.uniform(0, 0.05, len(ts)))
+
+
+def synthetic_sim_frame(
+    days:       int = 30,
+    slots:      int = 24,
+    appliances: int = 4,
+    seed:       int = 0,
+) -> tuple[pd.DataFrame, PriceBandModel]:
+    """(sim frame shaped like build_sim_frame's, PriceBandModel of its prices)."""
+    rng   = np.random.default_rng(seed)
+    ts    = _timestamps(days, slots)
+    n     = len(ts)
+    hour  = ts.hour.to_numpy() + ts.minute.to_numpy() / 60
+    price = _prices(ts, rng)
+    bands = PriceBandModel(float(np.quantile(price, 0.33)), float(np.quantile(price, 0.67)))
+
+    sim = pd.DataFrame({
+        "timestamp":                 ts,
+        "actual_consumption_kwh":    rng.uniform(0.2, 1.0, n),
+        "predicted_consumption_kwh": rng.uniform(0.2, 1.0, n),
+        "predicted_solar_kwh":       np.clip(np.sin((hour - 6) / 12 * np.pi), 0, None)
+                                     * 1.2 * rng.uniform(0.6, 1.0, n),
+        "pred_fridge_kwh":           rng.uniform(0.03, 0.05, n),
+    })
+    for i, (key, scale) in enumerate(_APPLIANCES):
+        sim[f"pred_{key}_kwh"] = rng.uniform(0, scale, n) if i < appliances else 0.0
+    df_fac = pd.DataFrame({"timestamp": ts, "price_facturacion": price})
+    return enrich_sim_frame(sim, df_fac, bands, slot_hours=24 / slots), bands
+
+
+def synthetic_house_hourly(days: int = 30, seed: int = 0) -> pd.DataFrame:
+    """Hourly house frame with the columns build_features expects."""
+    rng   = np.random.default_rng(seed)
+    ts    = _timestamps(days, 24)
+    n     = len(ts)
+    price = _prices(ts, rng)
+    p33, p67 = np.quantile(price, [0.33, 0.67])
+    house = pd.DataFrame({
+        "timestamp":       ts,
+        "consumption_kwh": rng.uniform(0.2, 1.0, n),
+        "fridge_kwh":      rng.uniform(0.03, 0.05, n),
+        "price_eur_kwh":   price,
+        "price_band":      np.where(price > p67, "HIGH", np.where(price < p33, "LOW", "MEDIUM")),
+    })
+    for key, scale in _APPLIANCES:
+        house[f"{key}_kwh"] = rng.uniform(0, scale, n)
+    return house
+
+
+def _specs(sim_day: pd.DataFrame) -> list:
+    specs = []
+    for key, _ in _APPLIANCES:
+        total = float(sim_day[f"pred_{key}_kwh"].sum())
+        if total >= 0.005:
+            specs.append(ApplianceSpec(
+                key=key, name=key, total_energy=total,
+                duration_hours=2 if key != "boiler" else 1,
+            ))
+    return specs
+
+
+# ══════════════════════════════════════════════════════════════════
+# Measurement
+# ══════════════════════════════════════════════════════════════════
+
+def measure(fn: Callable[[], object], repeat: int, setup: Callable[[], tuple] = tuple) -> dict:
+    """
+    Wall time of fn(*setup()) over `repeat` runs, solver time and LP count
+    inside those runs, and the tracemalloc peak of one extra run.
+    setup() runs untimed before every call.
+    """
+    fn(*setup())                                    # warm caches / imports
+    walls = []
+    solve0, _ = LP_SOLVE_SECONDS.totals()
+    count0    = LP_SOLVES.total()
+    for _ in range(repeat):
+        args = setup()
+        t0   = time.perf_counter()
+        fn(*args)
+        walls.append(time.perf_counter() - t0)
+    solve1, _ = LP_SOLVE_SECONDS.totals()
+    count1    = LP_SOLVES.total()
+
+    args = setup()
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "repeat":        repeat,
+        "wall_min_s":    round(min(walls), 6),
+        "wall_median_s": round(statistics.median(walls), 6),
+        "wall_mean_s":   round(statistics.fmean(walls), 6),
+        "solver_s":      round((solve1 - solve0) / repeat, 6),
+        "lp_solves":     round((count1 - count0) / repeat, 2),
+        "peak_mb":       round(peak / 2**20, 3),
+    }
+
+
+def run_benchmarks(days: int, slots: int, appliances: int, repeat: int, seed: int = 0) -> dict:
+    sim, bands = synthetic_sim_frame(days, slots, appliances, seed)
+    index      = SimFrameIndex.build(sim)
+    day        = sim.iloc[:slots]
+    specs      = _specs(day)
+    preds      = {c: day[c].to_numpy() for c in day.columns if c.startswith("pred_")}
+    hours      = day["hour"].to_numpy() + day["timestamp"].dt.minute.to_numpy() / 60
+
+    hourly     = synthetic_house_hourly(days, seed)
+    feats      = {t: build_features(hourly, t) for t in ("consumption_kwh", "fridge_kwh",
+                                                         *(f"{k}_kwh" for k, _ in _APPLIANCES))}
+    models     = {
+        t: {"model": ConstantPredictor(float(f[t].mean())), "test": f,
+            "features": ["hour"], "clip": (0.0, float(f[t].max()))}
+        for t, f in feats.items()
+    }
+    solar_pred = np.clip(np.sin((hourly["timestamp"].dt.hour.to_numpy() - 6) / 12 * np.pi), 0, None)
+    df_fac     = hourly[["timestamp"]].assign(price_facturacion=hourly["price_eur_kwh"])
+    morning    = generate_morning_schedule(sim, bands, specs=copy.deepcopy(specs), index=index)
+    event_key  = morning["schedule"][0]["key"] if morning["schedule"] else "wm"
+
+    results = {
+        "run_lp_day": measure(
+            lambda s: run_lp_day(preds, day["predicted_solar_kwh"].to_numpy(),
+                                 day["price_eur_kwh"].to_numpy(), hours, bands, specs=s),
+            repeat, setup=lambda: (copy.deepcopy(specs),),
+        ),
+        "generate_morning_schedule": measure(
+            lambda s: generate_morning_schedule(sim, bands, specs=s, index=index),
+            repeat, setup=lambda: (copy.deepcopy(specs),),
+        ),
+        "handle_smart_plug_event": measure(
+            lambda m: handle_smart_plug_event(
+                event_key, 14, 10, m, sim, models, bands, event_type="manual",
+            ),
+            repeat, setup=lambda: (copy.deepcopy(morning),),
+        ),
+        "build_features": measure(
+            lambda: build_features(hourly, "consumption_kwh"), repeat,
+        ),
+        "build_sim_frame": measure(
+            lambda: build_sim_frame(models, solar_pred, df_fac, bands), repeat,
+        ),
+    }
+    return {
+        "meta": {
+            "created":    datetime.now().isoformat(timespec="seconds"),
+            "params":     {"days": days, "slots": slots, "appliances": appliances,
+                           "repeat": repeat, "seed": seed},
+            "python":     platform.python_version(),
+            "numpy":      np.__version__,
+            "pandas":     pd.__version__,
+            "scipy":      scipy.__version__,
+            "machine":    platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list:
+    """Rows of (function, baseline median, current median, ratio)."""
+    rows = []
+    for name, res in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base:
+            rows.append((name, base["wall_median_s"], res["wall_median_s"],
+                         res["wall_median_s"] / max(base["wall_median_s"], 1e-12)))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling and training hot paths")
+    parser.add_argument("--days", type=int, default=30, help="Synthetic sim-frame length in days")
+    parser.add_argument("--slots", type=int, default=24,
+                        help="Slots per day of the synthetic frame (run_lp_day horizon)")
+    parser.add_argument("--appliances", type=int, default=4, choices=range(1, 5),
+                        help="Flexible appliances with load (1–4)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per function")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)     # train_models configures INFO
+    report = run_benchmarks(args.days, args.slots, args.appliances, args.repeat, args.seed)
+    args.out.write_text(json.dumps(report, indent=2))
+
+    for name, r in report["results"].items():
+        print(f"{name:<26} median {r['wall_median_s'] * 1000:9.2f} ms   "
+              f"solver {r['solver_s'] * 1000:8.2f} ms   peak {r['peak_mb']:8.2f} MB")
+    if args.baseline:
+        print(f"\nvs {args.baseline}:")
+        for name, old, new, ratio in compare(report, json.loads(args.baseline.read_text())):
+            print(f"{name:<26} {old * 1000:9.2f} → {new * 1000:9.2f} ms   ×{ratio:.2f}")
+    print(f"\nWrote {args.out}")
@@ -14,19 +14,25 @@ class Config:
     MODELS_DIR = Path(os.getenv("MODELS_DIR", str(BASE_DIR / "models")))
     STATIC_DIR = Path(os.getenv("STATIC_DIR", str(BASE_DIR / "static")))
     LOG_DIR    = Path(os.getenv("LOG_DIR",    str(BASE_DIR / "logs")))
-        # LP optimizer constants
-    LP_SOLAR_BONUS_COEFF = 0.6
-    LP_PEAK_PENALTY_COEFF = 2.0
-    LP_VALLE_BONUS_COEFF = 0.5
-    LP_SOFT_PREF_PENALTY = 0.3
-
-    LP_SLOT_CAP_BASE_MULT = 1.0
-    LP_GOLDEN_CAP_MULT = 2.0
-    LP_SOLAR_CAP_MULT = 1.5
-    LP_HIGH_CAP_MULT = 0.6
-    LP_MIN_CAP_MULT = 0.25
-
-    # Appliance display metadata
+
+    # ── LP optimizer (optimizer.LPCoefficients) ───────────────
+    # Objective terms and adaptive slot-cap multipliers.  These are the
+    # defaults of LPCoefficients; `python -m app.sweep` evaluates others.
+    LP_SOLAR_BONUS_COEFF  = float(os.getenv("LP_SOLAR_BONUS_COEFF",  "0.6"))
+    LP_PEAK_PENALTY_COEFF = float(os.getenv("LP_PEAK_PENALTY_COEFF", "2.0"))
+    LP_VALLE_BONUS_COEFF  = float(os.getenv("LP_VALLE_BONUS_COEFF",  "0.5"))
+    LP_SOFT_PREF_PENALTY  = float(os.getenv("LP_SOFT_PREF_PENALTY",  "0.3"))
+
+    LP_SLOT_CAP_BASE_MULT = float(os.getenv("LP_SLOT_CAP_BASE_MULT", "1.0"))
+    LP_GOLDEN_CAP_MULT    = float(os.getenv("LP_GOLDEN_CAP_MULT",    "2.0"))
+    LP_SOLAR_CAP_MULT     = float(os.getenv("LP_SOLAR_CAP_MULT",     "1.5"))
+    LP_HIGH_CAP_MULT      = float(os.getenv("LP_HIGH_CAP_MULT",      "0.6"))
+    LP_MIN_CAP_MULT       = float(os.getenv("LP_MIN_CAP_MULT",       "0.25"))
+
+    # "joint" = one sparse LP for all appliances, "sequential" = notebook order
+    LP_SOLVE_MODE = os.getenv("LP_SOLVE_MODE", "joint").lower()
+
+    # ── Appliance display metadata ────────────────────────────
     APPL_NAMES = {
         "ac1_kwh": "AC Unit 1",
         "ac2_kwh": "AC Unit 2",
@@ -44,19 +50,7 @@ class Config:
         "wm_kwh": "#F39C12",
         "consumption_kwh": "#9B59B6"
     }
-        # LP optimizer constants
-    LP_SOLAR_BONUS_COEFF = 0.6
-    LP_HIGH_PRICE_PENALTY = 1.5
-    LP_LOW_PRICE_BONUS = 0.7
-    LP_VALLE_BONUS_COEFF = 0.5
-    LP_LLANO_PENALTY_COEFF = 0.2
-    LP_PEAK_PENALTY_COEFF = 2.0
-
-        # LP optimizer tuning
-    LP_SOLAR_BONUS_COEFF = 0.6
-    LP_HIGH_PRICE_PENALTY = 1.5
-    LP_LOW_PRICE_BONUS = 0.7
-    
+
     # ── Raw data files ────────────────────────────────────────
     HOUSE_PATH        = DATA_DIR / "H1_combined.csv"
     SOLAR_PATH        = DATA_DIR / "generation_final.csv"
@@ -65,6 +59,11 @@ class Config:
     PRICE_MERCADO     = DATA_DIR / "PrecioMercado.xlsx"
 
     # ── Persisted artefacts ───────────────────────────────────
+    MODEL_REGISTRY_DIR  = MODELS_DIR / "registry"        # native boosters + index
+    EVAL_STORE_DIR      = MODELS_DIR / "eval"            # train/test frames (on demand)
+    ARTEFACT_STORE_DIR  = MODELS_DIR / "store"           # sim frame + prices (mmap)
+    INPUT_CACHE_DIR     = MODELS_DIR / "inputs"          # parsed training inputs
+    # Legacy joblib artefacts — still loaded if no registry / store exists
     TRAINED_MODELS_PATH = MODELS_DIR / "trained_models.pkl"
     SOLAR_MODEL_PATH    = MODELS_DIR / "solar_model.pkl"
     SIM_FRAME_PATH      = MODELS_DIR / "sim_frame.pkl"
@@ -76,6 +75,83 @@ class Config:
     FLASK_DEBUG  = os.getenv("FLASK_DEBUG", "false").lower() == "true"
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
 
+    # ── Scheduling resolution ─────────────────────────────────
+    # Slot length in minutes (a divisor of 60) of the sim frame and of every
+    # LP horizon.  The hourly model output is split evenly into slots, so
+    # 15 plans 96-slot days.
+    SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "60"))
+
+    # ── Rolling planner (rolling.py) ──────────────────────────
+    # /api/next slides the plan one slot and re-solves a window from the
+    # start of the plan day to this many hours past the current slot
+    # (24–48 h at the default).  0 = /api/next only advances the clock.
+    ROLLING_HORIZON_HOURS = int(os.getenv("ROLLING_HORIZON_HOURS", "24"))
+
+    # ── Startup (startup.py) ──────────────────────────────────
+    # Load artefacts and solve the first schedule in a background thread;
+    # /health/ready turns 200 once done.  false = load inside create_app.
+    STARTUP_BACKGROUND = os.getenv("STARTUP_BACKGROUND", "true").lower() == "true"
+
+    # ── Price markets ─────────────────────────────────────────
+    # Extra tariffs served next to the trained one ("default"), as JSON:
+    #   {"pt": {"p33": 0.11, "p67": 0.16}, …}   — select with ?market= / "market"
+    PRICE_MARKETS = os.getenv("PRICE_MARKETS", "")
+
+    # ── Schedule cache (/api/regenerate) ──────────────────────
+    SCHEDULE_CACHE_SIZE     = int(os.getenv("SCHEDULE_CACHE_SIZE", "64"))
+    SCHEDULE_CACHE_WARMUP   = os.getenv("SCHEDULE_CACHE_WARMUP", "false").lower() == "true"
+    SCHEDULE_WARMUP_WORKERS = int(os.getenv("SCHEDULE_WARMUP_WORKERS", "2"))
+
+    # ── Backtest (backtest.py) ────────────────────────────────
+    # Days are solved in BACKTEST_WORKERS processes (0 = in-process) in
+    # partitions of BACKTEST_CHUNK_DAYS dates; partitions in flight are
+    # capped so that their estimated footprint stays under BACKTEST_MEMORY_MB.
+    BACKTEST_WORKERS    = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+    BACKTEST_CHUNK_DAYS = int(os.getenv("BACKTEST_CHUNK_DAYS", "7"))
+    BACKTEST_MEMORY_MB  = int(os.getenv("BACKTEST_MEMORY_MB", "512"))
+
+    # ── Household state (state_store.py) ──────────────────────
+    # memory | sqlite:///path/state.db | redis://host:6379/0 — anything but
+    # memory is shared between gunicorn workers.
+    STATE_STORE         = os.getenv("STATE_STORE", "memory")
+    STATE_STORE_RETRIES = int(os.getenv("STATE_STORE_RETRIES", "5"))
+    DEFAULT_HOUSEHOLD   = os.getenv("DEFAULT_HOUSEHOLD", "default")
+    # Version polling interval of the shared stores (SSE change detection)
+    STATE_POLL_SECONDS  = float(os.getenv("STATE_POLL_SECONDS", "0.5"))
+
+    # ── Response payloads (payload_cache.py) ──────────────────
+    PAYLOAD_CACHE_SIZE = int(os.getenv("PAYLOAD_CACHE_SIZE", "256"))
+
+    # ── Live updates (/api/stream) ────────────────────────────
+    STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+    # Streams close after this long; EventSource reconnects on its own
+    STREAM_MAX_SECONDS       = float(os.getenv("STREAM_MAX_SECONDS", "300"))
+
+    # ── Plug-event intake (/api/event) ────────────────────────
+    # Events of one household arriving within EVENT_COALESCE_MS of the
+    # first pending one are applied as a single reschedule.
+    EVENT_COALESCE_MS   = int(os.getenv("EVENT_COALESCE_MS", "200"))
+    EVENT_DEDUP_SECONDS = float(os.getenv("EVENT_DEDUP_SECONDS", "60"))
+    EVENT_WAIT_SECONDS  = float(os.getenv("EVENT_WAIT_SECONDS", "30"))   # synchronous POSTs
+    EVENT_TICKETS_KEPT  = int(os.getenv("EVENT_TICKETS_KEPT", "1024"))
+
+    # ── Training (train_models.py) ────────────────────────────
+    # TRAIN_CPU_BUDGET threads are split between TRAIN_WORKERS concurrent
+    # targets (0 = one per target) and each model's XGBoost n_jobs.
+    TRAIN_CPU_BUDGET = int(os.getenv("TRAIN_CPU_BUDGET", str(os.cpu_count() or 1)))
+    TRAIN_WORKERS    = int(os.getenv("TRAIN_WORKERS", "0"))
+    # Rows per read_csv chunk when streaming H1_combined.csv to hourly
+    HOUSE_CHUNK_ROWS = int(os.getenv("HOUSE_CHUNK_ROWS", "500000"))
+    # Boosting rounds added per model by `train_models --update`
+    UPDATE_BOOST_ROUNDS = int(os.getenv("UPDATE_BOOST_ROUNDS", "20"))
+
+    # ── On-demand forecasts (/api/forecast) ───────────────────
+    FORECAST_CACHE_SIZE      = int(os.getenv("FORECAST_CACHE_SIZE", "256"))   # dates
+    FORECAST_MAX_DAYS_AHEAD  = int(os.getenv("FORECAST_MAX_DAYS_AHEAD", "7"))
+
+    # ── Instrumentation (metrics.py, GET /metrics) ────────────
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
     # ── Logging ───────────────────────────────────────────────
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
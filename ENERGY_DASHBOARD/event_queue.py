@@ -0,0 +1,234 @@
+"""
+event_queue.py — coalescing intake queue for smart-plug / override events.
+
+A burst of plug telemetry (a washing machine toggling on and off, several
+appliances started together) used to run one reschedule per POST.  Events
+are now queued per household and applied together once a short window
+(Config.EVENT_COALESCE_MS) after the first pending one has passed:
+
+  - within a batch only the last event per appliance is applied, in
+    arrival order — earlier ones would be overridden anyway
+  - identical events (appliance, slot, event_type) within
+    Config.EVENT_DEDUP_SECONDS are rejected at submit time through a
+    dict index instead of a scan of the override history
+  - every submit returns a Ticket; clients wait on it, poll it or stream
+    it (see the /api/event routes in app.py)
+
+The window is not extended by later events, so an event waits at most
+one window plus the batch's solve time.  A single worker thread applies
+the batches, so the apply callback never runs concurrently with itself.
+Queue, tickets and dedup index live in the worker process that received
+the event; the household state they update is shared (state_store.py).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Ticket:
+    id:        str
+    household: str
+    event:     dict
+    status:    str = "queued"          # queued | done | duplicate | error
+    result:    Optional[dict] = None
+    error:     Optional[str]  = None
+    merged:    int = 0                 # events in the batch that resolved it
+    duplicate_of: Optional[str] = None
+    created:   float = field(default_factory=time.time)
+    _done:     threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def summary(self) -> dict:
+        """JSON-ready view without the result body."""
+        return {
+            "ticket":    self.id,
+            "household": self.household,
+            "status":    self.status,
+            "merged":    self.merged,
+            "duplicate_of": self.duplicate_of,
+            "error":     self.error,
+            "created":   self.created,
+        }
+
+    def _finish(self, status: str, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+        self.status, self.result, self.error = status, result, error
+        self._done.set()
+
+
+def dedup_key(event: dict) -> tuple:
+    slot = int(event.get("minute", 0)) // Config.SLOT_MINUTES
+    return (event["appliance_key"], int(event["hour"]), slot, event["event_type"])
+
+
+class EventQueue:
+    """
+    apply(household, events) runs the merged events of one batch and
+    returns the response body every ticket of the batch resolves to.
+    """
+
+    def __init__(
+        self,
+        apply:         Callable[[str, list], dict],
+        window_ms:     int   = Config.EVENT_COALESCE_MS,
+        dedup_seconds: float = Config.EVENT_DEDUP_SECONDS,
+        max_tickets:   int   = Config.EVENT_TICKETS_KEPT,
+    ) -> None:
+        self.apply         = apply
+        self.window        = max(int(window_ms), 0) / 1000.0
+        self.dedup_seconds = float(dedup_seconds)
+        self.max_tickets   = max(int(max_tickets), 1)
+        self.batches       = 0
+        self.coalesced     = 0               # events dropped by merging
+        self.duplicates    = 0
+
+        self._cond     = threading.Condition()
+        self._pending: dict[str, list] = {}   # household → [Ticket]
+        self._due:     dict[str, float] = {}  # household → monotonic flush time
+        self._recent:  dict[tuple, tuple] = {}  # (household, *dedup_key) → (accepted at, Ticket)
+        self._tickets: OrderedDict = OrderedDict()
+        self._worker:  Optional[threading.Thread] = None
+        self._closed   = False
+
+    # ── Intake ────────────────────────────────────────────────
+
+    def submit(self, household: str, event: dict) -> Ticket:
+        """
+        Queue one event.  Duplicates come back already finished, with
+        duplicate_of naming the ticket of the event they repeat; repeating
+        an event whose batch failed queues it again.
+        """
+        ticket = Ticket(uuid.uuid4().hex, household, event)
+        key    = (household, *dedup_key(event))
+        now    = time.monotonic()
+        with self._cond:
+            self._remember(ticket)
+            seen = self._recent.get(key)
+            if (seen is not None and now - seen[0] < self.dedup_seconds
+                    and seen[1].status != "error"):
+                self.duplicates += 1
+                ticket.duplicate_of = seen[1].id
+                ticket._finish("duplicate")
+                return ticket
+            self._recent[key] = (now, ticket)
+
+            self._pending.setdefault(household, []).append(ticket)
+            if household not in self._due:
+                self._due[household] = now + self.window
+            self._ensure_worker()
+            self._cond.notify()
+        return ticket
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        with self._cond:
+            return self._tickets.get(ticket_id)
+
+    def forget(self, household: str) -> None:
+        """Drop the dedup index of a household (its schedule was replaced)."""
+        with self._cond:
+            for key in [k for k in self._recent if k[0] == household]:
+                del self._recent[key]
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(v) for v in self._pending.values())
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # ── Worker ────────────────────────────────────────────────
+
+    def _remember(self, ticket: Ticket) -> None:
+        self._tickets[ticket.id] = ticket
+        while len(self._tickets) > self.max_tickets:
+            oldest = next(iter(self._tickets.values()))
+            if not oldest.finished:
+                break
+            self._tickets.popitem(last=False)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._run, name="event-queue", daemon=True,
+            )
+            self._worker.start()
+
+    def _next_batch(self) -> Optional[tuple[str, list]]:
+        """Block until a household's window has passed (None once closed)."""
+        while not self._closed:
+            if not self._due:
+                self._cond.wait()
+                continue
+            household = min(self._due, key=self._due.get)
+            delay     = self._due[household] - time.monotonic()
+            if delay > 0:
+                self._cond.wait(delay)
+                continue
+            del self._due[household]
+            return household, self._pending.pop(household, [])
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+            self._flush(*batch)
+
+    def _flush(self, household: str, tickets: list) -> None:
+        if not tickets:
+            return
+        # last event per appliance, in the order those last events arrived
+        last: dict = {}
+        for t in tickets:
+            last.pop(t.event["appliance_key"], None)
+            last[t.event["appliance_key"]] = t.event
+        events = list(last.values())
+
+        try:
+            result = self.apply(household, events)
+        except Exception as exc:
+            logger.exception("Event batch failed for %s", household)
+            failed = set(map(id, tickets))
+            with self._cond:
+                # nothing was applied: a retry must not come back "duplicate"
+                for t in tickets:
+                    key = (household, *dedup_key(t.event))
+                    if key in self._recent and id(self._recent[key][1]) in failed:
+                        del self._recent[key]
+            for t in tickets:
+                t.merged = len(tickets)
+                t._finish("error", error=str(exc))
+            return
+
+        with self._cond:
+            self.batches   += 1
+            self.coalesced += len(tickets) - len(events)
+            cutoff = time.monotonic() - self.dedup_seconds
+            for key in [k for k, v in self._recent.items() if v[0] < cutoff]:
+                del self._recent[key]
+        for t in tickets:
+            t.merged = len(tickets)
+            t._finish("done", result=result)
+        logger.info(
+            "Event batch %s: %d event(s) → %d applied", household, len(tickets), len(events),
+        )
@@ -0,0 +1,366 @@
+"""
+forecast.py — on-demand 24 h forecasts for any date.
+
+The sim frame only covers the test split written by train_models, so no
+other date could be planned.  Forecaster predicts any run of days from
+the hourly history kept in the artefact store (house_history,
+solar_history) and returns rows in the sim-frame schema, ready for
+SimFrameIndex / generate_morning_schedule.
+
+  - calendar / price columns are built once per run and shared by every
+    target; lag / rolling columns come from cumulative sums over one
+    hourly grid, so features for a whole run are a handful of array ops
+  - all boosters predict straight from NumPy matrices (XGBoost
+    inplace_predict, LightGBM Booster.predict) — no DataFrame per target
+  - hours after the end of the history are forecast recursively: each
+    hour's prediction becomes the lag input of the next one
+  - results are memoised per (date, model version) in an LRU
+
+Predictions use the same blend as build_sim_frame(): 0.7 · clipped model
+output + 0.3 · previous hour.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.artefacts import ArtefactStore
+from app.config import Config
+from app.utils import (
+    BAND_HIGH,
+    BAND_LOW,
+    ConstantPredictor,
+    PriceBandModel,
+    enrich_sim_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK     = 168                 # hours of history behind every forecast hour
+_ONE_HOUR    = np.timedelta64(1, "h")
+_APPL_CLIP   = 2.0                 # build_sim_frame() clips appliance preds at 2 kWh
+_SIM_TARGETS = ["ac1_kwh", "ac2_kwh", "boiler_kwh", "fridge_kwh", "wm_kwh"]
+
+
+# ══════════════════════════════════════════════════════════════════
+# Feature blocks (NumPy mirror of train_models.build_features)
+# ══════════════════════════════════════════════════════════════════
+
+def _calendar(ts: np.ndarray, prices: np.ndarray, bands: PriceBandModel) -> dict:
+    idx   = pd.DatetimeIndex(ts)
+    hour  = idx.hour.to_numpy()
+    dow   = idx.dayofweek.to_numpy()
+    month = idx.month.to_numpy()
+    band  = bands.codes(prices)
+    return {
+        "hour":          hour,
+        "dayofweek":     dow,
+        "month":         month,
+        "day_of_year":   idx.dayofyear.to_numpy(),
+        "is_weekend":    (dow >= 5).astype(int),
+        "is_high_price": (band == BAND_HIGH).astype(int),
+        "is_low_price":  (band == BAND_LOW).astype(int),
+        "is_morning":    ((hour >= 6) & (hour <= 10)).astype(int),
+        "is_evening":    ((hour >= 17) & (hour <= 22)).astype(int),
+        "is_summer":     np.isin(month, [6, 7, 8, 9]).astype(int),
+        "is_winter":     np.isin(month, [12, 1, 2, 3]).astype(int),
+        "is_daylight":   ((hour >= 6) & (hour <= 21)).astype(int),
+        "is_peak_solar": ((hour >= 10) & (hour <= 15)).astype(int),
+        "hour_sin":      np.sin(2 * np.pi * hour / 24),
+        "hour_cos":      np.cos(2 * np.pi * hour / 24),
+        "dow_sin":       np.sin(2 * np.pi * dow / 7),
+        "dow_cos":       np.cos(2 * np.pi * dow / 7),
+        "month_sin":     np.sin(2 * np.pi * month / 12),
+        "month_cos":     np.cos(2 * np.pi * month / 12),
+    }
+
+
+class _Windows:
+    """Trailing-window sums over y[t-w : t] (NaN-aware) via cumulative sums."""
+
+    def __init__(self, y: np.ndarray) -> None:
+        ok        = ~np.isnan(y)
+        v         = np.where(ok, y, 0.0)
+        self.cnt  = np.concatenate([[0], np.cumsum(ok)])
+        self.sum  = np.concatenate([[0.0], np.cumsum(v)])
+        self.sum2 = np.concatenate([[0.0], np.cumsum(v * v)])
+
+    def _span(self, acc: np.ndarray, rows: np.ndarray, w: int) -> np.ndarray:
+        return acc[rows] - acc[rows - w]
+
+    def mean(self, rows: np.ndarray, w: int, min_periods: int) -> np.ndarray:
+        c = self._span(self.cnt, rows, w)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            m = self._span(self.sum, rows, w) / c
+        return np.where(c >= min_periods, m, np.nan)
+
+    def std(self, rows: np.ndarray, w: int, min_periods: int) -> np.ndarray:
+        c  = self._span(self.cnt, rows, w)
+        s  = self._span(self.sum, rows, w)
+        s2 = self._span(self.sum2, rows, w)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = np.maximum(s2 - s * s / c, 0.0) / (c - 1)
+        return np.where((c >= min_periods) & (c > 1), np.sqrt(var), np.nan)
+
+
+def _lag_block(y: np.ndarray, rows: np.ndarray, cons: Optional[np.ndarray] = None) -> dict:
+    """Lag / rolling / diff features of target series y at grid rows."""
+    w = _Windows(y)
+    f = {f"lag_{k}h": y[rows - k] for k in (1, 2, 3, 24, 168)}
+    f["roll_mean_6h"]   = w.mean(rows, 6, 3)
+    f["roll_mean_3h"]   = w.mean(rows, 3, 1)
+    f["roll_mean_24h"]  = w.mean(rows, 24, 12)
+    f["roll_std_24h"]   = np.nan_to_num(w.std(rows, 24, 12), nan=0.0)
+    f["roll_mean_168h"] = w.mean(rows, 168, 48)
+    f["diff_1h"]        = y[rows - 1] - y[rows - 2]
+    f["diff_24h"]       = y[rows - 24] - y[rows - 48]
+    if cons is not None:
+        f["total_cons_lag1"]   = cons[rows - 1]
+        f["total_cons_roll24"] = _Windows(cons).mean(rows, 24, 6)
+    return f
+
+
+def _solar_block(s: np.ndarray, rows: np.ndarray) -> dict:
+    return {"solar_lag_1h": s[rows - 1], "solar_lag_24h": s[rows - 24]}
+
+
+def _matrix(cols: dict, features: list) -> np.ndarray:
+    return np.column_stack([np.asarray(cols[f], dtype=float) for f in features])
+
+
+def _predictor(model):
+    """NumPy-in / NumPy-out predict function for any registry model."""
+    if isinstance(model, ConstantPredictor):
+        return lambda X: np.full(len(X), model.val)
+    if hasattr(model, "get_booster"):                  # XGBRegressor
+        booster = model.get_booster()
+        return lambda X: booster.inplace_predict(X)
+    return model.predict                                # lgb.Booster / sklearn
+
+
+def _align(src_ts: np.ndarray, src_val: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Values of a sorted hourly series on grid timestamps (NaN where absent)."""
+    out = np.full(len(grid), np.nan)
+    if len(src_ts) == 0:
+        return out
+    pos = np.clip(np.searchsorted(src_ts, grid), 0, len(src_ts) - 1)
+    hit = src_ts[pos] == grid
+    out[hit] = src_val[pos[hit]]
+    return out
+
+
+# ══════════════════════════════════════════════════════════════════
+# Forecaster
+# ══════════════════════════════════════════════════════════════════
+
+class Forecaster:
+    """
+    Memoised day-ahead forecasts in sim-frame schema.
+
+    Returned frames are shared between callers — treat them as read-only.
+    """
+
+    def __init__(
+        self,
+        trained_models: dict,
+        solar_model,
+        house_history:  pd.DataFrame,
+        solar_history:  pd.DataFrame,
+        df_fac:         pd.DataFrame,
+        bands:          PriceBandModel,
+        version:        str = "",
+        cache_size:     int = Config.FORECAST_CACHE_SIZE,
+    ) -> None:
+        self.version = version
+        self.bands   = bands              # training thresholds (model features)
+        self.targets = [t for t in trained_models if t in house_history.columns]
+        if "consumption_kwh" not in self.targets:
+            raise ValueError("Forecaster needs a consumption_kwh model and history")
+
+        self._features = {t: list(trained_models[t]["features"]) for t in self.targets}
+        self._clip     = {
+            t: (trained_models[t].get("clip", (0.0, None))[1]
+                if t == "consumption_kwh" else _APPL_CLIP)
+            for t in self.targets
+        }
+        self._predict  = {t: _predictor(trained_models[t]["model"]) for t in self.targets}
+        self._solar    = _predictor(solar_model) if solar_model is not None else None
+
+        self._h_ts  = house_history["timestamp"].to_numpy(dtype="datetime64[ns]")
+        self._h_val = {t: house_history[t].to_numpy(dtype=float) for t in self.targets}
+        self._s_ts  = solar_history["timestamp"].to_numpy(dtype="datetime64[ns]")
+        self._s_val = solar_history["solar_kwh"].to_numpy(dtype=float)
+
+        # Prices: real PVPC where known, else the same hour-of-week from
+        # the last week of the price file
+        self._p_ts  = df_fac["timestamp"].to_numpy(dtype="datetime64[ns]")
+        self._p_val = df_fac["price_facturacion"].to_numpy(dtype=float)
+        last_week   = df_fac.tail(168)
+        how         = (last_week["timestamp"].dt.dayofweek * 24
+                       + last_week["timestamp"].dt.hour).to_numpy()
+        self._p_how = np.full(168, np.nanmean(self._p_val) if len(self._p_val) else 0.0)
+        self._p_how[how] = last_week["price_facturacion"].to_numpy(dtype=float)
+
+        self.maxsize = max(int(cache_size), 1)
+        self.hits    = 0
+        self.misses  = 0
+        self._memo: OrderedDict = OrderedDict()
+        self._lock   = threading.Lock()
+
+    @classmethod
+    def from_store(
+        cls,
+        trained_models: dict,
+        solar_model,
+        store: ArtefactStore,
+        registry_version: str = "",
+    ) -> Optional["Forecaster"]:
+        """None when the store predates the history tables."""
+        if not {"house_history", "solar_history", "df_fac"} <= set(store.tables):
+            logger.warning("Artefact store has no history tables — forecasts disabled")
+            return None
+        return cls(
+            trained_models, solar_model,
+            store.table("house_history"), store.table("solar_history"),
+            store.table("df_fac"), PriceBandModel.from_meta(store.meta),
+            version=f"{registry_version}/{store.generation}",
+        )
+
+    # ── Public API ────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self._memo)
+
+    @property
+    def history_end(self) -> pd.Timestamp:
+        return pd.Timestamp(self._h_ts[-1])
+
+    @property
+    def next_date(self) -> str:
+        """First date after the end of the house history ("tomorrow")."""
+        return (self.history_end + pd.Timedelta(hours=1)).strftime("%Y-%m-%d")
+
+    def forecast(self, date: Optional[str] = None, days: int = 1) -> pd.DataFrame:
+        """
+        Sim-frame rows for `days` consecutive dates starting at `date`
+        (default: next_date).  Dates not yet memoised are forecast in one
+        pass.  Raises ValueError if `date` is before the history or more
+        than Config.FORECAST_MAX_DAYS_AHEAD days after it.
+        """
+        start = np.datetime64(pd.Timestamp(date or self.next_date).normalize(), "D")
+        dates = [str(start + np.timedelta64(i, "D")) for i in range(max(int(days), 1))]
+
+        first_ok = np.datetime64(self._h_ts[0], "D")
+        last_ok  = np.datetime64(self.next_date) + np.timedelta64(
+            Config.FORECAST_MAX_DAYS_AHEAD - 1, "D")
+        if not first_ok <= start <= last_ok:
+            raise ValueError(f"Forecast start date must lie within {first_ok} … {last_ok}")
+
+        with self._lock:
+            cached = {d: self._memo.get((d, self.version)) for d in dates}
+            for d, f in cached.items():
+                if f is not None:
+                    self._memo.move_to_end((d, self.version))
+            missing = [d for d, f in cached.items() if f is None]
+            self.hits   += len(dates) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # future dates are forecast recursively from the end of history
+            first = min(missing[0], self.next_date)
+            frame = self._run(first, missing[-1])
+            day   = frame["timestamp"].dt.strftime("%Y-%m-%d").to_numpy()
+            with self._lock:
+                for d in np.unique(day):
+                    part = frame[day == d].reset_index(drop=True)
+                    if d in cached:
+                        cached[d] = part
+                    self._memo[(d, self.version)] = part
+                while len(self._memo) > self.maxsize:
+                    self._memo.popitem(last=False)
+
+        return pd.concat([cached[d] for d in dates], ignore_index=True)
+
+    # ── Core ──────────────────────────────────────────────────
+
+    def _prices(self, ts: np.ndarray) -> np.ndarray:
+        p    = _align(self._p_ts, self._p_val, ts)
+        gap  = np.isnan(p)
+        if gap.any():
+            idx    = pd.DatetimeIndex(ts[gap])
+            p[gap] = self._p_how[idx.dayofweek * 24 + idx.hour]
+        return p
+
+    def _run(self, first: str, last: str) -> pd.DataFrame:
+        t0   = np.datetime64(first, "h")
+        t1   = np.datetime64(last, "h") + 24 * _ONE_HOUR
+        grid = np.arange(t0 - LOOKBACK * _ONE_HOUR, t1, _ONE_HOUR).astype("datetime64[ns]")
+        rows = np.arange(LOOKBACK, len(grid))
+        ts   = grid[rows]
+        cal  = _calendar(ts, self._prices(ts), self.bands)
+
+        # Actuals on the grid; hours after the history are forecast
+        y     = {t: _align(self._h_ts, self._h_val[t], grid) for t in self.targets}
+        solar = _align(self._s_ts, self._s_val, grid)
+        last_house = np.datetime64(self.history_end, "ns")
+        last_solar = self._s_ts[-1] if len(self._s_ts) else grid[0]
+
+        pred   = {t: np.full(len(rows), np.nan) for t in self.targets}
+        s_pred = np.zeros(len(rows))
+
+        # One pass over every hour whose lag_1h is an actual …
+        known = np.flatnonzero(grid[rows - 1] <= last_house)
+        if len(known):
+            self._predict_rows(y, rows[known], known, cal, pred)
+        # … then hour by hour, feeding predictions back in as lags
+        for i in np.flatnonzero(grid[rows - 1] > last_house):
+            self._predict_rows(y, rows[i:i + 1], np.array([i]), cal, pred)
+            for t in self.targets:
+                y[t][rows[i]] = pred[t][i]
+
+        if self._solar is not None:
+            known = np.flatnonzero(grid[rows - 1] <= last_solar)
+            if len(known):
+                s_pred[known] = self._predict_solar(solar, rows[known], known, cal)
+            for i in np.flatnonzero(grid[rows - 1] > last_solar):
+                s_pred[i] = self._predict_solar(solar, rows[i:i + 1], np.array([i]), cal)[0]
+                solar[rows[i]] = s_pred[i]
+
+        frame = pd.DataFrame({
+            "timestamp":                 ts,
+            "actual_consumption_kwh":    _align(self._h_ts, self._h_val["consumption_kwh"], ts),
+            "predicted_consumption_kwh": pred["consumption_kwh"],
+            "predicted_solar_kwh":       s_pred,
+        })
+        for t in _SIM_TARGETS:
+            if t in pred:
+                frame[f"pred_{t}"] = np.nan_to_num(pred[t], nan=0.0)
+
+        prices = pd.DataFrame({"timestamp": ts, "price_facturacion": self._prices(ts)})
+        return enrich_sim_frame(frame, prices, self.bands)
+
+    def _predict_rows(self, y: dict, rows: np.ndarray, out: np.ndarray, cal: dict, pred: dict) -> None:
+        calr = {k: v[out] for k, v in cal.items()}
+        # only the LOOKBACK window behind the rows matters
+        lo   = rows[0] - LOOKBACK
+        rows = rows - lo
+        cons = y["consumption_kwh"][lo:lo + rows[-1] + 1]
+        for t in self.targets:
+            yt   = y[t][lo:lo + rows[-1] + 1]
+            lags = _lag_block(yt, rows, cons if t != "consumption_kwh" else None)
+            X    = _matrix({**calr, **lags}, self._features[t])
+            raw  = np.clip(self._predict[t](X), 0, self._clip[t])
+            prev = lags["lag_1h"]
+            pred[t][out] = np.where(np.isnan(prev), raw, 0.7 * raw + 0.3 * prev)
+
+    def _predict_solar(self, s: np.ndarray, rows: np.ndarray, out: np.ndarray, cal: dict) -> np.ndarray:
+        calr = {k: v[out] for k, v in cal.items()}
+        lo   = rows[0] - LOOKBACK
+        X    = _matrix({**calr, **_solar_block(s[lo:rows[-1] + 1], rows - lo)},
+                       Config.SOLAR_FEATURES)
+        return np.clip(self._solar(X), 0, None)
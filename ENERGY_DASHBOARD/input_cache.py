@@ -0,0 +1,105 @@
+"""
+input_cache.py — content-hashed cache of parsed training inputs.
+
+Parsing the PVPC workbook and the house / solar CSVs dominates a retrain
+that only changes hyper-parameters.  The cleaned frames (df_fac,
+house_hourly, solar_hourly) are kept as columnar stores (artefacts.py),
+each tagged with a key built from the SHA-256 of its source file(s), and
+reused as long as that key matches.
+
+Layout under Config.INPUT_CACHE_DIR:
+    digests.json       — path → {size, mtime_ns, sha256}; files whose size
+                         and mtime are unchanged are not re-hashed
+    <name>/            — one artefact store per cached input
+
+Bump CACHE_VERSION whenever the cleaning logic in train_models changes.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.artefacts import ArtefactStore, save_store
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 3
+_BLOCK        = 1 << 20
+
+
+class InputCache:
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = Path(root or Config.INPUT_CACHE_DIR)
+        self._digest_path = self.root / "digests.json"
+        try:
+            self._digests: dict = json.loads(self._digest_path.read_text())
+        except (OSError, ValueError):
+            self._digests = {}
+
+    # ── Keys ──────────────────────────────────────────────────
+
+    def digest(self, path: Path) -> str:
+        """SHA-256 of a file's content (re-hashed only if size / mtime changed)."""
+        path = Path(path).resolve()
+        st   = path.stat()
+        memo = self._digests.get(str(path))
+        if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+            return memo["sha256"]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            while block := f.read(_BLOCK):
+                h.update(block)
+        self._digests[str(path)] = {
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest(),
+        }
+        self._save_digests()
+        return h.hexdigest()
+
+    @staticmethod
+    def key(*parts) -> str:
+        h = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        for p in parts:
+            h.update(b"\0" + str(p).encode())
+        return h.hexdigest()
+
+    def _save_digests(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._digest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._digests, indent=1))
+        os.replace(tmp, self._digest_path)
+
+    # ── Entries ───────────────────────────────────────────────
+
+    def load(self, name: str, key: Optional[str] = None) -> Optional[tuple[dict, dict]]:
+        """
+        ({table: DataFrame}, meta) if <name> was saved under key, else None.
+        key=None returns whatever is stored (meta["key"] says under what).
+        """
+        root = self.root / name
+        if not ArtefactStore.exists(root):
+            return None
+        try:
+            store = ArtefactStore(root)
+        except ValueError as exc:
+            logger.warning("Input cache %s unreadable (%s) — re-parsing", name, exc)
+            return None
+        if store.meta.get("cache_version") != CACHE_VERSION:
+            return None
+        if key is not None and store.meta.get("key") != key:
+            return None
+        tables = {t: store.table(t, mmap=False, categorical=False) for t in store.tables}
+        return tables, dict(store.meta)
+
+    def save(self, name: str, key: str, tables: dict, meta: Optional[dict] = None) -> None:
+        save_store(
+            tables,
+            {**(meta or {}), "key": key, "cache_version": CACHE_VERSION},
+            root=self.root / name,
+        )
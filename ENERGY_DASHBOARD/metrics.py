@@ -0,0 +1,170 @@
+"""
+metrics.py — lightweight timers, counters and histograms exposed in the
+Prometheus text format (GET /metrics).
+
+    with stage("frame_select"):          # energy_stage_seconds{stage=…}
+        ...
+    LP_ITERATIONS.inc(result.nit, kind="joint")
+
+Instruments are module-level singletons registered in REGISTRY; every
+observation is a lock plus a bisect, so timers can sit on hot paths.
+Values are per process — with several gunicorn workers each one
+reports its own series and Prometheus aggregates across scrapes.
+Config.METRICS_ENABLED=false turns recording and /metrics off.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from app.config import Config
+
+# Seconds: sub-millisecond mask building up to multi-second LP solves
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# LP variables / constraints
+SIZE_BUCKETS = (10, 25, 50, 100, 200, 400, 800, 1600, 3200, 6400)
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(names, values)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: tuple = ()) -> None:
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(k, "")) for k in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def total(self) -> float:
+        """Sum over every label set."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> list:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labels, k)} {v:g}"
+                    for k, v in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets: tuple = TIME_BUCKETS) -> None:
+        self.name, self.doc, self.labels = name, doc, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict = {}               # labels → [bucket counts…, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        if not Config.METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(k, "")) for k in self.labels)
+        i   = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def totals(self) -> tuple[float, int]:
+        """(sum, count) over every label set."""
+        with self._lock:
+            return (sum(s[-2] for s in self._series.values()),
+                    sum(s[-1] for s in self._series.values()))
+
+    def render(self) -> list:
+        lines = []
+        with self._lock:
+            series = {k: list(v) for k, v in sorted(self._series.items())}
+        for key, s in series.items():
+            names, cum = self.labels + ("le",), 0
+            for bound, n in zip(self.buckets, s):
+                cum += n
+                lines.append(f"{self.name}_bucket{_labels(names, key + (f'{bound:g}',))} {cum}")
+            lines.append(f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {s[-2]:.6g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {s[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        out = []
+        for m in self._metrics:
+            out.append(f"# HELP {m.name} {m.doc}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "energy_http_request_seconds", "Request wall time by route",
+    labels=("route", "method", "status"),
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "energy_stage_seconds", "Wall time of instrumented hot-path stages",
+    labels=("stage",),
+))
+LP_SOLVE_SECONDS = REGISTRY.register(Histogram(
+    "energy_lp_solve_seconds", "Time inside linprog (HiGHS) per solve",
+    labels=("kind",),
+))
+LP_VARIABLES = REGISTRY.register(Histogram(
+    "energy_lp_variables", "LP size: variables per solve",
+    labels=("kind",), buckets=SIZE_BUCKETS,
+))
+LP_CONSTRAINTS = REGISTRY.register(Histogram(
+    "energy_lp_constraints", "LP size: equality + inequality rows per solve",
+    labels=("kind",), buckets=SIZE_BUCKETS,
+))
+LP_SOLVES = REGISTRY.register(Counter(
+    "energy_lp_solves_total", "linprog calls by kind and outcome",
+    labels=("kind", "status"),
+))
+LP_ITERATIONS = REGISTRY.register(Counter(
+    "energy_lp_iterations_total", "Solver iterations summed over solves",
+    labels=("kind",),
+))
+
+
+def stage(name: str):
+    """Context manager timing one stage into energy_stage_seconds."""
+    return STAGE_SECONDS.time(stage=name)
+
+
+def render() -> str:
+    return REGISTRY.render()
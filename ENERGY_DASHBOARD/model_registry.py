@@ -0,0 +1,235 @@
+"""
+model_registry.py — slim per-target model registry.
+
+Replaces trained_models.pkl / solar_model.pkl, which carried the train
+and test feature frames next to every model.  At runtime only the model,
+its feature list and its clip bounds are needed; the evaluation frames
+go to a separate columnar store (artefacts.py) and are mapped only when
+something actually asks for entry["train"] / entry["test"].
+
+Layout under Config.MODEL_REGISTRY_DIR:
+    index.json                   — per target: kind, file, features, clip …
+    <generation>/<target>.ubj    — XGBoost booster (native UBJSON)
+    <generation>/solar.txt       — LightGBM booster (native text)
+ConstantPredictor targets (fridge) have no file; the value is in index.json.
+
+Evaluation frames: Config.EVAL_STORE_DIR, tables "<target>__train" / "__test".
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.artefacts import ArtefactStore, save_store
+from app.config import Config
+from app.utils import ConstantPredictor
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_EVAL_SPLITS   = ("train", "test")
+
+
+# ══════════════════════════════════════════════════════════════════
+# Registry entry
+# ══════════════════════════════════════════════════════════════════
+
+class ModelEntry(Mapping):
+    """
+    Read-only view with the same keys as a trained_models.pkl entry.
+    "model", "features" and "clip" are in memory; "train" / "test" are
+    mapped from the eval store on first access.
+    """
+
+    def __init__(self, target: str, model, features: list, clip: tuple,
+                 n_test: int = 0, eval_root: Optional[Path] = None) -> None:
+        self.target    = target
+        self.model     = model
+        self.features  = list(features)
+        self.clip      = tuple(clip)
+        self.n_test    = int(n_test)
+        self._eval     = eval_root
+        self._store: Optional[ArtefactStore] = None
+        self._frames: dict = {}
+
+    def _eval_store(self) -> Optional[ArtefactStore]:
+        if self._store is None and self._eval is not None and ArtefactStore.exists(self._eval):
+            self._store = ArtefactStore(self._eval)
+        return self._store
+
+    def _has_eval(self, split: str) -> bool:
+        store = self._eval_store()
+        return store is not None and f"{self.target}__{split}" in store.tables
+
+    def __getitem__(self, key: str):
+        if key == "model":
+            return self.model
+        if key == "features":
+            return self.features
+        if key == "clip":
+            return self.clip
+        if key in _EVAL_SPLITS and self._has_eval(key):
+            if key not in self._frames:
+                logger.info("Loading %s eval frame for %s", key, self.target)
+                self._frames[key] = self._eval_store().table(f"{self.target}__{key}")
+            return self._frames[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from ("model", "features", "clip")
+        for split in _EVAL_SPLITS:
+            if self._has_eval(split):
+                yield split
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def predict_test(entry) -> np.ndarray:
+    """
+    entry["model"].predict(entry["test"][entry["features"]]) without
+    mapping the test frame for constant models.
+    """
+    model = entry["model"]
+    if isinstance(model, ConstantPredictor) and getattr(entry, "n_test", 0):
+        return np.full(entry.n_test, model.val)
+    return model.predict(entry["test"][entry["features"]])
+
+
+# ══════════════════════════════════════════════════════════════════
+# Writer
+# ══════════════════════════════════════════════════════════════════
+
+def save_registry(
+    trained_models: dict,
+    solar_model=None,
+    root:      Optional[Path] = None,
+    eval_root: Optional[Path] = None,
+) -> Path:
+    """
+    Persist train_all_models() output (+ the solar model) as native
+    boosters and move the train/test frames to the eval store.
+    """
+    root      = Path(root or Config.MODEL_REGISTRY_DIR)
+    eval_root = Path(eval_root or Config.EVAL_STORE_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+
+    generation = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    gen_dir    = root / generation
+    gen_dir.mkdir()
+
+    index       = {"format": FORMAT_VERSION, "generation": generation, "targets": {}}
+    eval_tables = {}
+
+    for target, info in trained_models.items():
+        model = info["model"]
+        entry = {
+            "features": list(info["features"]),
+            "clip":     list(info.get("clip", (0.0, None))),
+            "n_test":   len(info["test"]) if "test" in info else 0,
+        }
+        if isinstance(model, ConstantPredictor):
+            entry.update(kind="constant", value=model.val)
+        else:
+            fname = f"{target}.ubj"
+            model.save_model(gen_dir / fname)
+            entry.update(kind="xgboost", file=fname)
+        index["targets"][target] = entry
+
+        for split in _EVAL_SPLITS:
+            if split in info:
+                eval_tables[f"{target}__{split}"] = info[split]
+
+    if solar_model is not None:
+        # LGBMRegressor from training, or the bare Booster the registry loads
+        booster = getattr(solar_model, "booster_", solar_model)
+        booster.save_model(str(gen_dir / "solar.txt"))
+        index["solar"] = {
+            "kind":     "lightgbm",
+            "file":     "solar.txt",
+            "features": list(Config.SOLAR_FEATURES),
+        }
+
+    if eval_tables:
+        save_store(eval_tables, {}, root=eval_root)
+
+    tmp = root / f".index-{generation}.json"
+    tmp.write_text(json.dumps(index, indent=1))
+    os.replace(tmp, root / "index.json")
+
+    for old in root.iterdir():
+        if old.is_dir() and old.name != generation:
+            shutil.rmtree(old, ignore_errors=True)
+
+    logger.info(
+        "  registry: %d targets%s → %s",
+        len(index["targets"]), " + solar" if solar_model is not None else "", root,
+    )
+    return root / "index.json"
+
+
+# ══════════════════════════════════════════════════════════════════
+# Reader
+# ══════════════════════════════════════════════════════════════════
+
+def registry_exists(root: Optional[Path] = None) -> bool:
+    return (Path(root or Config.MODEL_REGISTRY_DIR) / "index.json").exists()
+
+
+def registry_version(root: Optional[Path] = None) -> str:
+    """Generation id of the current registry — changes on every save."""
+    index = json.loads((Path(root or Config.MODEL_REGISTRY_DIR) / "index.json").read_text())
+    return index["generation"]
+
+
+def _load_model(kind: str, path: Path, value: Optional[float] = None):
+    if kind == "constant":
+        return ConstantPredictor(value)
+    if kind == "xgboost":
+        import xgboost as xgb
+        model = xgb.XGBRegressor()
+        model.load_model(path)
+        return model
+    if kind == "lightgbm":
+        import lightgbm as lgb
+        return lgb.Booster(model_file=str(path))
+    raise ValueError(f"Unknown model kind: {kind!r}")
+
+
+def load_registry(
+    root:      Optional[Path] = None,
+    eval_root: Optional[Path] = None,
+) -> tuple[dict, object]:
+    """Returns ({target: ModelEntry}, solar_model or None)."""
+    root      = Path(root or Config.MODEL_REGISTRY_DIR)
+    eval_root = Path(eval_root or Config.EVAL_STORE_DIR)
+    index     = json.loads((root / "index.json").read_text())
+    if index.get("format") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model registry format {index.get('format')} in {root} — retrain."
+        )
+    gen_dir = root / index["generation"]
+
+    models: dict = {}
+    for target, e in index["targets"].items():
+        model = _load_model(e["kind"], gen_dir / e.get("file", ""), e.get("value"))
+        models[target] = ModelEntry(
+            target, model, e["features"], e["clip"],
+            n_test=e.get("n_test", 0), eval_root=eval_root,
+        )
+
+    solar = None
+    if "solar" in index:
+        s     = index["solar"]
+        solar = _load_model(s["kind"], gen_dir / s["file"])
+
+    return models, solar
@@ -5,27 +5,48 @@ morning schedule generator, and smart-plug / user-override handler.
 
 Preserves the exact logic of notebook cells 12 (run_lp_day,
 generate_morning_schedule, handle_smart_plug_event, ApplianceSpec,
-parse_hhmm helpers) with no simplifications.
+parse_hhmm helpers) with no simplifications.  The notebook's
+one-LP-per-appliance loop is kept as run_lp_day(mode="sequential");
+the default is a single joint LP over all flexible appliances.
 """
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass, field
+import time
+from dataclasses import asdict, dataclass, field, fields, replace
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional, List
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from scipy.optimize import linprog
 
 from app.config import Config
+from app.metrics import (
+    LP_CONSTRAINTS,
+    LP_ITERATIONS,
+    LP_SOLVE_SECONDS,
+    LP_SOLVES,
+    LP_VARIABLES,
+    stage,
+)
+from app.model_registry import predict_test
+from app.sim_index import SimFrameIndex
 from app.utils import (
-    get_price_band_from_price,
-    get_price_weight_from_price,
+    BAND_HIGH,
+    BAND_LOW,
+    PRICE_BANDS,
+    PriceBandModel,
+    first_day,
+    format_hhmm,
+    infer_slot_hours,
     parse_hhmm,
+    slot_label,
     time_to_decimal,
     partial_hour_fraction,
-    get_hour_slots_with_weights,
+    get_slot_weights,
     get_recommendation,
     get_energy_state,
 )
@@ -65,9 +86,10 @@ class ApplianceSpec:
         """
         if self.user_start_time is not None and self.user_end_time is not None:
             self.is_user_fixed = True
-            self.hour_weights  = get_hour_slots_with_weights(
-                self.user_start_time, self.user_end_time
-            )
+            clock_w            = self.slot_weights(np.arange(24))
+            self.hour_weights  = {
+                int(h): float(w) for h, w in enumerate(clock_w) if w > 0
+            }
             self.locked_hours  = sorted(self.hour_weights.keys())
             start_dec          = time_to_decimal(self.user_start_time)
             end_dec            = time_to_decimal(self.user_end_time)
@@ -98,30 +120,42 @@ class ApplianceSpec:
                 "[Spec] %s: SOFT preferred %02d:00", self.name, self.preferred_start
             )
 
+    def slot_weights(self, hours: np.ndarray, slot_hours: float = 1.0) -> np.ndarray:
+        """Minute-exact share of the user start→end window in every slot."""
+        return get_slot_weights(self.user_start_time, self.user_end_time, hours, slot_hours)
+
+    @property
+    def start_decimal(self) -> Optional[float]:
+        """Soft start as a decimal hour (user_start_time, else preferred_start)."""
+        if self.user_start_time is not None:
+            return time_to_decimal(self.user_start_time)
+        return None if self.preferred_start is None else float(self.preferred_start)
+
 
 # ══════════════════════════════════════════════════════════════════
 # Occupied-slot pre-commitment (exact from notebook cell 12)
 # ══════════════════════════════════════════════════════════════════
 
-def _build_occupied_slots(specs: list[ApplianceSpec], hours: np.ndarray) -> np.ndarray:
+def _build_occupied_slots(
+    specs:      list[ApplianceSpec],
+    hours:      np.ndarray,
+    slot_hours: float = 1.0,
+) -> np.ndarray:
     """
-    Pre-commit energy for user-fixed appliances.
-    Uses hour_weights to handle partial-hour slots correctly.
+    Pre-commit energy for user-fixed appliances, minute-exact: each slot
+    gets the share of the start→end window it overlaps (hour_weights at
+    the horizon's resolution).  Specs locked to hours without a window
+    are spread evenly over those hours.
     """
-    n        = len(hours)
-    occupied = np.zeros(n)
+    occupied = np.zeros(len(hours))
 
     for spec in specs:
         if not spec.is_user_fixed:
             continue
-        weights = spec.hour_weights or {}
-        if not weights:
-            e_per_h = spec.total_energy / max(len(spec.locked_hours), 1)
-            weights = {h: e_per_h / spec.total_energy for h in spec.locked_hours}
-        for h, weight in weights.items():
-            idx = np.where(hours == h)[0]
-            if len(idx) > 0:
-                occupied[idx[0]] += spec.total_energy * weight
+        if spec.user_start_time is not None and spec.user_end_time is not None:
+            occupied += spec.total_energy * spec.slot_weights(hours, slot_hours)
+        else:
+            occupied += _fixed_opt(spec, hours, slot_hours)
 
     return occupied
 
@@ -130,57 +164,469 @@ def _build_occupied_slots(specs: list[ApplianceSpec], hours: np.ndarray) -> np.n
 # Core LP solver  (exact from notebook cell 12 run_lp_day())
 # ══════════════════════════════════════════════════════════════════
 
-def run_lp_day(
-    appliance_preds: dict,
-    solar_fc:        np.ndarray,
-    prices:          np.ndarray,
-    hours:           np.ndarray,
-    specs:           Optional[list] = None,
-    current_hour:    int = 0,
-    locked_before_t: Optional[dict] = None,
-) -> tuple[pd.DataFrame, float, float, dict]:
+# Flexible appliances in the order the sequential solver visits them.
+_FLEXIBLE: dict = {
+    "wm":     ("pred_wm_kwh",     "Washing Machine"),
+    "boiler": ("pred_boiler_kwh", "Boiler"),
+    "ac1":    ("pred_ac1_kwh",    "AC Unit 1"),
+    "ac2":    ("pred_ac2_kwh",    "AC Unit 2"),
+}
+
+# Standby load (kWh per hour) in every slot's base load
+STANDBY_KWH = 0.05
+
+
+@dataclass(frozen=True)
+class LPCoefficients:
     """
-    Exact reproduction of notebook cell 12 run_lp_day().
+    Objective and slot-cap tuning of the LP.  The defaults are the
+    Config.LP_* values; like PriceBandModel the set is passed explicitly
+    (run_lp_day(coeffs=…)), so one process can solve under several —
+    see sweep.py.
+    """
+    solar_bonus:     float = Config.LP_SOLAR_BONUS_COEFF    # β: discount on solar-covered energy
+    peak_penalty:    float = Config.LP_PEAK_PENALTY_COEFF   # × price on HIGH-band grid energy
+    valle_bonus:     float = Config.LP_VALLE_BONUS_COEFF    # × price off LOW-band grid energy
+    soft_pref:       float = Config.LP_SOFT_PREF_PENALTY    # per slot before preferred_start
+    base_cap_mult:   float = Config.LP_SLOT_CAP_BASE_MULT   # slot cap = fair share × mult
+    golden_cap_mult: float = Config.LP_GOLDEN_CAP_MULT      #   sunny and HIGH
+    solar_cap_mult:  float = Config.LP_SOLAR_CAP_MULT       #   sunny
+    high_cap_mult:   float = Config.LP_HIGH_CAP_MULT        #   HIGH
+    min_cap_mult:    float = Config.LP_MIN_CAP_MULT         #   lower bound
 
-    For each flexible appliance:
-    1. If user-fixed → pre-commit to locked hours, skip LP.
-    2. Freeze past decisions (rescheduling scenario).
-    3. Build allowed-slot mask (block past, HIGH for WM, occupied, past deadline).
-    4. Objective:  π̃(t) = price(t) − solar_bonus(t) + peak_penalty(t) − valle_bonus(t)
-    5. Equality:   sum(x) = remaining_energy
-    6. Inequality: x(t) ≤ adaptive_slot_cap(t)
-    7. Solve via HiGHS.
+    def __post_init__(self) -> None:
+        for f in fields(self):
+            object.__setattr__(self, f.name, float(getattr(self, f.name)))
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class DayContext:
     """
-    n        = len(prices)
-    prices   = np.array(prices,   dtype=float)
-    solar_fc = np.array(solar_fc, dtype=float)
-    hours    = np.array(hours,    dtype=int)
+    Everything about the horizon that does not depend on the appliance,
+    computed once per run_lp_day() call.  Per-appliance masks, costs and
+    caps are NumPy expressions over these arrays.
+    """
+    prices:       np.ndarray
+    solar_fc:     np.ndarray
+    hours:        np.ndarray
+    current_hour: int
+    band:         np.ndarray          # int8 codes, see utils.PRICE_BANDS
+    is_high:      np.ndarray
+    is_low:       np.ndarray
+    past:         np.ndarray          # hours[t] < current_hour
+    occupied:     np.ndarray          # pre-committed user-fixed energy
+    blocked:      np.ndarray          # past | occupied
+    wm_blocked:   np.ndarray          # blocked | HIGH  (washing machine)
+    coeffs:       LPCoefficients = field(default_factory=LPCoefficients)
+    slot_hours:   float = 1.0         # slot length; hours are slot starts
+    _deadlines:   dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(
+        cls,
+        prices:       np.ndarray,
+        solar_fc:     np.ndarray,
+        hours:        np.ndarray,
+        occupied:     np.ndarray,
+        current_hour: int,
+        bands:        PriceBandModel,
+        coeffs:       Optional[LPCoefficients] = None,
+        slot_hours:   float = 1.0,
+    ) -> "DayContext":
+        band    = bands.codes(prices)
+        is_high = band == BAND_HIGH
+        past    = hours < current_hour
+        blocked = past | (occupied > 0.1)
+        return cls(
+            prices=prices, solar_fc=solar_fc, hours=hours,
+            current_hour=current_hour,
+            band=band, is_high=is_high, is_low=band == BAND_LOW,
+            past=past, occupied=occupied,
+            blocked=blocked, wm_blocked=blocked | is_high,
+            coeffs=coeffs or LPCoefficients(), slot_hours=slot_hours,
+        )
 
-    spec_map: dict[str, ApplianceSpec] = {}
-    if specs:
-        for s in specs:
-            s.validate_and_fix()
-            spec_map[s.key] = s
+    @property
+    def n(self) -> int:
+        return len(self.prices)
+
+    @property
+    def band_names(self) -> np.ndarray:
+        return PRICE_BANDS[self.band]
+
+    def after_deadline(self, deadline_hour: int) -> np.ndarray:
+        """Slots in a clock hour after deadline_hour, memoised per deadline."""
+        mask = self._deadlines.get(deadline_hour)
+        if mask is None:
+            mask = self._deadlines[deadline_hour] = np.floor(self.hours % 24) > deadline_hour
+        return mask
+
+    def solar_net(self, P: np.ndarray) -> np.ndarray:
+        """Solar left after load P in every slot."""
+        return self.solar_fc - P
+
+    def band_terms(self, idx: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """(peak_penalty, valle_bonus) on slots idx (all slots if None)."""
+        p = self.prices if idx is None else self.prices[idx]
+        h = self.is_high if idx is None else self.is_high[idx]
+        lo = self.is_low if idx is None else self.is_low[idx]
+        return (
+            np.where(h,  p * self.coeffs.peak_penalty, 0.0),
+            np.where(lo, p * self.coeffs.valle_bonus, 0.0),
+        )
 
-    occupied = _build_occupied_slots(specs, hours) if specs else np.zeros(n)
 
-    # Baseline load = fridge constant + small standby + pre-committed user loads
-    fridge = np.array(
-        appliance_preds.get("pred_fridge_kwh", np.zeros(n)), dtype=float
-    )[:n]
-    P = fridge + 0.05 + occupied
+def _linprog(kind: str, c, A_eq, b_eq, A_ub, b_ub, bounds):
+    """linprog(method="highs") recording solve time, LP size and iterations."""
+    t0     = time.perf_counter()
+    result = linprog(c=c, A_eq=A_eq, b_eq=b_eq, A_ub=A_ub, b_ub=b_ub,
+                     bounds=bounds, method="highs")
+    LP_SOLVE_SECONDS.observe(time.perf_counter() - t0, kind=kind)
+    LP_VARIABLES.observe(len(c), kind=kind)
+    LP_CONSTRAINTS.observe(A_eq.shape[0] + A_ub.shape[0], kind=kind)
+    LP_SOLVES.inc(kind=kind, status="ok" if result.success else "failed")
+    LP_ITERATIONS.inc(getattr(result, "nit", 0) or 0, kind=kind)
+    return result
+
+
+@lru_cache(maxsize=32)
+def _joint_matrices(n_act: int, n: int) -> tuple[sparse.csr_array, sparse.csr_array]:
+    """
+    Constraint matrices of the joint LP over n_act appliances × n slots
+    (variables x[a, t] row-major, then g(t)).  They depend on the shape
+    only, so they are built once and shared — linprog never mutates them.
+    """
+    n_x   = n_act * n
+    slots = np.arange(n)
+    A_eq = sparse.csr_array(
+        (np.ones(n_x),
+         (np.repeat(np.arange(n_act), n), np.arange(n_x))),
+        shape=(n_act, n_x + n),
+    )
+    A_ub = sparse.csr_array(
+        (np.concatenate([np.ones(n_x), -np.ones(n)]),
+         (np.concatenate([np.tile(slots, n_act), slots]),
+          np.arange(n_x + n))),
+        shape=(n, n_x + n),
+    )
+    return A_eq, A_ub
+
+
+@dataclass
+class LPModel:
+    """
+    The joint LP of a solved horizon together with its solution, kept in
+    the schedule so that plug events re-solve incrementally instead of
+    rebuilding specs, masks and caps (see handle_smart_plug_event).
+
+    Rows of cost / cap / x follow `keys`; cap is 0 outside an appliance's
+    allowed slots.  An event only touches bounds and right-hand sides:
+    the locked appliance leaves the variables (or the base load) and uses
+    up solar in its slot, and slots before current_hour are frozen.
+    """
+    hours:    np.ndarray
+    prices:   np.ndarray
+    solar_fc: np.ndarray
+    base:     np.ndarray            # load not owned by a variable (fridge, fixed, frozen)
+    g_cost:   np.ndarray            # objective of the grid term g(t)
+    keys:     list
+    cost:     np.ndarray            # (len(keys), n)
+    cap:      np.ndarray            # (len(keys), n)
+    x:        np.ndarray            # (len(keys), n) current plan, frozen past excluded
+    locked:   dict = field(default_factory=dict)   # key → {slot, energy, cost, item}
+
+    @property
+    def solar_left(self) -> np.ndarray:
+        """Solar forecast minus what locked appliances use in their slot."""
+        solar = self.solar_fc.copy()
+        for lock in self.locked.values():
+            t        = lock["slot"]
+            solar[t] = max(solar[t] - lock["energy"], 0.0)
+        return solar
+
+    def cost_from(self, current_hour: int) -> float:
+        """Locked-appliance costs + grid cost of every other load from current_hour on."""
+        rem  = self.hours >= current_hour
+        load = self.base + self.x.sum(axis=0)
+        grid = np.maximum(load - self.solar_left, 0.0)[rem]
+        return sum(l["cost"] for l in self.locked.values()) + float(grid @ self.prices[rem])
+
+    def frozen(self, key: str, optimized: np.ndarray) -> np.ndarray:
+        """The part of key's plan `optimized` frozen in base (slots already run)."""
+        if key not in self.keys:
+            return np.zeros(len(self.hours))
+        return np.asarray(optimized, dtype=float) - self.x[self.keys.index(key)]
+
+    def lock(
+        self,
+        key:       str,
+        slot:      int,
+        energy:    float,
+        cost:      float,
+        optimized: np.ndarray,
+        item:      Optional[dict] = None,
+    ) -> "LPModel":
+        """
+        Copy with `key` locked to `slot`; optimized is its current plan.
+        Its frozen past stays in base, the rest of the plan is replaced.
+        """
+        keys = list(self.keys)
+        rows = np.arange(len(keys))
+        base = self.base.copy()
+        if key in keys:
+            a     = keys.index(key)
+            rows  = rows[rows != a]
+            keys.pop(a)
+        elif key not in self.locked:
+            base -= np.asarray(optimized, dtype=float)
+        return replace(
+            self, base=base, keys=keys,
+            cost=self.cost[rows], cap=self.cap[rows], x=self.x[rows].copy(),
+            locked={**self.locked, key: {
+                "slot": int(slot), "energy": float(energy), "cost": float(cost), "item": item,
+            }},
+        )
+
+    def binds(self, slot: int, current_hour: int) -> bool:
+        """Whether another appliance is still planned in `slot`."""
+        return bool(
+            self.hours[slot] >= current_hour and self.x[:, slot].sum() > 0.005
+        )
+
+    def frees(
+        self,
+        slot:         int,
+        energy:       float,
+        planned:      np.ndarray,
+        current_hour: int,
+    ) -> bool:
+        """
+        Whether locking an appliance planned as `planned` to `energy` in
+        `slot` hands solar back to the others: it had energy planned in
+        another remaining slot, or more than `energy` in this one.
+        """
+        rest = np.where(self.hours >= current_hour, np.asarray(planned, dtype=float), 0.0)
+        rest[slot] -= energy
+        return bool((rest > 0.005).any())
+
+    def resolve(self, current_hour: int) -> tuple["LPModel", int]:
+        """
+        Re-solve the slots from current_hour on, every appliance keeping
+        the energy it has planned there.  Returns (model, n_variables);
+        on solver failure the current plan is kept.
+        """
+        rem  = np.flatnonzero(self.hours >= current_hour)
+        need = self.x[:, rem].sum(axis=1)
+        act  = np.flatnonzero(need >= 0.005)
+        if not len(act):
+            return self, 0
+
+        m, r = len(act), len(rem)
+        blk  = np.ix_(act, rem)
+        # the current plan is always feasible: caps never cut below it
+        ub_x = np.maximum(self.cap[blk], self.x[blk])
+        A_eq, A_ub = _joint_matrices(m, r)
+        result = _linprog(
+            "incremental",
+            c=np.concatenate([self.cost[blk].ravel(), self.g_cost[rem]]),
+            A_eq=A_eq, b_eq=need[act],
+            A_ub=A_ub, b_ub=np.maximum(self.solar_left[rem] - self.base[rem], 0.0),
+            bounds=np.column_stack([
+                np.zeros(m * r + r),
+                np.concatenate([ub_x.ravel(), ub_x.sum(axis=0)]),
+            ]),
+        )
+        if not result.success:
+            logger.warning("LP: incremental re-solve failed (%s) — plan kept", result.message)
+            return self, m * r + r
+
+        new  = np.maximum(result.x[:m * r].reshape(m, r), 0.0)
+        new *= (need[act] / np.maximum(new.sum(axis=1), 1e-9))[:, None]
+        x    = self.x.copy()
+        x[blk] = new
+        return replace(self, x=x), m * r + r
+
+
+def _frozen_past(
+    key:             str,
+    ctx:             DayContext,
+    locked_before_t: Optional[dict],
+) -> np.ndarray:
+    """Energy already committed before current_hour (rescheduling)."""
+    frozen_opt = np.zeros(ctx.n)
+    if locked_before_t and key in locked_before_t:
+        prev = np.asarray(locked_before_t[key], dtype=float)[:ctx.n]
+        m    = len(prev)
+        frozen_opt[:m] = np.where(ctx.past[:m], prev, 0.0)
+    return frozen_opt
+
+
+def _allowed_slots(
+    key:  str,
+    spec: Optional[ApplianceSpec],
+    ctx:  DayContext,
+) -> np.ndarray:
+    """Indices of slots the appliance may use (past, WM-HIGH, occupied, deadline blocked)."""
+    blocked = ctx.wm_blocked if key == "wm" else ctx.blocked
+    if spec and spec.deadline_hour is not None:
+        blocked = blocked | ctx.after_deadline(spec.deadline_hour)
+    return np.flatnonzero(~blocked)
+
+
+def _pref_penalty(
+    allowed_idx: np.ndarray,
+    spec:        Optional[ApplianceSpec],
+    ctx:         DayContext,
+) -> np.ndarray:
+    """Soft penalty for slots that end by the user's preferred start."""
+    if spec and spec.preferred_start is not None:
+        ends = ctx.hours[allowed_idx] % 24 + ctx.slot_hours
+        return np.where(
+            ends <= spec.start_decimal + 1e-9,
+            ctx.coeffs.soft_pref, 0.0,
+        )
+    return np.zeros(len(allowed_idx))
+
+
+def _slot_costs(
+    allowed_idx:      np.ndarray,
+    spec:             Optional[ApplianceSpec],
+    ctx:              DayContext,
+    remaining_energy: float,
+) -> np.ndarray:
+    """π̃(t) = price − solar_bonus + peak_penalty − valle_bonus + pref_penalty."""
+    c_base = ctx.prices[allowed_idx]
 
-    flexible = {
-        "wm":     ("pred_wm_kwh",     "Washing Machine"),
-        "boiler": ("pred_boiler_kwh", "Boiler"),
-        "ac1":    ("pred_ac1_kwh",    "AC Unit 1"),
-        "ac2":    ("pred_ac2_kwh",    "AC Unit 2"),
+    solar_coverage = np.minimum(
+        ctx.solar_fc[allowed_idx] / max(remaining_energy, 0.01), 1.0
+    )
+    solar_bonus = c_base * solar_coverage * ctx.coeffs.solar_bonus
+
+    price_penalty, valle_bonus = ctx.band_terms(allowed_idx)
+    pref_penalty = _pref_penalty(allowed_idx, spec, ctx)
+
+    return c_base - solar_bonus + price_penalty - valle_bonus + pref_penalty
+
+
+def _slot_caps(
+    allowed_idx:      np.ndarray,
+    spec:             Optional[ApplianceSpec],
+    ctx:              DayContext,
+    P:                np.ndarray,
+    remaining_energy: float,
+) -> np.ndarray:
+    """Adaptive per-slot energy cap x(t) ≤ cap(t) against the base load P."""
+    fair_share = remaining_energy / max(len(allowed_idx), 1)
+    sunny      = ctx.solar_net(P)[allowed_idx] > 0.05 * ctx.slot_hours
+    high       = ctx.is_high[allowed_idx]
+
+    k        = ctx.coeffs
+    slot_cap = fair_share * np.select(
+        [sunny & high, sunny, high],
+        [k.golden_cap_mult, k.solar_cap_mult, k.high_cap_mult],
+        default=k.base_cap_mult,
+    )
+    slot_cap = np.maximum(slot_cap, fair_share * k.min_cap_mult)
+
+    # Partial-slot cap for a user start inside a slot
+    if spec and spec.user_start_time is not None and not spec.is_user_fixed:
+        start  = sum(a * b for a, b in zip(parse_hhmm(spec.user_start_time), (60, 1)))
+        slot_m = round(ctx.slot_hours * 60)
+        lo     = np.round(ctx.hours[allowed_idx] % 24 * 60)
+        hits   = np.flatnonzero((lo < start) & (start < lo + slot_m))
+        if len(hits):
+            i    = hits[0]
+            frac = (lo[i] + slot_m - start) / slot_m
+            slot_cap[i] = min(slot_cap[i], frac * remaining_energy)
+
+    return slot_cap
+
+
+def _lp_result(
+    name:         str,
+    orig:         np.ndarray,
+    frozen_opt:   np.ndarray,
+    total_energy: float,
+    hours:        np.ndarray,
+    x:            Optional[np.ndarray] = None,
+    allowed_idx:  Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Per-appliance result dict.  x=None means the LP failed (or was not
+    needed) and only the frozen past decisions are kept.
+    """
+    opt     = frozen_opt.copy()
+    shifted = False
+    if x is not None:
+        opt[allowed_idx] += np.maximum(x, 0.0)
+
+        # Numerical safety: rescale if total drifts
+        total_assigned = float(opt.sum())
+        if abs(total_assigned - total_energy) > 0.01:
+            scale = total_energy / max(total_assigned, 1e-9)
+            opt   = opt * scale
+
+        shifted = not np.allclose(opt, orig, atol=0.01)
+
+    segments = [slot_label(h) for h in hours[opt > 0.005]]
+    if x is not None:
+        orig_peak = int(hours[int(np.argmax(orig))]) if orig.max() > 0.005 else -1
+        logger.debug(
+            "LP: %-20s orig=%02d:00 → spread=%s %s",
+            name, orig_peak, segments,
+            "SHIFTED ✅" if shifted else "unchanged",
+        )
+
+    return {
+        "name": name, "original": orig.copy(), "optimized": opt,
+        "shifted": shifted, "total_energy": total_energy,
+        "is_user_fixed": False, "segments": segments,
     }
 
+
+def _fixed_opt(spec: ApplianceSpec, hours: np.ndarray, slot_hours: float = 1.0) -> np.ndarray:
+    """
+    Spread a user-fixed appliance evenly over its locked hours; within an
+    hour, over the slots its start→end window covers.
+    """
+    opt     = np.zeros(len(hours))
+    e_per_h = spec.total_energy / max(len(spec.locked_hours), 1)
+    clock   = np.floor(np.asarray(hours, dtype=float) % 24)
+    within  = (
+        spec.slot_weights(hours, slot_hours)
+        if spec.user_start_time is not None and spec.user_end_time is not None
+        else np.ones(len(hours))
+    )
+    for h in spec.locked_hours:
+        w = first_day(np.where(clock == h, within, 0.0), slot_hours)
+        if w.sum() > 0:
+            opt += e_per_h * w / w.sum()
+    return opt
+
+
+def _solve_sequential(
+    appliance_preds: dict,
+    ctx:             DayContext,
+    spec_map:        dict,
+    P:               np.ndarray,
+    locked_before_t: Optional[dict],
+) -> tuple[dict, float]:
+    """
+    Original notebook behaviour: one linprog per appliance in _FLEXIBLE
+    order, each seeing the load committed by the ones before it.
+    Mutates P in place; returns (results, baseline_cost).
+    """
+    n             = ctx.n
+    prices        = ctx.prices
+    solar_fc      = ctx.solar_fc
+    hours         = ctx.hours
     results: dict = {}
     baseline_cost = float(np.dot(np.maximum(P - solar_fc, 0), prices))
 
-    for key, (col, name) in flexible.items():
+    for key, (col, name) in _FLEXIBLE.items():
         orig = np.array(
             appliance_preds.get(col, np.zeros(n)), dtype=float
         )[:n]
@@ -188,13 +634,7 @@ def run_lp_day(
 
         # ── USER FIXED: skip LP entirely ──────────────────────
         if spec and spec.is_user_fixed and spec.locked_hours:
-            opt     = np.zeros(n)
-            e_per_h = spec.total_energy / max(len(spec.locked_hours), 1)
-            for h in spec.locked_hours:
-                idx = np.where(hours == h)[0]
-                if len(idx):
-                    opt[idx[0]] = e_per_h
-
+            opt = _fixed_opt(spec, hours, ctx.slot_hours)
             baseline_cost += float(
                 np.dot(np.maximum(P + orig - solar_fc, 0), prices)
             )
@@ -208,13 +648,7 @@ def run_lp_day(
             continue
 
         # ── PRESERVE PAST DECISIONS (rescheduling) ────────────
-        frozen_opt = np.zeros(n)
-        if locked_before_t and key in locked_before_t:
-            prev = np.array(locked_before_t[key])
-            for t in range(n):
-                if hours[t] < current_hour and t < len(prev):
-                    frozen_opt[t] = prev[t]
-
+        frozen_opt       = _frozen_past(key, ctx, locked_before_t)
         frozen_energy    = float(frozen_opt.sum())
         total_energy     = float(orig.sum())
         remaining_energy = max(total_energy - frozen_energy, 0.0)
@@ -224,173 +658,303 @@ def run_lp_day(
         )
 
         if remaining_energy < 0.005:
-            results[key] = {
-                "name": name, "original": orig.copy(), "optimized": frozen_opt,
-                "shifted": False, "total_energy": total_energy,
-                "is_user_fixed": False, "segments": [],
-            }
+            results[key] = _lp_result(name, orig, frozen_opt, total_energy, hours)
             P += frozen_opt
             continue
 
-        # ── ALLOWED SLOTS ─────────────────────────────────────
-        v = np.ones(n)
+        allowed_idx = _allowed_slots(key, spec, ctx)
+        if len(allowed_idx) == 0:
+            results[key] = _lp_result(name, orig, frozen_opt, total_energy, hours)
+            P += frozen_opt
+            continue
 
-        # Block past hours
-        for t in range(n):
-            if hours[t] < current_hour:
-                v[t] = 0
+        n_allowed = len(allowed_idx)
+        c_final   = _slot_costs(allowed_idx, spec, ctx, remaining_energy)
+        slot_cap  = _slot_caps(allowed_idx, spec, ctx, P, remaining_energy)
+
+        result = _linprog(
+            "sequential",
+            c=c_final,
+            A_eq=np.ones((1, n_allowed)), b_eq=np.array([remaining_energy]),
+            A_ub=sparse.eye_array(n_allowed, format="csr"), b_ub=slot_cap,
+            bounds=[(0.0, None)] * n_allowed,
+        )
 
-        # Block HIGH price for washing machine
-        if key == "wm":
-            for t in range(n):
-                if get_price_band_from_price(float(prices[t])) == "HIGH":
-                    v[t] = 0
+        if result.success:
+            res = _lp_result(
+                name, orig, frozen_opt, total_energy, hours,
+                x=result.x, allowed_idx=allowed_idx,
+            )
+        else:
+            res = _lp_result(name, orig, frozen_opt, total_energy, hours)
+            logger.warning("LP: %-20s FAILED — kept original", name)
 
-        # Block user-fixed occupied slots
-        for t in range(n):
-            if occupied[t] > 0.1:
-                v[t] = 0
+        results[key] = res
+        P += res["optimized"]
 
-        # Apply deadline
-        if spec and spec.deadline_hour is not None:
-            for t in range(n):
-                if hours[t] > spec.deadline_hour:
-                    v[t] = 0
+    return results, baseline_cost
 
-        allowed_idx = np.where(v > 0)[0]
 
-        if len(allowed_idx) == 0:
-            results[key] = {
-                "name": name, "original": orig.copy(), "optimized": frozen_opt,
-                "shifted": False, "total_energy": total_energy,
-                "is_user_fixed": False, "segments": [],
-            }
-            P += frozen_opt
+def _solve_joint(
+    appliance_preds: dict,
+    ctx:             DayContext,
+    spec_map:        dict,
+    P:               np.ndarray,
+    locked_before_t: Optional[dict],
+) -> Optional[tuple[dict, float, "LPModel"]]:
+    """
+    All flexible appliances in a single HiGHS call.
+
+    Variables:  x[a, t] ≥ 0 for every appliance × slot, then g(t) ≥ 0.
+    Bounds:     x[a, t] ≤ cap_a(t), 0 outside the allowed mask.
+    Equality:   Σ_t x[a, t] = remaining_energy(a)                (one row per a)
+    Coupling:   Σ_a x[a, t] − g(t) ≤ surplus(t)                   (one row per t)
+    Objective:  Σ x·((1 − β)·price(t) + pref_a(t))
+              + Σ g·(β·price(t) + peak_penalty(t) − valle_bonus(t))
+
+    g(t) is the flexible load that the solar surplus left after the base
+    load cannot cover.  Solar-covered energy therefore earns the full
+    coeffs.solar_bonus (β) discount, but only once per kWh of surplus
+    shared across appliances, and the peak/valle terms apply to grid
+    energy only — a HIGH-price slot covered by solar is a golden hour.
+    Caps are computed against the base load (fixed + frozen), not a load
+    that grows in a fixed appliance order.
+
+    Mutates P in place; returns (results, baseline_cost, LPModel), or
+    None if the joint problem is infeasible so the caller can fall back.
+    """
+    n        = ctx.n
+    prices   = ctx.prices
+    solar_fc = ctx.solar_fc
+    hours    = ctx.hours
+    beta     = ctx.coeffs.solar_bonus
+    P_base   = P.copy()
+
+    # ── Pass 1: fixed / frozen loads and per-appliance LP blocks ──
+    prepared: dict = {}
+    for key, (col, name) in _FLEXIBLE.items():
+        orig = np.array(
+            appliance_preds.get(col, np.zeros(n)), dtype=float
+        )[:n]
+        spec = spec_map.get(key)
+
+        if spec and spec.is_user_fixed and spec.locked_hours:
+            opt = _fixed_opt(spec, hours, ctx.slot_hours)
+            P_base += opt
+            prepared[key] = {"name": name, "orig": orig, "fixed": opt, "spec": spec}
             continue
 
-        n_allowed = len(allowed_idx)
+        frozen_opt       = _frozen_past(key, ctx, locked_before_t)
+        total_energy     = float(orig.sum())
+        remaining_energy = max(total_energy - float(frozen_opt.sum()), 0.0)
+        P_base += frozen_opt
 
-        # ── OBJECTIVE: π̃(t) = price − solar_bonus + peak_penalty − valle_bonus ─
-        c_base = prices[allowed_idx].copy()
+        allowed_idx = (
+            _allowed_slots(key, spec, ctx)
+            if remaining_energy >= 0.005 else np.array([], dtype=int)
+        )
+        prepared[key] = {
+            "name": name, "orig": orig, "fixed": None, "spec": spec,
+            "frozen": frozen_opt, "total": total_energy,
+            "remaining": remaining_energy, "allowed": allowed_idx,
+        }
 
-        solar_coverage = np.minimum(
-            solar_fc[allowed_idx] / max(remaining_energy, 0.01), 1.0
+    # Per-appliance costs and caps; an appliance whose caps cannot hold
+    # its remaining energy is infeasible on its own, exactly as in the
+    # sequential solver, and keeps its frozen plan.
+    active: list = []
+    for key, p in prepared.items():
+        idx = p.get("allowed")
+        if p["fixed"] is not None or len(idx) == 0:
+            continue
+        p["cost"] = (
+            (1.0 - beta) * prices[idx]
+            + _pref_penalty(idx, p["spec"], ctx)
         )
-        solar_bonus = c_base * solar_coverage * Config.LP_SOLAR_BONUS_COEFF
-
-        price_penalty = np.array([
-            c_base[i] * Config.LP_PEAK_PENALTY_COEFF
-            if get_price_band_from_price(float(prices[allowed_idx[i]])) == "HIGH"
-            else 0.0
-            for i in range(n_allowed)
-        ])
-
-        valle_bonus = np.array([
-            c_base[i] * Config.LP_VALLE_BONUS_COEFF
-            if get_price_band_from_price(float(prices[allowed_idx[i]])) == "LOW"
-            else 0.0
-            for i in range(n_allowed)
-        ])
-
-        pref_penalty = np.zeros(n_allowed)
-        if spec and spec.preferred_start is not None:
-            for i, t in enumerate(allowed_idx):
-                if hours[t] < spec.preferred_start:
-                    pref_penalty[i] = Config.LP_SOFT_PREF_PENALTY
-
-        c_final = c_base - solar_bonus + price_penalty - valle_bonus + pref_penalty
-
-        # ── EQUALITY: total energy preserved ──────────────────
-        A_eq = np.ones((1, n_allowed))
-        b_eq = np.array([remaining_energy])
-
-        # ── INEQUALITY: per-slot adaptive cap ─────────────────
-        fair_share = remaining_energy / max(n_allowed, 1)
-        slot_cap   = np.full(n_allowed, fair_share * Config.LP_SLOT_CAP_BASE_MULT)
-
-        for i, t in enumerate(allowed_idx):
-            price_t = float(prices[t])
-            solar_t = float(solar_fc[t])
-            net_t   = solar_t - float(P[t])
-            band_t  = get_price_band_from_price(price_t)
-
-            if net_t > 0.05 and band_t == "HIGH":
-                slot_cap[i] = fair_share * Config.LP_GOLDEN_CAP_MULT
-            elif net_t > 0.05:
-                slot_cap[i] = fair_share * Config.LP_SOLAR_CAP_MULT
-            elif band_t == "HIGH":
-                slot_cap[i] = fair_share * Config.LP_HIGH_CAP_MULT
-
-        slot_cap = np.maximum(slot_cap, fair_share * Config.LP_MIN_CAP_MULT)
-
-        # Partial-hour cap for user preferred_start
-        if spec and spec.user_start_time is not None and not spec.is_user_fixed:
-            sh, sm = parse_hhmm(spec.user_start_time)
-            if sm > 0:
-                frac = partial_hour_fraction(spec.user_start_time, is_start=True)
-                for i, t in enumerate(allowed_idx):
-                    if hours[t] == sh:
-                        slot_cap[i] = min(slot_cap[i], frac * remaining_energy)
-                        break
-
-        A_ub   = np.eye(n_allowed)
-        b_ub   = slot_cap
-        bounds = [(0.0, None)] * n_allowed
-
-        result = linprog(
-            c=c_final, A_eq=A_eq, b_eq=b_eq,
-            A_ub=A_ub, b_ub=b_ub, bounds=bounds,
-            method="highs",
+        p["cap"] = _slot_caps(idx, p["spec"], ctx, P_base, p["remaining"])
+        if p["cap"].sum() < p["remaining"] - 1e-9:
+            logger.warning("LP: %-20s FAILED — kept original", p["name"])
+            continue
+        active.append(key)
+
+    # ── Pass 2: one sparse LP over every active appliance × slot ──
+    solution: dict = {}
+    if active:
+        n_act = len(active)
+        n_x   = n_act * n
+        c     = np.zeros(n_x + n)
+        ub    = np.zeros(n_x + n)
+        b_eq  = np.array([prepared[k]["remaining"] for k in active])
+        price_penalty, valle_bonus = ctx.band_terms()
+        c[n_x:]  = np.maximum(beta * prices + price_penalty - valle_bonus, 0.0)
+
+        for a, key in enumerate(active):
+            p   = prepared[key]
+            off = a * n + p["allowed"]
+            c[off]  = p["cost"]
+            ub[off] = p["cap"]
+            ub[n_x + p["allowed"]] += p["cap"]
+
+        A_eq, A_ub = _joint_matrices(n_act, n)
+        b_ub = np.maximum(ctx.solar_net(P_base), 0.0)
+
+        result = _linprog(
+            "joint",
+            c=c, A_eq=A_eq, b_eq=b_eq, A_ub=A_ub, b_ub=b_ub,
+            bounds=np.column_stack([np.zeros(n_x + n), ub]),
         )
+        if not result.success:
+            logger.warning(
+                "LP: joint solve failed (%s) — falling back to sequential",
+                result.message,
+            )
+            return None
 
-        if result.success:
-            opt = frozen_opt.copy()
-            for i, t in enumerate(allowed_idx):
-                opt[t] += max(float(result.x[i]), 0.0)
-
-            # Numerical safety: rescale if total drifts
-            total_assigned = float(opt.sum())
-            if abs(total_assigned - total_energy) > 0.01:
-                scale = total_energy / max(total_assigned, 1e-9)
-                opt   = opt * scale
-
-            shifted  = not np.allclose(opt, orig, atol=0.01)
-            segments = [int(hours[t]) for t in range(n) if opt[t] > 0.005]
-            orig_peak = int(hours[int(np.argmax(orig))]) if orig.max() > 0.005 else -1
-            logger.debug(
-                "LP: %-20s orig=%02d:00 → spread=%s %s",
-                name, orig_peak, segments,
-                "SHIFTED ✅" if shifted else "unchanged",
+        for a, key in enumerate(active):
+            solution[key] = result.x[a * n:(a + 1) * n]
+
+    # ── Pass 3: results + baseline in the sequential order ────
+    results: dict = {}
+    baseline_cost = float(np.dot(np.maximum(P - solar_fc, 0), prices))
+
+    for key, p in prepared.items():
+        baseline_cost += float(
+            np.dot(np.maximum(P + p["orig"] - solar_fc, 0), prices)
+        )
+        if p["fixed"] is not None:
+            spec = p["spec"]
+            results[key] = {
+                "name": p["name"], "original": p["orig"].copy(),
+                "optimized": p["fixed"], "shifted": False,
+                "total_energy": spec.total_energy,
+                "is_user_fixed": True, "segments": spec.locked_hours,
+            }
+            logger.debug("LP: %-20s FIXED by user @ %s", p["name"], spec.locked_hours)
+        elif key in solution:
+            idx = p["allowed"]
+            results[key] = _lp_result(
+                p["name"], p["orig"], p["frozen"], p["total"], hours,
+                x=solution[key][idx], allowed_idx=idx,
             )
         else:
-            opt      = frozen_opt.copy()
-            shifted  = False
-            segments = [int(hours[t]) for t in range(n) if opt[t] > 0.005]
-            logger.warning("LP: %-20s FAILED — kept original", name)
+            results[key] = _lp_result(
+                p["name"], p["orig"], p["frozen"], p["total"], hours,
+            )
+        P += results[key]["optimized"]
+
+    # ── Keep the assembled LP for incremental re-solves ───────
+    price_penalty, valle_bonus = ctx.band_terms()
+    model = LPModel(
+        hours=hours, prices=prices, solar_fc=solar_fc, base=P_base,
+        g_cost=np.maximum(beta * prices + price_penalty - valle_bonus, 0.0),
+        keys=list(active),
+        cost=np.zeros((len(active), n)), cap=np.zeros((len(active), n)),
+        x=np.zeros((len(active), n)),
+    )
+    for a, key in enumerate(active):
+        p   = prepared[key]
+        idx = p["allowed"]
+        model.cost[a, idx] = p["cost"]
+        model.cap[a, idx]  = p["cap"]
+        model.x[a]         = results[key]["optimized"] - p["frozen"]
 
-        results[key] = {
-            "name": name, "original": orig.copy(), "optimized": opt,
-            "shifted": shifted, "total_energy": total_energy,
-            "is_user_fixed": False, "segments": segments,
-        }
-        P += opt
+    return results, baseline_cost, model
+
+
+@stage("run_lp_day")
+def run_lp_day(
+    appliance_preds: dict,
+    solar_fc:        np.ndarray,
+    prices:          np.ndarray,
+    hours:           np.ndarray,
+    bands:           PriceBandModel,
+    specs:           Optional[list] = None,
+    current_hour:    int = 0,
+    locked_before_t: Optional[dict] = None,
+    mode:            Optional[str] = None,
+    return_model:    bool = False,
+    coeffs:          Optional[LPCoefficients] = None,
+    slot_hours:      Optional[float] = None,
+) -> tuple:
+    """
+    Schedule the flexible appliances over one horizon, with prices banded
+    by the tariff's PriceBandModel.
+
+    For each flexible appliance:
+    1. If user-fixed → pre-commit to locked hours, skip LP.
+    2. Freeze past decisions (rescheduling scenario).
+    3. Build allowed-slot mask (block past, HIGH for WM, occupied, past deadline).
+    4. Objective:  π̃(t) = price(t) − solar_bonus(t) + peak_penalty(t) − valle_bonus(t)
+    5. Equality:   sum(x) = remaining_energy
+    6. Inequality: x(t) ≤ adaptive_slot_cap(t)
+    7. Solve via HiGHS.
+
+    mode="joint" (default, Config.LP_SOLVE_MODE) solves all appliances in
+    one sparse LP — see _solve_joint().  mode="sequential" is the exact
+    notebook cell 12 behaviour: one linprog per appliance in fixed order.
+    A joint solve that turns out infeasible falls back to sequential.
+    coeffs overrides the Config.LP_* objective / cap tuning.
+
+    hours are the decimal clock hours the slots start at; slot_hours (the
+    slot length) is inferred from them when not given, so one LP serves
+    hourly and sub-hourly (e.g. 15-minute) horizons alike.
+
+    Returns (lp_df, opt_cost, baseline_cost, results); with
+    return_model=True the joint LPModel (None after a sequential solve)
+    is appended for handle_smart_plug_event's incremental re-solve.
+    """
+    mode     = (mode or Config.LP_SOLVE_MODE).lower()
+    n        = len(prices)
+    prices   = np.array(prices,   dtype=float)
+    solar_fc = np.array(solar_fc, dtype=float)
+    hours    = np.array(hours,    dtype=float)
+    slot_h   = float(slot_hours or infer_slot_hours(hours))
+
+    if mode not in ("joint", "sequential"):
+        raise ValueError(f"Unknown LP mode: {mode!r}")
+
+    spec_map: dict[str, ApplianceSpec] = {}
+    if specs:
+        for s in specs:
+            s.validate_and_fix()
+            spec_map[s.key] = s
+
+    with stage("mask_build"):
+        occupied = _build_occupied_slots(specs, hours, slot_h) if specs else np.zeros(n)
+        ctx      = DayContext.build(
+            prices, solar_fc, hours, occupied, current_hour, bands, coeffs, slot_h,
+        )
+
+    # Baseline load = fridge constant + small standby + pre-committed user loads
+    fridge = np.array(
+        appliance_preds.get("pred_fridge_kwh", np.zeros(n)), dtype=float
+    )[:n]
+    P = fridge + STANDBY_KWH * slot_h + occupied
+
+    solved, model = None, None
+    if mode == "joint":
+        solved = _solve_joint(appliance_preds, ctx, spec_map, P, locked_before_t)
+    if solved is None:
+        solved = _solve_sequential(appliance_preds, ctx, spec_map, P, locked_before_t)
+    else:
+        *solved, model = solved
+    results, baseline_cost = solved
 
     # ── Build output DataFrame ────────────────────────────────
-    rows = []
-    for t in range(n):
-        rows.append({
-            "hour":       int(hours[t]),
-            "price":      float(prices[t]),
-            "solar":      float(solar_fc[t]),
-            "total_load": float(P[t]),
-            "price_band": get_price_band_from_price(float(prices[t])),
-        })
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame({
+        "hour":       hours,
+        "price":      prices,
+        "solar":      solar_fc,
+        "total_load": P,
+        "price_band": ctx.band_names,
+    })
     df["grid_kwh"]   = np.maximum(df["total_load"] - df["solar"], 0)
     df["solar_used"] = np.minimum(df["total_load"], df["solar"])
     df["grid_cost"]  = df["grid_kwh"] * df["price"]
     opt_cost         = float(df["grid_cost"].sum())
 
+    if return_model:
+        return df, opt_cost, baseline_cost, results, model
     return df, opt_cost, baseline_cost, results
 
 
@@ -398,110 +962,154 @@ def run_lp_day(
 # Morning schedule generator  (exact from notebook cell 12)
 # ══════════════════════════════════════════════════════════════════
 
+def horizon_inputs(day_df: pd.DataFrame) -> tuple[dict, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (appliance preds, solar forecast, prices, hours) of a horizon's sim
+    rows; hours are decimal slot starts (14.25 = 14:15).
+    """
+    n = len(day_df)
+    app_preds = {
+        col: day_df[col].values[:n]
+        for col in day_df.columns
+        if col.startswith("pred_")
+        and "solar" not in col
+        and "consumption" not in col
+    }
+    solar_fc = day_df["predicted_solar_kwh"].values[:n]
+    prices   = day_df["price_eur_kwh"].values[:n]
+    ts       = pd.to_datetime(day_df["timestamp"])
+    hours    = (ts.dt.hour + ts.dt.minute / 60).to_numpy(dtype=float)[:n]
+    return app_preds, solar_fc, prices, hours
+
+
+def auto_specs(app_preds: dict) -> list:
+    """Specs generate_morning_schedule builds when the caller passes none."""
+    specs = []
+    for col, vals in app_preds.items():
+        key = col.replace("pred_", "").replace("_kwh", "")
+        if key not in Config.APPL_NAMES:
+            continue
+        total_e = float(np.sum(vals))
+        if total_e < 0.005:
+            continue
+        specs.append(ApplianceSpec(
+            key=key, name=Config.APPL_NAMES[key],
+            total_energy=total_e,
+            duration_hours=max(total_e / 0.3, 1.0),
+        ))
+    return specs
+
+
+@stage("generate_morning_schedule")
 def generate_morning_schedule(
     sim_frame:       pd.DataFrame,
+    bands:           PriceBandModel,
     start_hour:      int = 6,
     target_date:     Optional[str] = None,
     specs:           Optional[list] = None,
     current_hour:    int = 0,
     locked_before_t: Optional[dict] = None,
+    index:           Optional[SimFrameIndex] = None,
+    coeffs:          Optional[LPCoefficients] = None,
 ) -> dict:
     """
     Exact reproduction of notebook cell 12 generate_morning_schedule().
     Selects one day's data, runs the LP, and returns a rich dict that
     the Flask API serialises directly.
-    """
-    sim_ts = pd.to_datetime(sim_frame["timestamp"])
-
-    if target_date:
-        mask     = sim_ts.dt.strftime("%Y-%m-%d") == str(target_date)
-        day_pool = sim_frame[mask].copy()
-        if len(day_pool) == 0:
-            first_date = sim_ts.dt.date.iloc[0]
-            day_pool   = sim_frame[sim_ts.dt.date == first_date].copy()
-    else:
-        first_date = sim_ts.dt.date.iloc[0]
-        day_pool   = sim_frame[sim_ts.dt.date == first_date].copy()
 
-    day_df   = day_pool.sort_values("timestamp").reset_index(drop=True)
-    day_rows = day_df[pd.to_datetime(day_df["timestamp"]).dt.hour >= start_hour].head(24)
-
-    if len(day_rows) < 24:
-        remaining_needed = 24 - len(day_rows)
-        last_ts   = pd.to_datetime(day_rows["timestamp"].iloc[-1])
-        next_rows = sim_frame[
-            pd.to_datetime(sim_frame["timestamp"]) > last_ts
-        ].head(remaining_needed)
-        day_rows = pd.concat([day_rows, next_rows]).reset_index(drop=True)
+    Prices are banded with `bands` (the tariff being planned for), not
+    the price_band column of the sim frame.  Pass the SimFrameIndex built
+    at startup as `index`; without it one is built from sim_frame on
+    every call.  The horizon is one day of the frame's slots (24 hourly or
+    96 quarter-hour rows); hours in the result are slot labels — ints on
+    the hour, decimal hours otherwise.
+    """
+    if index is None:
+        index = SimFrameIndex.build(sim_frame)
+
+    # One day of slots from start_hour on target_date (first date if
+    # unknown), spilling over into the next day
+    with stage("frame_select"):
+        start, stop = index.window(target_date, start_hour)
+        day_df      = index.frame.iloc[start:stop].reset_index(drop=True)
+
+    return plan_horizon(
+        day_df, bands, index.slot_minutes,
+        start_hour=start_hour,
+        specs=specs,
+        current_hour=current_hour,
+        locked_before_t=locked_before_t,
+        coeffs=coeffs,
+    )
 
-    day_df = day_rows.reset_index(drop=True)
-    n      = len(day_df)
 
-    actual_ts    = pd.to_datetime(day_df["timestamp"].iloc[0])
+def plan_horizon(
+    day_df:          pd.DataFrame,
+    bands:           PriceBandModel,
+    slot_minutes:    int = 60,
+    start_hour:      int = 6,
+    specs:           Optional[list] = None,
+    current_hour:    float = 0,
+    locked_before_t: Optional[dict] = None,
+    coeffs:          Optional[LPCoefficients] = None,
+    hours:           Optional[np.ndarray] = None,
+) -> dict:
+    """
+    The schedule dict of one horizon's sim rows: generate_morning_schedule
+    once its window is selected.  hours overrides the rows' clock hours as
+    slot labels (the rolling planner numbers a multi-day window 6 … 53).
+    """
+    n            = len(day_df)
+    actual_ts    = pd.Timestamp(day_df["timestamp"].iloc[0])
     actual_date  = actual_ts.strftime("%Y-%m-%d")
     day_display  = actual_ts.strftime("%A, %d %B %Y")
-    end_ts       = actual_ts + pd.Timedelta(hours=n - 1)
+    slot_h       = slot_minutes / 60
+    end_ts       = actual_ts + pd.Timedelta(minutes=(n - 1) * slot_minutes)
     sched_period = (
         f"{actual_ts.strftime('%d %b %Y')} {start_hour:02d}:00 → "
-        f"{end_ts.strftime('%d %b %Y')} {end_ts.strftime('%H')}:00"
+        f"{end_ts.strftime('%d %b %Y %H:%M')}"
     )
 
-    app_preds = {
-        col: day_df[col].values[:n]
-        for col in day_df.columns
-        if col.startswith("pred_")
-        and "solar" not in col
-        and "consumption" not in col
-    }
-    solar_fc = day_df["predicted_solar_kwh"].values[:n]
-    prices   = day_df["price_eur_kwh"].values[:n]
-    hours    = day_df["hour"].values[:n].astype(int)
+    app_preds, solar_fc, prices, clock = horizon_inputs(day_df)
+    hours = clock if hours is None else np.asarray(hours, dtype=float)
 
     # Auto-build specs if none provided
     if specs is None:
-        specs = []
-        for col, vals in app_preds.items():
-            key = col.replace("pred_", "").replace("_kwh", "")
-            if key not in Config.APPL_NAMES:
-                continue
-            total_e = float(np.sum(vals))
-            if total_e < 0.005:
-                continue
-            specs.append(ApplianceSpec(
-                key=key, name=Config.APPL_NAMES[key],
-                total_energy=total_e,
-                duration_hours=max(total_e / 0.3, 1.0),
-            ))
-
-    lp_df, opt_cost, base_cost, lp_results = run_lp_day(
-        app_preds, solar_fc, prices, hours,
+        specs = auto_specs(app_preds)
+
+    lp_df, opt_cost, base_cost, lp_results, lp_model = run_lp_day(
+        app_preds, solar_fc, prices, hours, bands,
         specs=specs,
         current_hour=current_hour,
         locked_before_t=locked_before_t,
+        return_model=True,
+        coeffs=coeffs,
+        slot_hours=slot_h,
     )
 
     # ── Build schedule_items ──────────────────────────────────
+    band_names = lp_df["price_band"].to_numpy()
+    labels     = [slot_label(h) for h in hours]
+    net        = solar_fc - lp_df["total_load"].to_numpy()
     schedule_items: list = []
     for key, res in lp_results.items():
         if res["total_energy"] < 0.005:
             continue
-        opt          = np.array(res["optimized"])
-        active_hours = sorted([int(hours[t]) for t in range(n) if opt[t] > 0.005])
-        if not active_hours:
+        opt    = np.asarray(res["optimized"], dtype=float)
+        active = np.flatnonzero(opt > 0.005)
+        if not len(active):
             continue
+        active_hours = sorted(labels[t] for t in active)
 
         best_t   = int(np.argmax(opt))
-        best_h   = int(hours[best_t])
+        best_h   = labels[best_t]
         price_at = float(prices[best_t])
         solar_at = float(solar_fc[best_t])
         is_free  = solar_at > float(opt[best_t])
-        band     = get_price_band_from_price(price_at)
+        band     = band_names[best_t]
 
-        net_at = (
-            solar_at - float(lp_df.iloc[best_t]["total_load"])
-            if best_t < len(lp_df) else 0.0
-        )
-        scenario, _ = get_recommendation(get_energy_state(net_at), band)
+        # Energy state is per hour: scale the slot's net energy up
+        scenario, _ = get_recommendation(get_energy_state(float(net[best_t]) / slot_h), band)
 
         schedule_items.append({
             "key":              key,
@@ -524,15 +1132,16 @@ def generate_morning_schedule(
 
     schedule_items.sort(key=lambda x: x["scheduled_hour"])
 
-    chart_data = [
+    consumption = day_df["predicted_consumption_kwh"].to_numpy(dtype=float)
+    chart_data  = [
         {
-            "hour":        int(hours[t]),
-            "solar":       round(float(solar_fc[t]), 4),
-            "price":       round(float(prices[t]), 4),
-            "price_band":  get_price_band_from_price(float(prices[t])),
-            "consumption": round(float(day_df.iloc[t]["predicted_consumption_kwh"]), 4),
+            "hour":        h,
+            "solar":       round(float(s), 4),
+            "price":       round(float(p), 4),
+            "price_band":  b,
+            "consumption": round(float(c), 4),
         }
-        for t in range(n)
+        for h, s, p, b, c in zip(labels, solar_fc, prices, band_names, consumption)
     ]
 
     saving = float(base_cost - opt_cost)
@@ -554,10 +1163,13 @@ def generate_morning_schedule(
         "optimized_cost": round(float(opt_cost), 4),
         "daily_saving":   round(saving, 4),
         "lp_results_raw": lp_results,
-        "hours_array":    [int(h) for h in hours],
+        "lp_model":       lp_model,
+        "hours_array":    labels,
         "solar_array":    [round(float(s), 4) for s in solar_fc],
         "prices_array":   [round(float(p), 4) for p in prices],
-        "n_hours":        n,
+        "n_hours":        slot_label(n * slot_h),
+        "n_slots":        n,
+        "slot_minutes":   slot_minutes,
     }
 
 
@@ -565,6 +1177,112 @@ def generate_morning_schedule(
 # Smart-plug / manual-override handler  (exact from notebook cell 12)
 # ══════════════════════════════════════════════════════════════════
 
+def _incremental_event(
+    model:         LPModel,
+    lp_raw:        dict,
+    appliance_key: str,
+    detected_idx:  int,
+    locked_cost:   float,
+    locked_item:   Optional[dict],
+    current_hour:  int,
+    bands:         PriceBandModel,
+) -> tuple[LPModel, dict, list, dict]:
+    """
+    Apply one plug event to the schedule's LPModel.
+
+    The detected appliance is locked; the others keep their plan unless
+    one of them shares the locked slot or the lock frees solar the
+    appliance had planned elsewhere, in which case the remaining slots
+    are re-solved.  Returns (model, lp_results_raw, schedule items
+    for the unlocked appliances, resolve info).
+    """
+    t0     = time.perf_counter()
+    before = model.cost_from(current_hour)
+    mode, n_vars = "skipped", 0
+
+    new = model
+    if locked_item is not None:
+        new = model.lock(
+            appliance_key, detected_idx, locked_item["total_energy"], locked_cost,
+            lp_raw[appliance_key]["optimized"], item=locked_item,
+        )
+        planned = lp_raw[appliance_key]["optimized"]
+        if (new.binds(detected_idx, current_hour)
+                or model.frees(detected_idx, locked_item["total_energy"], planned, current_hour)):
+            solved, n_vars = new.resolve(current_hour)
+            mode = "incremental"
+        else:
+            solved = new
+    else:
+        solved = new
+
+    hours      = solved.hours
+    solar_left = solved.solar_left
+    rem        = np.flatnonzero(hours >= current_hour)
+    results    = dict(lp_raw)
+    items: list = []
+
+    if locked_item is not None:
+        opt = model.frozen(appliance_key, lp_raw[appliance_key]["optimized"])
+        opt[detected_idx] += locked_item["total_energy"]
+        results[appliance_key] = {
+            **lp_raw[appliance_key], "optimized": opt, "shifted": False,
+            "total_energy": round(float(opt.sum()), 4), "is_user_fixed": True,
+            "segments": [slot_label(h) for h in hours[opt > 0.005]],
+        }
+
+    for key, res in lp_raw.items():
+        if key in solved.locked:
+            continue
+        opt = np.asarray(res["optimized"], dtype=float)
+        if key in solved.keys:
+            a   = solved.keys.index(key)
+            opt = opt - new.x[a] + solved.x[a]
+            results[key] = {
+                **res, "optimized": opt,
+                "segments": [slot_label(h) for h in hours[opt > 0.005]],
+            }
+        changed = not np.allclose(opt, res["optimized"], atol=0.005)
+
+        rem_opt = opt[rem]
+        if rem_opt.sum() < 0.005:
+            continue
+        best_t   = int(rem[np.argmax(rem_opt)])
+        price_at = float(solved.prices[best_t])
+        solar_at = float(solar_left[best_t])
+        items.append({
+            "key":              key,
+            "name":             res["name"],
+            "scheduled_hour":   slot_label(hours[best_t]),
+            "active_hours":     [slot_label(h) for h in hours[rem][rem_opt > 0.005]],
+            "total_energy":     round(float(rem_opt.sum()), 4),
+            "price_at_hour":    round(price_at, 4),
+            "solar_at_hour":    round(solar_at, 4),
+            "is_free":          solar_at > float(opt[best_t]),
+            "price_band":       bands.band(price_at),
+            "scenario":         "BALANCED_VALLE",
+            "shifted":          changed,
+            "color":            Config.APPL_COLORS.get(key, "#7F8C8D"),
+            "status":           "rescheduled" if changed else "waiting",
+            "user_forced":      False,
+            "smart_plug_event": None,
+            "user_note":        (
+                f"Rescheduled after "
+                f"{Config.APPL_NAMES.get(appliance_key, appliance_key)} event"
+                if changed else ""
+            ),
+        })
+
+    info = {
+        "mode":       mode,
+        "variables":  n_vars,
+        "ms":         round((time.perf_counter() - t0) * 1000, 2),
+        "event_cost": round(solved.cost_from(current_hour) - before, 4),
+    }
+    return solved, results, items, info
+
+
+@stage("plug_event")
 def handle_smart_plug_event(
     appliance_key:  str,
     detected_hour:  int,
@@ -572,38 +1290,63 @@ def handle_smart_plug_event(
     morning_data:   dict,
     sim_frame:      pd.DataFrame,
     trained_models: dict,
+    bands:          PriceBandModel,
     event_type:     str = "unexpected",
     detected_time:  Optional[str] = None,
 ) -> dict:
     """
     Exact reproduction of notebook cell 12 handle_smart_plug_event().
-    Locks the detected appliance to the reported hour (with sub-hourly
-    cost proration), then re-runs the LP for all remaining appliances
-    in remaining hours.
+    Locks the detected appliance to the slot containing the reported
+    time (with the cost prorated over the rest of that slot), then
+    re-runs the LP for all remaining appliances in remaining slots.
+
+    Schedules from a joint solve carry their LPModel ("lp_model"): the
+    event is then applied incrementally — no re-solve at all unless the
+    lock can change another appliance's best plan — and the result carries
+    the updated lp_results_raw / lp_model so the next event builds on
+    it.  "resolve" reports the mode, solve time and the event's cost
+    (change in the day's remaining cost).  Without a model the notebook
+    re-solve below runs.
     """
+    t0 = time.perf_counter()
+
     # Sub-hourly time parsing
     detected_minute = 0
     if detected_time is not None:
         detected_hour, detected_minute = parse_hhmm(detected_time)
 
-    # Fraction of the detected hour actually used
-    hour_fraction = (60 - detected_minute) / 60.0 if detected_minute > 0 else 1.0
+    # Fraction of the detected slot actually used (slots are clock-aligned)
+    slot_m        = int(morning_data.get("slot_minutes", 60))
+    into_slot     = detected_minute % slot_m
+    hour_fraction = (slot_m - into_slot) / slot_m if into_slot > 0 else 1.0
 
-    hours_arr  = np.array(morning_data["hours_array"])
+    hours_arr  = np.array(morning_data["hours_array"], dtype=float)
     solar_arr  = np.array(morning_data["solar_array"]).copy()
     prices_arr = np.array(morning_data["prices_array"])
     lp_raw     = morning_data["lp_results_raw"]
 
-    detected_idx_arr = np.where(hours_arr == detected_hour)[0]
+    # The slot of that clock time — the first one not yet past when a
+    # multi-day (rolling) horizon has it more than once
+    t_event          = detected_hour + (detected_minute - into_slot) / 60
+    detected_idx_arr = np.flatnonzero(np.isclose(hours_arr % 24, t_event))
+    ahead            = detected_idx_arr[hours_arr[detected_idx_arr] >= current_hour]
+    if len(ahead):
+        detected_idx_arr = ahead
     detected_idx     = int(detected_idx_arr[0]) if len(detected_idx_arr) > 0 else 0
+    detected_at      = slot_label(t_event)
+    when             = format_hhmm(detected_hour + detected_minute / 60)
 
     forced_res  = lp_raw.get(appliance_key)
     locked_item = None
     locked_cost = 0.0
     note        = ""
 
+    model = morning_data.get("lp_model")
     if forced_res:
         total_e  = float(forced_res["total_energy"])
+        if model is not None:
+            # what a rolling plan has already run stays where it ran
+            total_e -= float(model.frozen(appliance_key, forced_res["optimized"]).sum())
         price_at = (
             float(prices_arr[detected_idx]) if detected_idx < len(prices_arr) else 0.0
         )
@@ -613,7 +1356,7 @@ def handle_smart_plug_event(
 
         opt_arr       = np.array(forced_res["optimized"])
         lp_sched_h    = (
-            int(hours_arr[np.argmax(opt_arr)]) if opt_arr.max() > 0.005 else None
+            slot_label(hours_arr[np.argmax(opt_arr)]) if opt_arr.max() > 0.005 else None
         )
         grid_used     = max(total_e - solar_at, 0.0)
         locked_cost   = grid_used * price_at * hour_fraction
@@ -624,34 +1367,34 @@ def handle_smart_plug_event(
         appl_label = Config.APPL_NAMES.get(appliance_key, appliance_key)
 
         if event_type == "unexpected":
-            if lp_sched_h and lp_sched_h != detected_hour:
+            if lp_sched_h and lp_sched_h != detected_at:
                 note = (
-                    f"⚡ {appl_label} detected at {detected_hour:02d}:00 "
-                    f"— LP had {lp_sched_h:02d}:00. "
+                    f"⚡ {appl_label} detected at {when} "
+                    f"— LP had {format_hhmm(lp_sched_h)}. "
                     f"Cost: {'FREE' if grid_used < 0.01 else f'€{locked_cost:.4f}'}. Rescheduling."
                 )
             else:
                 note = (
-                    f"⚡ {appl_label} detected at {detected_hour:02d}:00. Rescheduling."
+                    f"⚡ {appl_label} detected at {when}. Rescheduling."
                 )
         else:
             note = (
-                f"👤 {appl_label} manually run at {detected_hour:02d}:00. "
+                f"👤 {appl_label} manually run at {when}. "
                 f"Cost: {'FREE' if grid_used < 0.01 else f'€{locked_cost:.4f}'}."
             )
 
         locked_item = {
             "key":              appliance_key,
             "name":             Config.APPL_NAMES.get(appliance_key, appliance_key),
-            "scheduled_hour":   detected_hour,
-            "scheduled_time":   detected_time if detected_time else f"{detected_hour:02d}:00",
-            "active_hours":     [detected_hour],
+            "scheduled_hour":   detected_at,
+            "scheduled_time":   detected_time if detected_time else when,
+            "active_hours":     [detected_at],
             "hour_fraction":    hour_fraction,
             "total_energy":     round(total_e, 4),
             "price_at_hour":    round(price_at, 4),
             "solar_at_hour":    round(solar_at, 4),
             "is_free":          grid_used < 0.01,
-            "price_band":       get_price_band_from_price(price_at),
+            "price_band":       bands.band(price_at),
             "scenario":         "DANGER_WINDOW" if price_at > 0 else "BALANCED_VALLE",
             "shifted":          False,
             "color":            Config.APPL_COLORS.get(appliance_key, "#7F8C8D"),
@@ -661,10 +1404,42 @@ def handle_smart_plug_event(
             "user_note":        note,
         }
         logger.info(
-            "⚡ PLUG EVENT: %s at %02d:00 | cost=%.4f",
-            Config.APPL_NAMES.get(appliance_key), detected_hour, locked_cost,
+            "⚡ PLUG EVENT: %s at %s | cost=%.4f",
+            Config.APPL_NAMES.get(appliance_key), when, locked_cost,
         )
 
+    # ── Incremental path: reuse the solved LP ─────────────────
+    if model is not None:
+        model, new_raw, others, resolve = _incremental_event(
+            model, lp_raw, appliance_key, detected_idx, locked_cost,
+            locked_item, current_hour, bands,
+        )
+        locked = [l["item"] for l in model.locked.values() if l["item"] is not None]
+        new_schedule = sorted(locked + others, key=lambda x: x["scheduled_hour"])
+        new_cost     = model.cost_from(current_hour)
+        logger.info(
+            "✅ Event applied (%s, %.1f ms) — cost %+.4f",
+            resolve["mode"], resolve["ms"], resolve["event_cost"],
+        )
+        return {
+            "rescheduled_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "event_type":     event_type,
+            "trigger":        note,
+            "schedule":       new_schedule,
+            "new_cost":       round(new_cost, 4),
+            "baseline_cost":  morning_data.get("baseline_cost", 0),
+            "daily_saving":   round(
+                morning_data.get("baseline_cost", 0) - new_cost, 4
+            ),
+            "resolve":        resolve,
+            "chart_data":     morning_data["chart_data"],
+            "hours_array":    morning_data["hours_array"],
+            "solar_array":    morning_data["solar_array"],
+            "prices_array":   morning_data["prices_array"],
+            "lp_results_raw": new_raw,
+            "lp_model":       model,
+        }
+
     # ── Remaining hours and appliances ────────────────────────
     remaining_mask = hours_arr >= current_hour
     rem_hours      = hours_arr[remaining_mask]
@@ -693,9 +1468,7 @@ def handle_smart_plug_event(
 
     if "fridge_kwh" in trained_models:
         fi = trained_models["fridge_kwh"]
-        fp = np.clip(
-            fi["model"].predict(fi["test"][fi["features"]]), 0, None
-        )
+        fp = np.clip(predict_test(fi), 0, None)
         nf  = min(len(fp), len(hours_arr))
         fa  = fp[:nf]
         app_preds_remaining["pred_fridge_kwh"] = (
@@ -729,8 +1502,9 @@ def handle_smart_plug_event(
 
     if app_preds_remaining and n_rem > 0:
         _, opt_c, _, new_lp_results = run_lp_day(
-            app_preds_remaining, rem_solar, rem_prices, rem_hours,
+            app_preds_remaining, rem_solar, rem_prices, rem_hours, bands,
             specs=remaining_specs, current_hour=current_hour,
+            slot_hours=slot_m / 60,
         )
         new_opt_cost += opt_c
 
@@ -745,8 +1519,8 @@ def handle_smart_plug_event(
         base_key = key.replace("pred_", "").replace("_kwh", "")
         opt      = np.array(res["optimized"])
         best_t   = int(np.argmax(opt))
-        best_h   = int(rem_hours[best_t]) if best_t < len(rem_hours) else current_hour
-        active   = [int(rem_hours[t]) for t in range(len(opt)) if opt[t] > 0.005]
+        best_h   = slot_label(rem_hours[best_t]) if best_t < len(rem_hours) else current_hour
+        active   = [slot_label(rem_hours[t]) for t in range(len(opt)) if opt[t] > 0.005]
         price_at = float(rem_prices[best_t]) if best_t < len(rem_prices) else 0.0
         solar_at = float(rem_solar[best_t])  if best_t < len(rem_solar)  else 0.0
 
@@ -759,7 +1533,7 @@ def handle_smart_plug_event(
             "price_at_hour":    round(price_at, 4),
             "solar_at_hour":    round(solar_at, 4),
             "is_free":          solar_at > float(opt[best_t]),
-            "price_band":       get_price_band_from_price(price_at),
+            "price_band":       bands.band(price_at),
             "scenario":         "BALANCED_VALLE",
             "shifted":          True,
             "color":            Config.APPL_COLORS.get(base_key, "#7F8C8D"),
@@ -779,8 +1553,8 @@ def handle_smart_plug_event(
         tag  = "← EVENT" if item["user_forced"] else "rescheduled"
         cost = "FREE ☀️" if item["is_free"] else f"€{item['price_at_hour']:.4f}"
         logger.info(
-            "   %02d:00  %-20s  %s  %s",
-            item["scheduled_hour"], item["name"], cost, tag,
+            "   %s  %-20s  %s  %s",
+            format_hhmm(item["scheduled_hour"]), item["name"], cost, tag,
         )
 
     return {
@@ -793,6 +1567,10 @@ def handle_smart_plug_event(
         "daily_saving":   round(
             morning_data.get("baseline_cost", 0) - new_opt_cost, 4
         ),
+        "resolve":        {
+            "mode": "full", "variables": None, "event_cost": None,
+            "ms":   round((time.perf_counter() - t0) * 1000, 2),
+        },
         "chart_data":     morning_data["chart_data"],
         "hours_array":    morning_data["hours_array"],
         "solar_array":    morning_data["solar_array"],
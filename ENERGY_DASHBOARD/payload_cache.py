@@ -0,0 +1,73 @@
+"""
+payload_cache.py — serialised JSON bodies of the state-derived GET routes.
+
+/api/plan and /api/schedule are pure functions of one household's STATE
+version, so each body is encoded (utils.dumps_json) once per version and
+served as bytes until the state changes.  Entries are keyed by
+
+    (household, state version, route)
+
+The writer of a new version precomputes its payloads; other workers build
+them on their first read.  A cached body is served (peek) without loading
+the state at all.  Superseded versions of a household are dropped
+as soon as a newer one is cached.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.config import Config
+
+
+class PayloadCache:
+    """Thread-safe LRU of encoded response bodies."""
+
+    def __init__(self, maxsize: int = Config.PAYLOAD_CACHE_SIZE) -> None:
+        self.maxsize = max(int(maxsize), 1)
+        self.hits    = 0
+        self.misses  = 0
+        self._data: OrderedDict = OrderedDict()
+        self._latest: dict[str, int] = {}       # household → newest cached version
+        self._lock   = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def peek(self, household: str, version: int, route: str) -> Optional[bytes]:
+        """The cached body, or None — never builds."""
+        key = (household, version, route)
+        with self._lock:
+            payload = self._data.get(key)
+            if payload is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return payload
+
+    def get_or_build(
+        self,
+        household: str,
+        version:   int,
+        route:     str,
+        build:     Callable[[], bytes],
+    ) -> bytes:
+        payload = self.peek(household, version, route)
+        if payload is not None:
+            return payload
+        with self._lock:
+            self.misses += 1
+
+        key     = (household, version, route)
+        payload = build()
+        with self._lock:
+            if version < self._latest.get(household, 0):
+                return payload                  # already superseded — don't keep
+            if version > self._latest.get(household, 0):
+                self._latest[household] = version
+                for old in [k for k in self._data if k[0] == household and k[1] < version]:
+                    del self._data[old]
+            self._data[key] = payload
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return payload
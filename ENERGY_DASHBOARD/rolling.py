@@ -0,0 +1,220 @@
+"""
+rolling.py — receding-horizon (MPC) planning over the sim frame.
+
+generate_morning_schedule plans one day from start_hour, and that plan
+then only runs down.  A RollingPlan keeps a window that runs from the
+start of the current plan day to Config.ROLLING_HORIZON_HOURS past the
+current slot (24–48 h with the default 24).  /api/next slides it one slot
+at a time:
+
+  - slots already executed are frozen at the plan they ran with
+    (run_lp_day's locked_before_t); the slots from the current one to
+    the new tail are re-solved, and the tail brings its own forecast
+    load with it
+  - plug-event locks that are still ahead are replayed onto the new LP
+    through handle_smart_plug_event, so overrides survive a slide
+  - once the current slot leaves the plan day, that day is dropped.  The
+    flexible energy the plan moved past it is carried into the current
+    slot's demand; the carry is negative when energy ran ahead of its
+    forecast
+
+Slots are labelled with continuous hours from the plan day's midnight
+(6 … 53 for a 48 h window), so "before the current slot" stays a plain
+comparison across midnight; clock-time rules (deadlines, preferred
+starts) use hours % 24.  The plan state travels with the schedule it
+solved (sched["rolling"]).  The first slide resumes from whatever
+schedule the household holds, as long as its date is in the index it is
+given: the sim frame, or for a forecast-backed schedule the forecast
+from its date (the app rebuilds that one per slide, see _schedule_index).
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+import numpy as np
+
+from app.config import Config
+from app.metrics import stage
+from app.optimizer import LPCoefficients, handle_smart_plug_event, plan_horizon
+from app.sim_index import SimFrameIndex
+from app.utils import PriceBandModel, slot_label
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_head(index: SimFrameIndex, sched: dict) -> Optional[int]:
+    """First sim row of a schedule's window; None if its date is not in the frame."""
+    if "rolling" in sched:
+        return sched["rolling"]["head"]
+    if sched.get("actual_date") not in index.slices:
+        return None
+    return index.window(sched["actual_date"], sched.get("start_hour", 6))[0]
+
+
+def _aligned(values, start: int, head: int, n: int) -> np.ndarray:
+    """values laid out from row `start`, re-indexed to n slots from row `head`."""
+    values = np.asarray(values, dtype=float)
+    out    = np.zeros(n)
+    lo, hi = max(start, head), min(start + len(values), head + n)
+    if hi > lo:
+        out[lo - head:hi - head] = values[lo - start:hi - start]
+    return out
+
+
+def _with_carry(pred: np.ndarray, carry: float, at: int) -> np.ndarray:
+    """pred with carry kWh added at slot `at`; a negative carry comes off the next slots."""
+    out = pred.copy()
+    if carry >= 0:
+        out[at] += carry
+    else:
+        taken     = np.minimum(np.cumsum(out[at:]), -carry)
+        out[at:] -= np.diff(taken, prepend=0.0)
+    return out
+
+
+@dataclass(frozen=True)
+class RollingPlan:
+    """
+    Window of a household's rolling plan, in sim-frame rows.  The plan
+    itself is the schedule dict that solve() returns.
+    """
+    head:    int                  # first row of the current plan day
+    now:     int                  # row of the current slot
+    horizon: int                  # slots solved from now on
+    carry:   dict = field(default_factory=dict)   # key → kWh moved past dropped days
+
+    @classmethod
+    def resume(
+        cls,
+        index:         SimFrameIndex,
+        sched:         dict,
+        current_hour:  float,
+        horizon_hours: Optional[int] = None,
+    ) -> Optional["RollingPlan"]:
+        """
+        The plan `sched` is at: its own if it was solved by one, else a new
+        one over its window with the current slot at clock current_hour.
+        None if sched was not planned on this sim frame.
+        """
+        if "rolling" in sched:
+            r = sched["rolling"]
+            return cls(r["head"], r["now"], r["horizon"], dict(r["carry"]))
+        head = schedule_head(index, sched)
+        if head is None:
+            return None
+        ts     = index.timestamp(head)
+        offset = (current_hour - ts.hour - ts.minute / 60) % 24
+        hours  = Config.ROLLING_HORIZON_HOURS if horizon_hours is None else horizon_hours
+        return cls(
+            head=head,
+            now=min(head + round(offset / index.slot_hours), len(index) - 1),
+            horizon=max(round(hours / index.slot_hours), 1),
+        )
+
+    def advance(self, index: SimFrameIndex, sched: dict, slots: int = 1) -> "RollingPlan":
+        """
+        The plan `slots` slots later.  Plan days the current slot has left
+        are dropped; what sched moved out of them goes into carry.
+        """
+        now   = min(self.now + slots, len(index) - 1)
+        head  = self.head
+        carry = dict(self.carry)
+        raw   = sched.get("lp_results_raw", {})
+        while now - head >= index.slots_per_day:
+            drop = slice(head - self.head, head - self.head + index.slots_per_day)
+            for key, res in raw.items():
+                moved = (np.asarray(res["original"], dtype=float)[drop].sum()
+                         - np.asarray(res["optimized"], dtype=float)[drop].sum())
+                carry[key] = carry.get(key, 0.0) + float(moved)
+            head += index.slots_per_day
+        return replace(self, head=head, now=now, carry=carry)
+
+    def hours(self, index: SimFrameIndex, stop: int) -> np.ndarray:
+        """Slot labels of rows head … stop: hours since the plan day's midnight."""
+        ts = index.ts[self.head:stop]
+        return (ts - ts[0].astype("datetime64[D]")) / np.timedelta64(1, "h")
+
+    @stage("rolling_plan")
+    def solve(
+        self,
+        index:    SimFrameIndex,
+        bands:    PriceBandModel,
+        previous: Optional[dict] = None,
+        coeffs:   Optional[LPCoefficients] = None,
+    ) -> dict:
+        """
+        Solve the window from the current slot on, the slots before it
+        keeping previous's plan.  Returns a generate_morning_schedule-shaped
+        dict with this plan's state under "rolling".
+        """
+        stop  = min(self.now + self.horizon, len(index))
+        at    = self.now - self.head
+        hours = self.hours(index, stop)
+        rows  = index.frame.iloc[self.head:stop].reset_index(drop=True)
+        for key, kwh in self.carry.items():
+            col = f"pred_{key}_kwh"
+            if col in rows and abs(kwh) >= 0.005:
+                rows[col] = _with_carry(rows[col].to_numpy(dtype=float), kwh, at)
+
+        start  = schedule_head(index, previous) if previous else None
+        locked = None
+        if start is not None:
+            locked = {
+                key: _aligned(res["optimized"], start, self.head, len(rows))
+                for key, res in previous.get("lp_results_raw", {}).items()
+            }
+
+        sched = plan_horizon(
+            rows, bands, index.slot_minutes,
+            start_hour=int(hours[0]),
+            current_hour=float(hours[at]),
+            locked_before_t=locked,
+            coeffs=coeffs,
+            hours=hours,
+        )
+        sched["rolling"] = {
+            "head":     self.head,
+            "now":      self.now,
+            "now_hour": slot_label(hours[at]),
+            "horizon":  self.horizon,
+            "carry":    {k: round(v, 4) for k, v in self.carry.items()},
+        }
+        if start is not None and previous.get("lp_model") is not None:
+            sched = self._replay_locks(index, bands, previous, start, sched)
+        return sched
+
+    def _replay_locks(
+        self,
+        index:    SimFrameIndex,
+        bands:    PriceBandModel,
+        previous: dict,
+        start:    int,
+        sched:    dict,
+    ) -> dict:
+        """Apply previous's plug-event locks that are not executed yet to sched."""
+        replayed = 0
+        for key, lock in previous["lp_model"].locked.items():
+            item = lock["item"]
+            if item is None or start + lock["slot"] < self.now or sched.get("lp_model") is None:
+                continue
+            result = handle_smart_plug_event(
+                key, 0, sched["rolling"]["now_hour"], sched, index.frame, {}, bands,
+                event_type=item["smart_plug_event"] or "manual",
+                detected_time=item["scheduled_time"],
+            )
+            sched = {
+                **sched,
+                "schedule":       result["schedule"],
+                "lp_results_raw": result["lp_results_raw"],
+                "lp_model":       result["lp_model"],
+            }
+            replayed += 1
+
+        if replayed:
+            cost = sched["lp_model"].cost_from(sched["hours_array"][0])
+            sched["optimized_cost"] = round(cost, 4)
+            sched["daily_saving"]   = round(sched["baseline_cost"] - cost, 4)
+            logger.debug("Rolling plan: %d event lock(s) replayed", replayed)
+        return sched
@@ -0,0 +1,204 @@
+"""
+schedule_cache.py — per-date LP schedule cache for /api/regenerate.
+
+A schedule is a pure function of the sim frame, the date, the start hour,
+the appliance specs and the price thresholds, so solved schedules are
+kept in an LRU keyed by
+
+    (target_date, start_hour, spec fingerprint, price thresholds)
+
+and handed out as deep copies (callers mutate STATE in place).
+
+One cache serves every market: tariffs with different PriceBandModel
+thresholds get different keys, tariffs with equal ones share entries.
+
+Optionally every schedulable date is solved ahead of time in a process
+pool from a background thread (Config.SCHEDULE_CACHE_WARMUP).
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import astuple
+from typing import Optional
+
+import pandas as pd
+
+from app.config import Config
+from app.optimizer import generate_morning_schedule
+from app.sim_index import SimFrameIndex
+from app.utils import PriceBandModel
+
+logger = logging.getLogger(__name__)
+
+
+def spec_fingerprint(specs: Optional[list]) -> str:
+    """Stable digest of the user-facing ApplianceSpec fields ("auto" if None)."""
+    if specs is None:
+        return "auto"
+    h = hashlib.sha1()
+    for s in sorted(specs, key=lambda s: s.key):
+        h.update(repr(astuple(s)).encode())
+    return h.hexdigest()[:16]
+
+
+class ScheduleCache:
+    """Thread-safe LRU of generate_morning_schedule() results."""
+
+    def __init__(self, maxsize: int = Config.SCHEDULE_CACHE_SIZE) -> None:
+        self.maxsize = max(int(maxsize), 1)
+        self.hits    = 0
+        self.misses  = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock   = threading.Lock()
+
+    @staticmethod
+    def key(
+        target_date: Optional[str],
+        bands:       PriceBandModel,
+        start_hour:  int = 6,
+        specs:       Optional[list] = None,
+    ) -> tuple:
+        return (
+            str(target_date) if target_date else None,
+            int(start_hour),
+            spec_fingerprint(specs),
+            bands.key,
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            sched = self._data.get(key)
+            if sched is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(sched)
+
+    def put(self, key: tuple, sched: dict) -> None:
+        sched = copy.deepcopy(sched)
+        with self._lock:
+            self._data[key] = sched
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_solve(
+        self,
+        index:       SimFrameIndex,
+        bands:       PriceBandModel,
+        target_date: Optional[str] = None,
+        start_hour:  int = 6,
+        specs:       Optional[list] = None,
+    ) -> dict:
+        """Cached generate_morning_schedule(); always returns a private copy."""
+        key   = self.key(target_date, bands, start_hour, specs)
+        sched = self.get(key)
+        if sched is not None:
+            logger.debug("Schedule cache HIT %s", key)
+            return sched
+
+        # specs are mutated by validate_and_fix(); keep the caller's intact
+        sched = generate_morning_schedule(
+            index.frame, bands, start_hour=start_hour, target_date=target_date,
+            specs=copy.deepcopy(specs), index=index,
+        )
+        self.put(key, sched)
+        return sched
+
+    def warm(
+        self,
+        sim:        pd.DataFrame,
+        dates:      list,
+        bands:      PriceBandModel,
+        start_hour: int = 6,
+        workers:    int = Config.SCHEDULE_WARMUP_WORKERS,
+    ) -> threading.Thread:
+        """
+        Solve every date (auto specs) in a process pool from a daemon
+        thread.  Dates beyond maxsize would only be evicted, so at most
+        maxsize dates are warmed.
+        """
+        with self._lock:
+            todo = [
+                d for d in dates[: self.maxsize]
+                if self.key(d, bands, start_hour) not in self._data
+            ]
+        thread = threading.Thread(
+            target=self._warm, args=(sim, todo, bands, start_hour, workers),
+            name="schedule-cache-warmup", daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def _warm(
+        self,
+        sim:        pd.DataFrame,
+        dates:      list,
+        bands:      PriceBandModel,
+        start_hour: int,
+        workers:    int,
+    ) -> None:
+        if not dates:
+            return
+        t0  = time.perf_counter()
+        # spawn, not fork: the parent is a threaded WSGI worker
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max(int(workers), 1),
+                mp_context=ctx,
+                initializer=_warm_init,
+                initargs=(sim, bands),
+            ) as pool:
+                futures = {
+                    pool.submit(_warm_solve, d, start_hour): d for d in dates
+                }
+                for fut in as_completed(futures):
+                    d = futures[fut]
+                    try:
+                        sched = fut.result()
+                    except Exception:
+                        logger.exception("Warm-up failed for %s", d)
+                        continue
+                    self.put(self.key(d, bands, start_hour), sched)
+        except Exception:
+            logger.exception("Schedule warm-up aborted")
+            return
+        logger.info(
+            "✅ Schedule cache warmed: %d dates in %.1fs",
+            len(dates), time.perf_counter() - t0,
+        )
+
+
+# ── Process-pool workers ──────────────────────────────────────────
+
+_WORKER_INDEX: Optional[SimFrameIndex] = None
+_WORKER_BANDS: Optional[PriceBandModel] = None
+
+
+def _warm_init(sim: pd.DataFrame, bands: PriceBandModel) -> None:
+    global _WORKER_INDEX, _WORKER_BANDS
+    _WORKER_INDEX = SimFrameIndex.build(sim)
+    _WORKER_BANDS = bands
+
+
+def _warm_solve(target_date: str, start_hour: int) -> dict:
+    return generate_morning_schedule(
+        _WORKER_INDEX.frame, _WORKER_BANDS, start_hour=start_hour, target_date=target_date,
+        index=_WORKER_INDEX,
+    )
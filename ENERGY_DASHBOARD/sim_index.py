@@ -0,0 +1,103 @@
+"""
+sim_index.py — date → row index over the simulation frame.
+
+Built once after the artefacts are loaded so that day selection, the
+one-day horizon (which spills into the next day when start_hour > 0) and
+the date listing are array slices instead of a pd.to_datetime / strftime
+pass over the whole frame on every request.  Works at any slot length;
+the index infers it (slot_minutes) from the timestamps.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SimFrameIndex:
+    frame:  pd.DataFrame          # sim frame, sorted by timestamp
+    ts:     np.ndarray            # datetime64[ns] per row
+    hour:   np.ndarray            # int hour-of-day per row
+    dates:  np.ndarray            # sorted unique "YYYY-MM-DD" strings
+    slices: dict                  # "YYYY-MM-DD" → (start, end) row range
+    slot_minutes: int = 60        # row spacing
+
+    @classmethod
+    def build(cls, sim: pd.DataFrame) -> "SimFrameIndex":
+        ts = pd.to_datetime(sim["timestamp"])
+        if not ts.is_monotonic_increasing:
+            logger.info("Sim frame not sorted by timestamp — sorting once")
+            sim = sim.sort_values("timestamp", kind="stable").reset_index(drop=True)
+            ts  = pd.to_datetime(sim["timestamp"])
+
+        ts_arr = ts.to_numpy(dtype="datetime64[ns]")
+        days, starts = np.unique(ts_arr.astype("datetime64[D]"), return_index=True)
+        ends   = np.append(starts[1:], len(ts_arr))
+        dates  = np.datetime_as_string(days, unit="D")
+        step   = np.diff(ts_arr[:2 * 24 * 60]).astype("timedelta64[m]").astype(np.int64)
+        step   = step[step > 0]
+
+        return cls(
+            frame  = sim,
+            ts     = ts_arr,
+            hour   = ts.dt.hour.to_numpy(),
+            dates  = dates,
+            slices = {
+                d: (int(s), int(e)) for d, s, e in zip(dates, starts, ends)
+            },
+            slot_minutes = int(np.median(step)) if len(step) else 60,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def slot_hours(self) -> float:
+        return self.slot_minutes / 60
+
+    @property
+    def slots_per_day(self) -> int:
+        return 1440 // self.slot_minutes
+
+    @property
+    def first_date(self) -> Optional[str]:
+        return str(self.dates[0]) if len(self.dates) else None
+
+    def date_list(self) -> list:
+        return self.dates.tolist()
+
+    def timestamp(self, i: int) -> pd.Timestamp:
+        return pd.Timestamp(self.ts[i])
+
+    def day_slice(self, date: Optional[str]) -> tuple[int, int]:
+        """Row range of one date; unknown or missing dates → first date."""
+        if date is not None and str(date) in self.slices:
+            return self.slices[str(date)]
+        return self.slices[self.first_date] if len(self.dates) else (0, 0)
+
+    def day(self, date: Optional[str]) -> pd.DataFrame:
+        start, end = self.day_slice(date)
+        return self.frame.iloc[start:end]
+
+    def window(
+        self,
+        target_date: Optional[str],
+        start_hour:  int,
+        n_rows:      Optional[int] = None,
+    ) -> tuple[int, int]:
+        """
+        Row range of the scheduling horizon: the first row of the day at
+        or after start_hour, then n_rows consecutive rows — one day of
+        slots by default — continuing into the following day(s) when the
+        day runs out.
+        """
+        n_rows     = self.slots_per_day if n_rows is None else n_rows
+        start, end = self.day_slice(target_date)
+        first = start + int(np.searchsorted(self.hour[start:end], start_hour))
+        return first, min(first + n_rows, len(self.ts))
@@ -0,0 +1,104 @@
+"""
+startup.py — staged application startup with per-phase timings.
+
+create_app() hands its loading work (artefacts, markets, sim index, first
+LP schedule, …) to Startup.run(), which executes the phases in a
+background thread (Config.STARTUP_BACKGROUND) so the WSGI server can
+accept connections — and answer liveness probes — immediately.
+
+  live     the process is up                       (always, once created)
+  ready    the phases needed to serve requests ran (/health/ready → 200)
+  done     the optional phases after those ran too (e.g. the forecaster)
+
+Each phase's wall time is recorded and reported by snapshot().
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Startup:
+    def __init__(self) -> None:
+        self.created  = time.time()
+        self.phase:   Optional[str] = None      # running phase
+        self.timings: dict[str, float] = {}     # finished phase → seconds
+        self.error:   Optional[str] = None
+        self._ready   = threading.Event()
+        self._done    = threading.Event()
+        self._t0      = time.perf_counter()
+        self.ready_after: Optional[float] = None   # seconds from creation
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    @contextmanager
+    def timed(self, name: str):
+        self.phase = name
+        t0 = time.perf_counter()
+        yield
+        self.timings[name] = round(time.perf_counter() - t0, 4)
+        logger.info("Startup phase %-16s %.3f s", name, self.timings[name])
+        self.phase = None
+
+    def snapshot(self) -> dict:
+        return {
+            "ready":       self.ready,
+            "done":        self.done,
+            "phase":       self.phase,
+            "error":       self.error,
+            "phases":      dict(self.timings),
+            "ready_after": self.ready_after,
+            "uptime":      round(time.time() - self.created, 3),
+        }
+
+    def run(
+        self,
+        phases:     list[tuple[str, Callable[[], None]]],
+        after:      list[tuple[str, Callable[[], None]]] = (),
+        background: bool = Config.STARTUP_BACKGROUND,
+    ) -> None:
+        """
+        Run `phases`, mark ready, then run `after`.  In the foreground a
+        failing phase raises as before; in the background it is recorded
+        (readiness then reports the error instead of ever turning ready).
+        """
+        def _go() -> None:
+            try:
+                for name, fn in phases:
+                    with self.timed(name):
+                        fn()
+                self.ready_after = round(time.perf_counter() - self._t0, 4)
+                self._ready.set()
+                logger.info("✅ Ready after %.3f s", self.ready_after)
+                for name, fn in after:
+                    with self.timed(name):
+                        fn()
+            except Exception as exc:
+                self.error = f"{self.phase}: {exc}"
+                logger.exception("Startup failed in phase %s", self.phase)
+                if not background:
+                    raise
+            finally:
+                self._done.set()
+
+        if background:
+            threading.Thread(target=_go, name="startup", daemon=True).start()
+        else:
+            _go()
@@ -0,0 +1,319 @@
+"""
+state_store.py — per-household runtime state (schedules, override history,
+simulation clock) behind a pluggable, optimistically locked store.
+
+Every household's STATE dict is stored together with a version number
+(pickled in the shared backends).  Writers read (state, version), change
+the state and write it back only if the version is unchanged; a
+concurrent writer in another request, thread or worker process makes the
+write fail with StaleStateError and update() simply re-runs the change on
+fresh state.  States handed out by get() are read-only snapshots: the
+memory store shares its live object with readers and copies it only for
+update().
+
+Backends (Config.STATE_STORE):
+  memory                     → MemoryStateStore  (single process, default)
+  sqlite:///path/state.db    → SQLiteStateStore  (shared by the gunicorn
+                                workers of one host; also the local
+                                stand-in for Redis in tests)
+  redis://host:6379/0        → RedisStateStore   (shared across hosts;
+                                needs the optional `redis` package)
+"""
+from __future__ import annotations
+
+import logging
+import pickle
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class StaleStateError(RuntimeError):
+    """A household's state changed between read and write."""
+
+
+@dataclass(frozen=True)
+class Versioned:
+    state:   dict
+    version: int
+
+
+class StateStore(ABC):
+    """
+    Base class: backends implement _read (→ (version, blob) or None),
+    _write (compare-and-set; expected version 0 means "must not exist"),
+    version() and households().  _dump / _load turn a state into the
+    backend's blob and back (pickle unless overridden).
+
+    epoch tells apart stores whose versions could repeat: it is random
+    for the memory store (versions restart with the process) and fixed
+    for the shared ones.
+    """
+
+    backend = "base"
+    epoch   = "0"
+
+    # ── Backend interface ─────────────────────────────────────
+
+    @abstractmethod
+    def _read(self, household: str) -> Optional[tuple[int, Any]]:
+        ...
+
+    @abstractmethod
+    def _write(self, household: str, blob: Any, expected: int) -> bool:
+        ...
+
+    @abstractmethod
+    def version(self, household: str) -> int:
+        """Current version without loading the state (0 = no state yet)."""
+
+    @abstractmethod
+    def households(self) -> list:
+        ...
+
+    def _dump(self, state: dict) -> Any:
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, blob: Any) -> dict:
+        return pickle.loads(blob)
+
+    def _writable(self, state: dict) -> dict:
+        """A copy of a state from get() that update() may change (get's own by default)."""
+        return state
+
+    def wait_for_change(self, household: str, version: int, timeout: float) -> int:
+        """Block until the version differs from `version` or timeout; returns it."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = self.version(household)
+            remaining = deadline - time.monotonic()
+            if current != version or remaining <= 0:
+                return current
+            time.sleep(min(Config.STATE_POLL_SECONDS, remaining))
+
+    # ── Public API ────────────────────────────────────────────
+
+    def get(self, household: str) -> Optional[Versioned]:
+        """The household's state (read-only — change it through update()), or None."""
+        row = self._read(household)
+        if row is None:
+            return None
+        version, blob = row
+        return Versioned(self._load(blob), version)
+
+    def put(self, household: str, state: dict, version: int) -> int:
+        """Write state read at `version`; returns the new version.  state must not change after."""
+        if not self._write(household, self._dump(state), version):
+            raise StaleStateError(f"State of {household!r} changed since version {version}")
+        return version + 1
+
+    def get_or_create(self, household: str, factory: Callable[[], dict]) -> Versioned:
+        """The household's state, initialised from factory() on first use."""
+        current = self.get(household)
+        if current is not None:
+            return current
+        try:
+            self.put(household, factory(), 0)
+        except StaleStateError:
+            pass                                # created concurrently
+        return self.get(household)
+
+    def update(
+        self,
+        household: str,
+        change:    Callable[[dict], Any],
+        factory:   Callable[[], dict],
+        retries:   int = Config.STATE_STORE_RETRIES,
+    ) -> tuple[Any, Versioned]:
+        """
+        Apply change(state) — which mutates state in place — and write the
+        result back, re-running it on fresh state after a conflicting write.
+        Returns (whatever change returned, the committed state).
+        """
+        for attempt in range(retries + 1):
+            current = self.get_or_create(household, factory)
+            state   = self._writable(current.state)
+            result  = change(state)
+            try:
+                version = self.put(household, state, current.version)
+                return result, Versioned(state, version)
+            except StaleStateError:
+                logger.info("State conflict for %s (attempt %d) — retrying", household, attempt + 1)
+        raise StaleStateError(f"State of {household!r} kept changing — gave up after {retries + 1} attempts")
+
+
+# ══════════════════════════════════════════════════════════════════
+# Backends
+# ══════════════════════════════════════════════════════════════════
+
+class MemoryStateStore(StateStore):
+    """
+    Process-local store of the live state objects.  Reads share them and
+    pay no serialisation; update() changes a copy and swaps it in.
+    """
+
+    backend = "memory"
+
+    def __init__(self) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+        self._rows: dict[str, tuple[int, dict]] = {}
+        self._cond = threading.Condition()
+
+    def _dump(self, state):
+        return state
+
+    def _load(self, blob):
+        return blob
+
+    def _writable(self, state):
+        # pickling round-trips the numpy-heavy state faster than deepcopy
+        return pickle.loads(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _read(self, household):
+        with self._cond:
+            return self._rows.get(household)
+
+    def _write(self, household, blob, expected):
+        with self._cond:
+            version = self._rows.get(household, (0, None))[0]
+            if version != expected:
+                return False
+            self._rows[household] = (version + 1, blob)
+            self._cond.notify_all()
+            return True
+
+    def version(self, household):
+        with self._cond:
+            return self._rows.get(household, (0, None))[0]
+
+    def households(self):
+        with self._cond:
+            return sorted(self._rows)
+
+    def wait_for_change(self, household, version, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self.version(household) != version, timeout)
+            return self.version(household)
+
+
+class SQLiteStateStore(StateStore):
+    """One SQLite file shared by every process that opens it (WAL mode)."""
+
+    backend = "sqlite"
+
+    def __init__(self, path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS household_state ("
+            " household TEXT PRIMARY KEY,"
+            " version   INTEGER NOT NULL,"
+            " state     BLOB NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _read(self, household):
+        return self._conn().execute(
+            "SELECT version, state FROM household_state WHERE household = ?",
+            (household,),
+        ).fetchone()
+
+    def _write(self, household, blob, expected):
+        if expected == 0:
+            cur = self._conn().execute(
+                "INSERT OR IGNORE INTO household_state VALUES (?, 1, ?)",
+                (household, blob),
+            )
+        else:
+            cur = self._conn().execute(
+                "UPDATE household_state SET version = version + 1, state = ?"
+                " WHERE household = ? AND version = ?",
+                (blob, household, expected),
+            )
+        return cur.rowcount == 1
+
+    def version(self, household):
+        row = self._conn().execute(
+            "SELECT version FROM household_state WHERE household = ?", (household,),
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def households(self):
+        rows = self._conn().execute("SELECT household FROM household_state ORDER BY household")
+        return [r[0] for r in rows]
+
+
+class RedisStateStore(StateStore):
+    """Redis hash per household; compare-and-set via WATCH/MULTI."""
+
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = "energy:state:") -> None:
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImportError(
+                "STATE_STORE=redis://… needs the `redis` package (pip install redis)"
+            ) from exc
+        self._redis  = redis
+        self._client = redis.Redis.from_url(url)
+        self.prefix  = prefix
+
+    def _read(self, household):
+        version, blob = self._client.hmget(self.prefix + household, "version", "state")
+        return None if version is None else (int(version), blob)
+
+    def _write(self, household, blob, expected):
+        key = self.prefix + household
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                version = pipe.hget(key, "version")
+                if int(version or 0) != expected:
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping={"version": expected + 1, "state": blob})
+                pipe.execute()
+                return True
+            except self._redis.WatchError:
+                return False
+
+    def version(self, household):
+        return int(self._client.hget(self.prefix + household, "version") or 0)
+
+    def households(self):
+        n = len(self.prefix)
+        return sorted(k.decode()[n:] for k in self._client.scan_iter(self.prefix + "*"))
+
+
+def open_state_store(url: str = Config.STATE_STORE) -> StateStore:
+    """Store for a Config.STATE_STORE url (see module docstring)."""
+    url = (url or "memory").strip()
+    if url == "memory":
+        store = MemoryStateStore()
+    elif url.startswith("sqlite:"):
+        path = url[len("sqlite:"):]
+        store = SQLiteStateStore(path[2:] if path.startswith("//") else path)
+    elif url.startswith(("redis://", "rediss://", "unix://")):
+        store = RedisStateStore(url)
+    else:
+        raise ValueError(f"Unknown STATE_STORE: {url!r}")
+    logger.info("State store: %s", store.backend)
+    return store
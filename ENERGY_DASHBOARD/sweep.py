@@ -0,0 +1,318 @@
+"""
+sweep.py — evaluate LP coefficient sets (optimizer.LPCoefficients) over
+many days and report the cost / comfort trade-off.
+
+    python -m app.sweep --grid solar_bonus=0.4,0.6,0.8 peak_penalty=1,2,3
+    python -m app.sweep --samples 64 solar_bonus=0.2:1.0 high_cap_mult=0.3:1.0 \\
+        [--market default] [--start 2023-01-01 --end 2023-12-31] [--every 3] \\
+        [--workers 8] [--out sweep.csv]
+
+A parameter is an LPCoefficients field followed by either a value list
+(name=v1,v2,…) or a uniform range (name=lo:hi, random sampling only).
+--grid takes the cartesian product of the lists, --samples N draws N
+sets; fields not mentioned keep their Config.LP_* value, and the
+configured set itself is always evaluated as set 0.
+
+The dates are partitioned and spread over processes exactly like the
+backtest (Config.BACKTEST_WORKERS / _CHUNK_DAYS / _MEMORY_MB).  Inside
+a partition each day's run_lp_day inputs — predictions, solar, prices,
+hours and auto specs — are extracted once and re-solved under every
+set.  Per set, averaged over the days:
+
+  optimized_cost, saving   € per day; saving against the day's grid cost
+                           with every appliance left at its predicted
+                           profile, which is the same for every set
+  shifted_kwh              flexible energy moved off its predicted slot
+  shift_hours              mean distance (h) each flexible kWh was moved
+  high_kwh                 flexible energy left in HIGH-price slots
+  peak_grid_kwh            largest single-slot grid import
+
+`pareto` marks the sets no other set beats on optimized_cost,
+shifted_kwh and shift_hours at once.
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import itertools
+import logging
+import sys
+import time
+from dataclasses import dataclass, fields, replace
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Allow running as `python -m app.sweep` or `python app/sweep.py`
+if __name__ == "__main__" and __package__ is None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.backtest import load_sim_frame, map_partitions, select_dates, write_table
+from app.config import Config
+from app.optimizer import STANDBY_KWH, LPCoefficients, auto_specs, horizon_inputs, run_lp_day
+from app.sim_index import SimFrameIndex
+from app.utils import BAND_HIGH, PriceBandModel, price_markets
+
+logger = logging.getLogger(__name__)
+
+PARAMETERS = [f.name for f in fields(LPCoefficients)]
+OBJECTIVES = ["optimized_cost", "shifted_kwh", "shift_hours"]
+
+_DAY_COLUMNS = [
+    "set", "date", "baseline_cost", "optimized_cost", "saving", "flexible_kwh",
+    "shifted_kwh", "moved_kwh_h", "high_kwh", "peak_grid_kwh", "failed",
+]
+
+
+# ══════════════════════════════════════════════════════════════════
+# Search space
+# ══════════════════════════════════════════════════════════════════
+
+def parse_space(items: list) -> dict:
+    """["name=v1,v2", "name=lo:hi", …] → {name: [values] | (lo, hi)}."""
+    space: dict = {}
+    for item in items:
+        name, _, spec = item.partition("=")
+        if name not in PARAMETERS or not spec:
+            raise ValueError(f"Bad parameter {item!r}; expected one of {PARAMETERS} as name=…")
+        if ":" in spec:
+            lo, hi = (float(v) for v in spec.split(":", 1))
+            space[name] = (min(lo, hi), max(lo, hi))
+        else:
+            space[name] = [float(v) for v in spec.split(",") if v.strip()]
+    return space
+
+
+def grid(space: dict, base: Optional[LPCoefficients] = None) -> list:
+    """Every combination of the value lists, on top of `base`."""
+    ranges = [n for n, v in space.items() if isinstance(v, tuple)]
+    if ranges:
+        raise ValueError(f"Ranges {ranges} need --samples; give value lists for a grid")
+    base  = base or LPCoefficients()
+    names = list(space)
+    return [replace(base, **dict(zip(names, combo)))
+            for combo in itertools.product(*(space[n] for n in names))]
+
+
+def sample(space: dict, n: int, seed: int = 0, base: Optional[LPCoefficients] = None) -> list:
+    """n sets drawn uniformly from the ranges / value lists, on top of `base`."""
+    rng  = np.random.default_rng(seed)
+    base = base or LPCoefficients()
+    sets = []
+    for _ in range(n):
+        values = {
+            name: rng.uniform(*v) if isinstance(v, tuple) else rng.choice(v)
+            for name, v in space.items()
+        }
+        sets.append(replace(base, **values))
+    return sets
+
+
+# ══════════════════════════════════════════════════════════════════
+# Evaluation
+# ══════════════════════════════════════════════════════════════════
+
+def unshifted_cost(preds: dict, solar: np.ndarray, prices: np.ndarray, slot_hours: float) -> float:
+    """Grid cost of a horizon with every appliance at its predicted profile."""
+    load = sum(preds.values(), np.full(len(prices), STANDBY_KWH * slot_hours))
+    return float(np.maximum(load - solar, 0.0) @ prices)
+
+
+@dataclass(frozen=True)
+class DayInputs:
+    """run_lp_day arguments of one horizon, shared by every coefficient set."""
+    date:          str
+    preds:         dict
+    solar:         np.ndarray
+    prices:        np.ndarray
+    hours:         np.ndarray
+    specs:         list
+    slot_hours:    float
+    baseline_cost: float
+
+    @classmethod
+    def from_index(cls, index: SimFrameIndex, date: str, start_hour: int = 0) -> "DayInputs":
+        start, stop = index.window(date, start_hour)
+        preds, solar, prices, hours = horizon_inputs(index.frame.iloc[start:stop])
+        preds  = {k: np.asarray(v, dtype=float) for k, v in preds.items()}
+        solar  = np.asarray(solar, dtype=float)
+        prices = np.asarray(prices, dtype=float)
+        return cls(
+            date=date,
+            preds=preds,
+            solar=solar,
+            prices=prices,
+            hours=hours,
+            specs=auto_specs(preds),
+            slot_hours=index.slot_hours,
+            baseline_cost=unshifted_cost(preds, solar, prices, index.slot_hours),
+        )
+
+
+def evaluate(day: DayInputs, coeffs: LPCoefficients, bands: PriceBandModel) -> dict:
+    """
+    Cost and comfort metrics of one day solved under one coefficient set.
+    run_lp_day's own baseline is accumulated over the optimized plans, so
+    it moves with the coefficients; the saving uses day.baseline_cost.
+    """
+    lp_df, opt_cost, _, results = run_lp_day(
+        day.preds, day.solar, day.prices, day.hours, bands,
+        specs=copy.deepcopy(day.specs), coeffs=coeffs, slot_hours=day.slot_hours,
+    )
+    high = bands.codes(day.prices) == BAND_HIGH
+    flexible = shifted = moved = high_kwh = 0.0
+    for res in results.values():
+        o = np.asarray(res["original"], dtype=float)
+        x = np.asarray(res["optimized"], dtype=float)
+        flexible += float(o.sum())
+        shifted  += float(np.maximum(o - x, 0.0).sum())
+        # earth mover's distance between the two profiles, in kWh·h
+        moved    += float(np.abs(np.cumsum(o) - np.cumsum(x)).sum()) * day.slot_hours
+        high_kwh += float(x[high].sum())
+    return {
+        "baseline_cost":  day.baseline_cost,
+        "optimized_cost": opt_cost,
+        "saving":         day.baseline_cost - opt_cost,
+        "flexible_kwh":   flexible,
+        "shifted_kwh":    shifted,
+        "moved_kwh_h":    moved,
+        "high_kwh":       high_kwh,
+        "peak_grid_kwh":  float(lp_df["grid_kwh"].max()) if len(lp_df) else 0.0,
+        "failed":         False,
+    }
+
+
+def evaluate_partition(
+    part:       pd.DataFrame,
+    dates:      list,
+    sets:       list,
+    bands:      PriceBandModel,
+    start_hour: int,
+) -> dict:
+    """Columns of every (set, date) row of one partition; inputs built once per date."""
+    index = SimFrameIndex.build(part)
+    cols: dict = {c: [] for c in _DAY_COLUMNS}
+    for date in dates:
+        day = DayInputs.from_index(index, date, start_hour)
+        for i, coeffs in enumerate(sets):
+            try:
+                row = evaluate(day, coeffs, bands)
+            except Exception:
+                logger.exception("Sweep: set %d failed on %s", i, date)
+                row = {c: np.nan for c in _DAY_COLUMNS} | {"failed": True}
+            row.update(set=i, date=date)
+            for c in _DAY_COLUMNS:
+                cols[c].append(row[c])
+    return cols
+
+
+def pareto_front(table: pd.DataFrame, objectives: list = OBJECTIVES) -> np.ndarray:
+    """True for rows no other row matches or beats on every objective (all minimised)."""
+    v    = table[objectives].to_numpy(dtype=float)
+    keep = np.ones(len(v), dtype=bool)
+    for i in range(len(v)):
+        dominated = np.all(v <= v[i], axis=1) & np.any(v < v[i], axis=1)
+        keep[i]   = not dominated.any()
+    return keep
+
+
+def run_sweep(
+    sim:        pd.DataFrame,
+    sets:       list,
+    bands:      PriceBandModel,
+    start:      Optional[str] = None,
+    end:        Optional[str] = None,
+    every:      int = 1,
+    start_hour: int = 0,
+    workers:    int = Config.BACKTEST_WORKERS,
+    chunk_days: int = Config.BACKTEST_CHUNK_DAYS,
+    memory_mb:  int = Config.BACKTEST_MEMORY_MB,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(per-set table with coefficients, metrics and `pareto`, per-day rows)."""
+    index = SimFrameIndex.build(sim)
+    dates = select_dates(index, start, end)[::max(int(every), 1)]
+    cols: dict = {c: [] for c in _DAY_COLUMNS}
+
+    t0, done = time.perf_counter(), 0
+    for chunk, part_cols in map_partitions(
+        index, dates, evaluate_partition, (sets, bands, start_hour),
+        workers, chunk_days, memory_mb,
+    ):
+        for c in _DAY_COLUMNS:
+            cols[c].extend(part_cols[c])
+        done += len(chunk)
+        logger.info("Sweep: %d / %d dates × %d sets (%.1fs)",
+                    done, len(dates), len(sets), time.perf_counter() - t0)
+
+    days = pd.DataFrame(cols)
+    ok   = days[~days["failed"].astype(bool)]
+    agg  = ok.groupby("set").agg(
+        days           = ("date", "count"),
+        optimized_cost = ("optimized_cost", "mean"),
+        saving         = ("saving", "mean"),
+        shifted_kwh    = ("shifted_kwh", "mean"),
+        moved_kwh_h    = ("moved_kwh_h", "sum"),
+        flexible_kwh   = ("flexible_kwh", "sum"),
+        high_kwh       = ("high_kwh", "mean"),
+        peak_grid_kwh  = ("peak_grid_kwh", "mean"),
+    )
+    agg["shift_hours"] = agg.pop("moved_kwh_h") / agg.pop("flexible_kwh").where(lambda s: s > 0)
+    agg["failed"]      = days.groupby("set")["failed"].sum().reindex(agg.index, fill_value=0)
+
+    coeffs = pd.DataFrame([c.as_dict() for c in sets]).rename_axis("set")
+    table  = coeffs.join(agg, how="inner")
+    table["pareto"] = pareto_front(table.fillna({"shift_hours": 0.0}))
+    return table.sort_values("optimized_cost").reset_index(), days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the LP tuning coefficients over many days")
+    parser.add_argument("params", nargs="*", metavar="name=values",
+                        help=f"v1,v2,… or lo:hi for any of {', '.join(PARAMETERS)}")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--grid", action="store_true", help="Cartesian product of the value lists")
+    mode.add_argument("--samples", type=int, help="Number of random sets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--market", default="default", help="Tariff whose bands are used")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--every", type=int, default=1, help="Use every n-th date")
+    parser.add_argument("--start-hour", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=Config.BACKTEST_WORKERS,
+                        help="Solver processes (0 = in-process)")
+    parser.add_argument("--chunk-days", type=int, default=Config.BACKTEST_CHUNK_DAYS)
+    parser.add_argument("--memory-mb", type=int, default=Config.BACKTEST_MEMORY_MB)
+    parser.add_argument("--out", type=Path, default=Path("sweep.csv"), help=".csv or .parquet")
+    parser.add_argument("--days-out", type=Path, help="Also write the per-day rows here")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s  %(levelname)s  %(name)s — %(message)s")
+
+    try:
+        space = parse_space(args.params)
+        cand  = grid(space) if args.grid else sample(space, args.samples, args.seed)
+    except ValueError as exc:
+        parser.error(str(exc))
+    sets = list(dict.fromkeys([LPCoefficients(), *cand]))      # set 0 = configured
+
+    sim, bands = load_sim_frame()
+    markets    = price_markets(bands, Config.PRICE_MARKETS)
+    if args.market not in markets:
+        parser.error(f"unknown market {args.market!r}; configured: {sorted(markets)}")
+
+    table, days = run_sweep(
+        sim, sets, markets[args.market], args.start, args.end, args.every, args.start_hour,
+        args.workers, args.chunk_days, args.memory_mb,
+    )
+    write_table(table, args.out)
+    if args.days_out:
+        write_table(days, args.days_out)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(table[table["pareto"]].round(4).to_string(index=False))
+    if len(table) > 1 and np.ptp(table["optimized_cost"].to_numpy(dtype=float)) < 1e-6:
+        print(f"\noptimized_cost is the same under all {len(table)} sets — "
+              "only shifted_kwh / shift_hours rank them")
+    print(f"\n{int(table['pareto'].sum())} Pareto-optimal of {len(table)} sets — wrote {args.out}")
@@ -0,0 +1,111 @@
+"""
+Shared fixtures.  The package is deployed as `app` (see docker/); when
+the tests run from a checkout, ENERGY_DASHBOARD is registered under that
+name so the modules' `from app.X import …` resolve.
+"""
+import importlib.util
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+_PKG = Path(__file__).resolve().parent.parent
+
+if "app" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "app", _PKG / "__init__.py", submodule_search_locations=[str(_PKG)],
+    )
+    sys.modules["app"] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules["app"])
+
+from app.config import Config  # noqa: E402
+from app.utils import PriceBandModel, enrich_sim_frame  # noqa: E402
+
+
+def write_house_csv(path: Path, days: int, seed: int = 1) -> pd.DataFrame:
+    """Minute-level H1_combined.csv with the appliance columns."""
+    rng = np.random.default_rng(seed)
+    n   = days * 1440
+    ts  = pd.date_range("2023-02-01", periods=n, freq="min")
+    h   = ts.hour.to_numpy()
+    ac1    = np.where((h > 12) & (h < 18), rng.uniform(0, 1500, n), 0)
+    ac2    = np.where(h > 19, rng.uniform(0, 900, n), 0)
+    boiler = np.where((h == 7) | (h == 21), rng.uniform(1000, 2000, n), 0)
+    fridge = rng.uniform(30, 60, n)
+    wm     = np.where(rng.uniform(size=n) < 0.01, 2000, 0)
+    df = pd.DataFrame({
+        "timestamp":       ts.strftime("%Y-%m-%d %H:%M:%S"),
+        "P_agg":           ac1 + ac2 + boiler + fridge + wm + rng.uniform(100, 400, n),
+        "ac_1":            ac1,
+        "ac_2":            ac2,
+        "boiler":          boiler,
+        "fridge":          fridge,
+        "washing_machine": wm,
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch) -> Path:
+    """
+    Small synthetic source files (house, solar, prices) with Config's data
+    and artefact paths pointed into tmp_path.
+    """
+    data   = tmp_path / "data"
+    models = tmp_path / "models"
+    data.mkdir()
+    for name, value in {
+        "DATA_DIR":           data,
+        "MODELS_DIR":         models,
+        "LOG_DIR":            tmp_path / "logs",
+        "HOUSE_PATH":         data / "H1_combined.csv",
+        "SOLAR_PATH":         data / "generation_final.csv",
+        "PRICE_FACTURACION":  data / "PrecioFacturacion.xlsx",
+        "MODEL_REGISTRY_DIR": models / "registry",
+        "EVAL_STORE_DIR":     models / "eval",
+        "ARTEFACT_STORE_DIR": models / "store",
+        "INPUT_CACHE_DIR":    models / "inputs",
+    }.items():
+        monkeypatch.setattr(Config, name, value)
+
+    rng = np.random.default_rng(2)
+    hrs = pd.date_range("2023-01-01", "2023-03-31 23:00", freq="h")
+    h   = hrs.hour.to_numpy()
+    price = (100 + 60 * ((h >= 10) & (h < 14)) + 90 * ((h >= 18) & (h < 22))
+             + rng.uniform(0, 40, len(hrs)))
+    pd.DataFrame({"hora": np.arange(len(hrs)), "precio": price}).to_excel(
+        Config.PRICE_FACTURACION, index=False,
+    )
+    solar = np.clip(np.sin((h - 6) / 12 * np.pi), 0, None) * 4000 * rng.uniform(0.5, 1, len(hrs))
+    pd.DataFrame({
+        "timestamp":  (hrs + pd.Timedelta(minutes=10)).strftime("%Y-%m-%d %H:%M:%S"),
+        "generation": solar,
+    }).to_csv(Config.SOLAR_PATH, index=False)
+    return data
+
+
+@pytest.fixture
+def sim_frame() -> tuple[pd.DataFrame, PriceBandModel]:
+    """(sim frame, bands): five synthetic days with sun at noon and evening peaks."""
+    rng   = np.random.default_rng(0)
+    ts    = pd.date_range("2023-06-01", periods=5 * 24, freq="h")
+    h     = ts.hour.to_numpy()
+    n     = len(ts)
+    price = (0.1 + 0.1 * ((h >= 10) & (h < 14)) + 0.15 * ((h >= 18) & (h < 22))
+             + rng.uniform(0, 0.05, n))
+    bands = PriceBandModel(float(np.quantile(price, 0.33)), float(np.quantile(price, 0.67)))
+    sim   = pd.DataFrame({
+        "timestamp":                 ts,
+        "actual_consumption_kwh":    rng.uniform(0.2, 1, n),
+        "predicted_consumption_kwh": rng.uniform(0.2, 1, n),
+        "predicted_solar_kwh":       np.clip(np.sin((h - 6) / 12 * np.pi), 0, None)
+                                     * 1.2 * rng.uniform(0.6, 1, n),
+    })
+    for target, scale in [("ac1_kwh", 0.3), ("ac2_kwh", 0.2), ("boiler_kwh", 0.25),
+                          ("fridge_kwh", 0.04), ("wm_kwh", 0.15)]:
+        sim[f"pred_{target}"] = rng.uniform(0, scale, n)
+    df_fac = pd.DataFrame({"timestamp": ts, "price_facturacion": price})
+    return enrich_sim_frame(sim, df_fac, bands), bands
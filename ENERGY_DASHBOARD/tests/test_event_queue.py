@@ -0,0 +1,26 @@
+"""Coalescing event intake (event_queue.EventQueue)."""
+from app.event_queue import EventQueue
+
+EVENT = {"appliance_key": "boiler", "hour": 14, "minute": 0, "event_type": "manual"}
+
+
+def test_retry_after_failed_batch_is_applied():
+    calls = []
+
+    def apply(household, events):
+        calls.append(events)
+        if len(calls) == 1:
+            raise RuntimeError("solver down")
+        return {"applied": len(events)}
+
+    queue = EventQueue(apply, window_ms=0, dedup_seconds=60)
+    first = queue.submit("h", dict(EVENT))
+    assert first.wait(5) and first.status == "error"
+
+    retry = queue.submit("h", dict(EVENT))
+    assert retry.wait(5)
+    assert retry.status == "done" and retry.result == {"applied": 1}
+
+    again = queue.submit("h", dict(EVENT))
+    assert again.status == "duplicate" and again.duplicate_of == retry.id
+    queue.close()
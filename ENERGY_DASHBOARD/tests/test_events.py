@@ -0,0 +1,31 @@
+"""Incremental plug events (optimizer._incremental_event) against a full re-solve."""
+import copy
+
+import pytest
+
+from app.optimizer import LPModel, generate_morning_schedule, handle_smart_plug_event
+from app.sim_index import SimFrameIndex
+
+
+def test_incremental_event_matches_forced_resolve(sim_frame, monkeypatch):
+    sim, bands = sim_frame
+    index      = SimFrameIndex.build(sim)
+    binds      = LPModel.binds
+    checked    = 0
+    for date in index.slices:
+        sched = generate_morning_schedule(sim, bands, start_hour=6, target_date=date, index=index)
+        for key in sched["lp_model"].keys:
+            for hour in range(6, 23):
+                event = handle_smart_plug_event(
+                    key, hour, 6, copy.deepcopy(sched), sim, {}, bands,
+                )
+                monkeypatch.setattr(LPModel, "binds", lambda self, slot, current_hour: True)
+                forced = handle_smart_plug_event(
+                    key, hour, 6, copy.deepcopy(sched), sim, {}, bands,
+                )
+                monkeypatch.setattr(LPModel, "binds", binds)
+                assert forced["resolve"]["mode"] == "incremental"
+                assert event["new_cost"] == pytest.approx(forced["new_cost"], abs=1e-4), \
+                    (date, key, hour, event["resolve"]["mode"])
+                checked += 1
+    assert checked
@@ -0,0 +1,20 @@
+"""Encoded GET bodies (payload_cache.PayloadCache)."""
+from app.payload_cache import PayloadCache
+
+
+def test_peek_never_builds():
+    cache = PayloadCache(maxsize=4)
+    assert cache.peek("h", 1, "plan") is None
+    assert len(cache) == 0
+
+    assert cache.get_or_build("h", 1, "plan", lambda: b"v1") == b"v1"
+    assert cache.peek("h", 1, "plan") == b"v1"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_newer_version_drops_older():
+    cache = PayloadCache(maxsize=4)
+    cache.get_or_build("h", 1, "plan", lambda: b"v1")
+    cache.get_or_build("h", 2, "plan", lambda: b"v2")
+    assert cache.peek("h", 1, "plan") is None
+    assert cache.peek("h", 2, "plan") == b"v2"
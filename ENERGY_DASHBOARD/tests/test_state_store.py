@@ -0,0 +1,53 @@
+"""Household state stores (state_store.py)."""
+import numpy as np
+import pytest
+
+from app.state_store import (
+    MemoryStateStore, SQLiteStateStore, StaleStateError, StateStore,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path) -> StateStore:
+    if request.param == "memory":
+        return MemoryStateStore()
+    return SQLiteStateStore(tmp_path / "state.db")
+
+
+def test_update_leaves_earlier_snapshots_alone(store):
+    initial = {"hour": 6, "x": np.zeros(3)}
+    before  = store.get_or_create("h", lambda: initial)
+
+    def change(state):
+        state["hour"] += 1
+        state["x"][0] = 1.0
+        return state["hour"]
+
+    result, after = store.update("h", change, lambda: initial)
+    assert result == 7 and after.version == before.version + 1
+    assert before.state["hour"] == 6 and before.state["x"][0] == 0.0
+    assert initial == {"hour": 6, "x": initial["x"]} and initial["x"][0] == 0.0
+    assert store.get("h").state["hour"] == 7 and store.version("h") == after.version
+
+
+def test_stale_write_is_rejected(store):
+    store.put("h", {"v": 1}, 0)
+    seen = store.get("h")
+    store.put("h", {"v": 2}, seen.version)
+    with pytest.raises(StaleStateError):
+        store.put("h", {"v": 3}, seen.version)
+
+
+def test_memory_reads_share_the_live_state():
+    store = MemoryStateStore()
+    store.put("h", {"v": 1}, 0)
+    assert store.get("h").state is store.get("h").state
+
+
+def test_backend_without_interface_fails_at_construction():
+    class Partial(StateStore):
+        def _read(self, household):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
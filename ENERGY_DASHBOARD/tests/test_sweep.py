@@ -0,0 +1,17 @@
+"""Coefficient sweep (sweep.run_sweep)."""
+from dataclasses import replace
+
+from app.optimizer import LPCoefficients
+from app.sweep import run_sweep
+
+
+def test_baseline_is_shared_by_every_set(sim_frame):
+    sim, bands = sim_frame
+    base = LPCoefficients()
+    sets = [base, replace(base, solar_bonus=0.1, peak_penalty=5.0), replace(base, high_cap_mult=0.1)]
+    _, days = run_sweep(sim, sets, bands, workers=0)
+
+    assert not days["failed"].any()
+    assert (days.groupby("date")["baseline_cost"].nunique() == 1).all()
+    saving = days["baseline_cost"] - days["optimized_cost"]
+    assert (days["saving"] - saving).abs().max() < 1e-9
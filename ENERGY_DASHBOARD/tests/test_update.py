@@ -0,0 +1,47 @@
+"""Incremental --update (train_models.run_update) against a full parse."""
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from app.artefacts import ArtefactStore
+from app.config import Config
+from app.input_cache import InputCache
+from app.train_models import house_cache_key, load_house_data, run_training, run_update
+from conftest import write_house_csv
+
+
+def test_update_reaggregates_partial_last_hour(data_dir):
+    full = write_house_csv(Config.HOUSE_PATH, days=14)
+    # cut the file off 20 minutes into an hour, train on that, grow it back
+    cut = int(pd.Series(full["timestamp"]).searchsorted("2023-02-10 10:20:00"))
+    full.iloc[:cut].to_csv(Config.HOUSE_PATH, index=False)
+    run_training(force=True)
+
+    partial = InputCache().load("house")[0]["house_hourly"]
+    assert partial["timestamp"].max() == pd.Timestamp("2023-02-10 10:00")
+
+    full.to_csv(Config.HOUSE_PATH, index=False)
+    run_update()
+
+    cache    = InputCache()
+    tables   = cache.load("prices")[0]
+    expected = load_house_data(tables["df_fac"])[0]
+    # the grown file's cache entry must be the one a full parse would write
+    hit = cache.load("house", house_cache_key(cache, cache.load("prices")[1]["key"]))
+    assert hit is not None
+    assert_frame_equal(hit[0]["house_hourly"], expected, check_dtype=False, check_categorical=False)
+
+    sim = ArtefactStore().table("sim_frame", categorical=False).set_index("timestamp")
+    hh  = expected.set_index("timestamp")
+    at  = pd.Timestamp("2023-02-10 10:00")
+    assert sim.index.is_unique
+    assert sim.loc[at, "actual_consumption_kwh"] == hh.loc[at, "consumption_kwh"]
+    assert sim.index.max() == hh.index.max()
+
+
+def test_update_without_new_data_is_a_no_op(data_dir):
+    write_house_csv(Config.HOUSE_PATH, days=14)
+    run_training(force=True)
+    generation = ArtefactStore().generation
+
+    run_update()
+    assert ArtefactStore().generation == generation
@@ -4,21 +4,30 @@ train_models.py — one-shot training pipeline.
 Run from the project root:
     python -m app.train_models            # train if models absent
     python -m app.train_models --force    # always retrain
-
-Produces four artefacts under MODELS_DIR:
-    trained_models.pkl   — dict of {target: {model, features, test}}
-    solar_model.pkl      — LightGBM solar forecaster
-    sim_frame.pkl        — pre-built simulation DataFrame
-    price_meta.pkl       — {p33, p67, df_fac}
+    python -m app.train_models --reparse  # ignore the parsed-input cache
+    python -m app.train_models --update   # append new hourly data, no retrain
+
+Produces under MODELS_DIR:
+    registry/            — one native booster per target + solar model,
+                           with feature lists and clip bounds (model_registry.py)
+    eval/                — train/test frames per target, loaded on demand
+    store/               — columnar mmap store (see artefacts.py):
+                           sim_frame, df_fac and house/solar history
+                           tables, {p33, p67} meta
+    inputs/              — parsed df_fac / house_hourly / solar_hourly,
+                           reused while the source files are unchanged
+                           (input_cache.py; --reparse to bypass)
 """
 from __future__ import annotations
 
 import argparse
 import logging
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 
-import joblib
 import numpy as np
 import pandas as pd
 import xgboost as xgb
@@ -29,14 +38,14 @@ from sklearn.metrics import mean_absolute_error, r2_score
 if __name__ == "__main__" and __package__ is None:
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from app.artefacts import ArtefactStore, save_store
 from app.config import Config
+from app.input_cache import InputCache
+from app.model_registry import load_registry, registry_exists, save_registry
 from app.utils import (
     ConstantPredictor,
-    get_price_band,
-    get_price_weight,
-    set_price_thresholds,
-    get_energy_state,
-    get_recommendation,
+    PriceBandModel,
+    enrich_sim_frame,
 )
 
 logging.basicConfig(
@@ -50,21 +59,14 @@ logger = logging.getLogger(__name__)
 # 1 — PRICE DATA
 # ══════════════════════════════════════════════════════════════════
 
-def load_price_data() -> tuple[pd.DataFrame, float, float]:
+def load_price_data() -> tuple[pd.DataFrame, PriceBandModel]:
     logger.info("Loading PVPC price data …")
 
     df_fac = pd.read_excel(Config.PRICE_FACTURACION)
-    df_exc = pd.read_excel(Config.PRICE_EXCEDENTE)   # loaded for completeness
-    df_mer = pd.read_excel(Config.PRICE_MERCADO)     # loaded for completeness
-
     df_fac.columns = ["hora", "price_facturacion"]
-    df_exc.columns = ["hora", "price_excedente"]
-    df_mer.columns = ["hora", "price_mercado"]
 
     # EUR/MWh → EUR/kWh
     df_fac["price_facturacion"] /= 1000
-    df_exc["price_excedente"]   /= 1000
-    df_mer["price_mercado"]     /= 1000
 
     df_fac = df_fac.reset_index(drop=True)
     df_fac["timestamp"] = pd.date_range(
@@ -74,64 +76,149 @@ def load_price_data() -> tuple[pd.DataFrame, float, float]:
     )
     df_fac["hour"] = df_fac["timestamp"].dt.hour
 
-    p33 = float(df_fac["price_facturacion"].quantile(0.33))
-    p67 = float(df_fac["price_facturacion"].quantile(0.67))
-    set_price_thresholds(p33, p67)
+    bands = PriceBandModel.from_prices(df_fac["price_facturacion"])
 
-    df_fac["price_band"]   = df_fac["price_facturacion"].apply(get_price_band)
-    df_fac["price_weight"] = df_fac["price_facturacion"].apply(get_price_weight)
+    df_fac["price_band"]   = bands.names(df_fac["price_facturacion"])
+    df_fac["price_weight"] = bands.weights(df_fac["price_facturacion"])
 
     logger.info(
         "Prices: %d rows | €%.4f–%.4f | p33=%.4f p67=%.4f",
         len(df_fac),
         df_fac["price_facturacion"].min(),
         df_fac["price_facturacion"].max(),
-        p33, p67,
+        bands.p33, bands.p67,
     )
-    return df_fac, p33, p67
+    return df_fac, bands
+
+
+def load_extra_price_data() -> dict:
+    """
+    Surplus (excedente) and market (mercado) prices in EUR/kWh.  Not used
+    by the pipeline — load on request only.
+    """
+    out = {}
+    for path, col in [
+        (Config.PRICE_EXCEDENTE, "price_excedente"),
+        (Config.PRICE_MERCADO,   "price_mercado"),
+    ]:
+        df = pd.read_excel(path)
+        df.columns = ["hora", col]
+        df[col] /= 1000
+        out[col] = df
+    return out
 
 
 # ══════════════════════════════════════════════════════════════════
 # 2 — HOUSE DATA
 # ══════════════════════════════════════════════════════════════════
 
-def load_house_data(df_fac: pd.DataFrame) -> pd.DataFrame:
-    logger.info("Loading house data (chunked) …")
+class HourlyAccumulator:
+    """
+    Streaming equivalent of df.set_index("timestamp").resample("h").mean().
+
+    Each chunk is folded into per-hour sum / non-null count partials, so
+    memory scales with the number of hours, not minutes.  For time-ordered
+    input the last (possibly incomplete) hour of a chunk is carried into
+    the next one, so every hour is reduced in a single pass and the result
+    is bit-identical to resample().  Hours that still show up in several
+    partials (unordered input) are combined by adding sums and counts,
+    which matches up to float summation order.
+    """
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self._carry: Optional[pd.DataFrame] = None
+        self._sums:   list = []
+        self._counts: list = []
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        if self._carry is not None:
+            chunk = pd.concat([self._carry, chunk], ignore_index=True)
+        if chunk.empty:
+            return
+        hour  = chunk["timestamp"].dt.floor("h")
+        tail  = (hour == hour.iloc[-1]).to_numpy()
+        self._carry = chunk[tail]
+        self._fold(chunk[~tail], hour[~tail])
+
+    def _fold(self, chunk: pd.DataFrame, hour: pd.Series) -> None:
+        if chunk.empty:
+            return
+        g = chunk.drop(columns="timestamp").groupby(hour.to_numpy())
+        self._sums.append(g.sum())
+        self._counts.append(g.count())
+
+    def result(self) -> pd.DataFrame:
+        if self._carry is not None and not self._carry.empty:
+            self._fold(self._carry, self._carry["timestamp"].dt.floor("h"))
+            self._carry = None
+        if not self._sums:
+            return pd.DataFrame(columns=["timestamp"])
+
+        sums   = pd.concat(self._sums)
+        counts = pd.concat(self._counts)
+        if not sums.index.is_unique:
+            sums   = sums.groupby(level=0).sum()
+            counts = counts.groupby(level=0).sum()
+        sums, counts = sums.sort_index(), counts.sort_index()
+
+        mean = sums.astype("float64") / counts.where(counts > 0)
+        full = pd.date_range(mean.index[0], mean.index[-1], freq="h", name="timestamp")
+        return mean.reindex(full).reset_index()
+
+
+def load_house_data(
+    df_fac: pd.DataFrame,
+    path:   Optional[Path] = None,
+    since:  Optional[pd.Timestamp] = None,
+    units:  Optional[dict] = None,
+) -> tuple[pd.DataFrame, dict]:
+    """
+    Returns (house_hourly, units).  units maps each raw column to "W" or
+    "kWh" — decided from the column mean unless given, so an incremental
+    load (since = first new hour) converts exactly like the full one.
+    """
+    logger.info("Loading house data (streaming hourly) …")
 
     raw_cols = ["timestamp", "P_agg", "ac_1", "ac_2", "boiler", "fridge", "washing_machine"]
-    chunks   = []
+    hourly   = HourlyAccumulator()
 
-    for chunk in pd.read_csv(Config.HOUSE_PATH, chunksize=500_000):
+    for chunk in pd.read_csv(
+        path or Config.HOUSE_PATH,
+        chunksize=Config.HOUSE_CHUNK_ROWS,
+        usecols=lambda c: c in raw_cols,
+    ):
         chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], errors="coerce")
         chunk = chunk.dropna(subset=["timestamp"])
+        if since is not None:
+            chunk = chunk[chunk["timestamp"] >= since]
         keep  = [c for c in raw_cols if c in chunk.columns]
         chunk = chunk[keep]
         for col in ["ac_1", "ac_2", "boiler", "fridge", "washing_machine"]:
             if col in chunk.columns:
                 chunk[col] = chunk[col].fillna(0)
-        chunks.append(chunk)
+        hourly.add(chunk)
 
-    house_raw = (
-        pd.concat(chunks, ignore_index=True)
-        .sort_values("timestamp")
-        .reset_index(drop=True)
-    )
-    logger.info("Raw rows: %d", len(house_raw))
+    logger.info("Raw rows: %d", hourly.rows)
 
-    # ── Hourly resample ───────────────────────────────────────
-    house_hourly = (
-        house_raw.set_index("timestamp")
-        .resample("h").mean()
-        .reset_index()
-    )
+    # ── Hourly mean (sum / count folded per chunk) ────────────
+    house_hourly = hourly.result()
+
+    if house_hourly.empty:
+        return house_hourly, dict(units or {})
 
     # ── Unit conversion: W (mean of 1-min samples) → kWh ─────
+    units = dict(units or {})
+
     def _convert(df: pd.DataFrame, raw: str, new: str) -> pd.DataFrame:
         if raw not in df.columns:
             return df
-        m       = df[raw].mean()
-        df[new] = df[raw] / 1000 if m > 0.5 else df[raw].clip(lower=0)
-        logger.info("  %-22s mean=%.5f → new_col=%s", raw, m, new)
+        if raw not in units:
+            m          = df[raw].mean()
+            units[raw] = "W" if m > 0.5 else "kWh"
+            logger.info("  %-22s mean=%.5f → new_col=%s", raw, m, new)
+        df[new] = df[raw] / 1000 if units[raw] == "W" else df[raw].clip(lower=0)
         return df
 
     house_hourly = _convert(house_hourly, "P_agg",           "consumption_kwh")
@@ -164,19 +251,26 @@ def load_house_data(df_fac: pd.DataFrame) -> pd.DataFrame:
     ).rename(columns={"price_facturacion": "price_eur_kwh"})
 
     logger.info("house_hourly shape: %s", house_hourly.shape)
-    return house_hourly
+    return house_hourly, units
 
 
 # ══════════════════════════════════════════════════════════════════
 # 3 — SOLAR DATA
 # ══════════════════════════════════════════════════════════════════
 
-def load_solar_data() -> pd.DataFrame:
+def load_solar_data(
+    path:  Optional[Path] = None,
+    since: Optional[pd.Timestamp] = None,
+    units: Optional[dict] = None,
+) -> tuple[pd.DataFrame, dict]:
+    """Returns (solar_hourly, units) — units["solar_kwh"] is "Wh" or "kWh"."""
     logger.info("Loading solar data …")
 
-    solar_raw = pd.read_csv(Config.SOLAR_PATH)
+    solar_raw = pd.read_csv(path or Config.SOLAR_PATH)
     solar_raw["timestamp"] = pd.to_datetime(solar_raw["timestamp"], errors="coerce")
     solar_raw = solar_raw.dropna(subset=["timestamp"])
+    if since is not None:
+        solar_raw = solar_raw[solar_raw["timestamp"] >= since]
     solar_raw = solar_raw.rename(columns={"generation": "solar_kwh"})
     solar_raw["solar_kwh"] = solar_raw["solar_kwh"].clip(lower=0)
     solar_raw["timestamp"] = solar_raw["timestamp"].dt.floor("h")
@@ -188,7 +282,12 @@ def load_solar_data() -> pd.DataFrame:
         .reset_index(drop=True)
     )
 
-    if solar_hourly["solar_kwh"].max() > 100:
+    units = dict(units or {})
+    if solar_hourly.empty:
+        return solar_hourly, units
+    if "solar_kwh" not in units:
+        units["solar_kwh"] = "Wh" if solar_hourly["solar_kwh"].max() > 100 else "kWh"
+    if units["solar_kwh"] == "Wh":
         solar_hourly["solar_kwh"] /= 1000
         logger.info("Converted solar Wh → kWh")
 
@@ -199,14 +298,18 @@ def load_solar_data() -> pd.DataFrame:
         len(solar_hourly),
         solar_hourly["solar_kwh"].max(),
     )
-    return solar_hourly
+    return solar_hourly, units
 
 
 # ══════════════════════════════════════════════════════════════════
 # 4 — FEATURE ENGINEERING
 # ══════════════════════════════════════════════════════════════════
 
-def build_features(df: pd.DataFrame, target: str) -> pd.DataFrame:
+def build_calendar_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Target-independent block (calendar + price flags), shared by every
+    target's feature frame.  Sorted by timestamp, index reset.
+    """
     d = df.copy().sort_values("timestamp").reset_index(drop=True)
 
     ts = d["timestamp"]
@@ -229,26 +332,50 @@ def build_features(df: pd.DataFrame, target: str) -> pd.DataFrame:
     d["dow_cos"]   = np.cos(2 * np.pi * d["dayofweek"] / 7)
     d["month_sin"] = np.sin(2 * np.pi * d["month"] / 12)
     d["month_cos"] = np.cos(2 * np.pi * d["month"] / 12)
+    return d
 
-    s = d[target].shift(1)
-    for lag in [1, 2, 3, 24, 168]:
-        d[f"lag_{lag}h"] = d[target].shift(lag)
-
-    d["roll_mean_6h"]   = s.rolling(6,   min_periods=3).mean()
-    d["roll_mean_3h"]   = s.rolling(3,   min_periods=1).mean()
-    d["roll_mean_24h"]  = s.rolling(24,  min_periods=12).mean()
-    d["roll_std_24h"]   = s.rolling(24,  min_periods=12).std().fillna(0)
-    d["roll_mean_168h"] = s.rolling(168, min_periods=48).mean()
-    d["diff_1h"]        = d[target].shift(1).diff(1)
-    d["diff_24h"]       = d[target].shift(24).diff(24)
-
-    if target != "consumption_kwh" and "consumption_kwh" in d.columns:
-        d["total_cons_lag1"]   = d["consumption_kwh"].shift(1)
-        d["total_cons_roll24"] = (
-            d["consumption_kwh"].shift(1).rolling(24, min_periods=6).mean()
-        )
 
-    return d.dropna().reset_index(drop=True)
+def target_features(base: pd.DataFrame, target: str) -> pd.DataFrame:
+    """Lag / rolling / diff columns of one target over the shared block."""
+    y = base[target]
+    s = y.shift(1)
+    f = {f"lag_{lag}h": y.shift(lag) for lag in [1, 2, 3, 24, 168]}
+
+    f["roll_mean_6h"]   = s.rolling(6,   min_periods=3).mean()
+    f["roll_mean_3h"]   = s.rolling(3,   min_periods=1).mean()
+    f["roll_mean_24h"]  = s.rolling(24,  min_periods=12).mean()
+    f["roll_std_24h"]   = s.rolling(24,  min_periods=12).std().fillna(0)
+    f["roll_mean_168h"] = s.rolling(168, min_periods=48).mean()
+    f["diff_1h"]        = s.diff(1)
+    f["diff_24h"]       = y.shift(24).diff(24)
+
+    if target != "consumption_kwh" and "consumption_kwh" in base.columns:
+        c = base["consumption_kwh"].shift(1)
+        f["total_cons_lag1"]   = c
+        f["total_cons_roll24"] = c.rolling(24, min_periods=6).mean()
+
+    return pd.DataFrame(f, index=base.index)
+
+
+def join_target_features(
+    base: pd.DataFrame,
+    target: str,
+    base_ok: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    base + target_features(), rows with any NaN dropped — the frame
+    build_features() returns.  base_ok (rows of base without NaN) can be
+    computed once and shared across targets.
+    """
+    if base_ok is None:
+        base_ok = base.notna().all(axis=1).to_numpy()
+    tf   = target_features(base, target)
+    keep = base_ok & tf.notna().all(axis=1).to_numpy()
+    return pd.concat([base[keep], tf[keep]], axis=1).reset_index(drop=True)
+
+
+def build_features(df: pd.DataFrame, target: str) -> pd.DataFrame:
+    return join_target_features(build_calendar_features(df), target)
 
 
 def build_solar_features(df: pd.DataFrame) -> pd.DataFrame:
@@ -278,17 +405,70 @@ def build_solar_features(df: pd.DataFrame) -> pd.DataFrame:
 # 5 — TRAIN APPLIANCE MODELS
 # ══════════════════════════════════════════════════════════════════
 
+def _train_budget(n_targets: int) -> tuple[int, int]:
+    """
+    (concurrent targets, XGBoost n_jobs per model) within
+    Config.TRAIN_CPU_BUDGET.  An explicit n_jobs in XGB_CONFIGS wins and
+    the number of workers shrinks to fit it.
+    """
+    budget  = max(Config.TRAIN_CPU_BUDGET, 1)
+    workers = Config.TRAIN_WORKERS or n_targets
+    workers = max(min(workers, n_targets, budget), 1)
+    fixed   = [c["n_jobs"] for c in Config.XGB_CONFIGS.values() if c.get("n_jobs")]
+    if fixed:
+        workers = max(min(workers, budget // max(fixed)), 1)
+    return workers, max(budget // workers, 1)
+
+
+def _train_xgb(target: str, fd: pd.DataFrame, fs: list, cfg: dict) -> tuple[dict, float]:
+    t0  = time.perf_counter()
+    sp  = int(len(fd) * 0.8)
+    tr  = fd.iloc[:sp]
+    te  = fd.iloc[sp:]
+    Xtr, ytr = tr[fs], tr[target]
+    Xte, yte = te[fs], te[target]
+
+    model = xgb.XGBRegressor(**cfg)
+    model.fit(Xtr, ytr)
+
+    upper    = float(ytr.quantile(0.99))
+    raw_pred = np.clip(model.predict(Xte), 0, upper)
+    last_val = yte.shift(1).bfill().values
+    pred     = 0.7 * raw_pred + 0.3 * last_val
+
+    mae = mean_absolute_error(yte, pred)
+    r2  = r2_score(yte, pred)
+    secs = time.perf_counter() - t0
+    logger.info(
+        "  %-20s  MAE=%.4f  R²=%.3f  test=%d rows  (%.1fs)",
+        target, mae, r2, len(te), secs,
+    )
+
+    return {
+        "model":    model,
+        "features": fs,
+        "clip":     (0.0, upper),
+        "train":    tr,
+        "test":     te,
+    }, secs
+
+
 def train_all_models(house_hourly: pd.DataFrame) -> dict:
     logger.info("Training appliance models …")
+    t_all = time.perf_counter()
+
+    # ── Features: shared calendar block once, per-target lags ─
+    base    = build_calendar_features(house_hourly)
+    base_ok = base.notna().all(axis=1).to_numpy()
 
     feat_datasets: dict = {}
     feature_lists: dict = {}
 
     for target in Config.ALL_TARGETS:
-        if target not in house_hourly.columns:
+        if target not in base.columns:
             logger.warning("Column %s missing — skipping.", target)
             continue
-        fd   = build_features(house_hourly, target)
+        fd   = join_target_features(base, target, base_ok)
         feat_datasets[target] = fd
         feats = [f for f in Config.BASE_FEATURES if f in fd.columns]
         if target != "consumption_kwh":
@@ -296,6 +476,9 @@ def train_all_models(house_hourly: pd.DataFrame) -> dict:
                 if x in fd.columns:
                     feats.append(x)
         feature_lists[target] = feats
+    logger.info(
+        "  features: %d targets in %.1fs", len(feat_datasets), time.perf_counter() - t_all,
+    )
 
     trained_models: dict = {}
 
@@ -308,45 +491,37 @@ def train_all_models(house_hourly: pd.DataFrame) -> dict:
         trained_models["fridge_kwh"] = {
             "model":    ConstantPredictor(mean_val),
             "features": feature_lists["fridge_kwh"],
+            "clip":     (0.0, None),
             "test":     te,
         }
         logger.info("  fridge_kwh: ConstantPredictor(%.5f)", mean_val)
 
-    # ── XGBoost for all other appliances ──────────────────────
-    for target, cfg in Config.XGB_CONFIGS.items():
-        if target not in feat_datasets:
-            continue
-
-        fd  = feat_datasets[target]
-        fs  = feature_lists[target]
-        sp  = int(len(fd) * 0.8)
-        tr  = fd.iloc[:sp]
-        te  = fd.iloc[sp:]
-        Xtr, ytr = tr[fs], tr[target]
-        Xte, yte = te[fs], te[target]
-
-        model = xgb.XGBRegressor(**cfg)
-        model.fit(Xtr, ytr)
-
-        upper    = float(ytr.quantile(0.99))
-        raw_pred = np.clip(model.predict(Xte), 0, upper)
-        last_val = yte.shift(1).bfill().values
-        pred     = 0.7 * raw_pred + 0.3 * last_val
-
-        mae = mean_absolute_error(yte, pred)
-        r2  = r2_score(yte, pred)
-        logger.info(
-            "  %-20s  MAE=%.4f  R²=%.3f  test=%d rows",
-            target, mae, r2, len(te),
-        )
-
-        trained_models[target] = {
-            "model":    model,
-            "features": fs,
-            "train":    tr,
-            "test":     te,
+    # ── XGBoost for all other appliances, trained concurrently ─
+    # XGBoost releases the GIL while fitting, so threads are enough;
+    # workers × n_jobs stays within Config.TRAIN_CPU_BUDGET.
+    todo = [t for t in Config.XGB_CONFIGS if t in feat_datasets]
+    workers, n_jobs = _train_budget(len(todo))
+    logger.info("  XGBoost: %d targets, %d concurrent × n_jobs=%d", len(todo), workers, n_jobs)
+
+    timings: dict = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="train") as pool:
+        futures = {
+            pool.submit(
+                _train_xgb, t, feat_datasets[t], feature_lists[t],
+                {"n_jobs": n_jobs, **Config.XGB_CONFIGS[t]},
+            ): t
+            for t in todo
         }
+        results = {futures[f]: f.result() for f in as_completed(futures)}
 
+    # keep XGB_CONFIGS order in the registry
+    for t in todo:
+        trained_models[t], timings[t] = results[t]
+
+    logger.info(
+        "  trained %d models in %.1fs (sum of per-target %.1fs)",
+        len(trained_models), time.perf_counter() - t_all, sum(timings.values()),
+    )
     return trained_models
 
 
@@ -384,14 +559,14 @@ def build_sim_frame(
     trained_models: dict,
     solar_pred: np.ndarray,
     df_fac: pd.DataFrame,
+    bands: PriceBandModel,
 ) -> pd.DataFrame:
     logger.info("Building simulation frame …")
 
     ci  = trained_models["consumption_kwh"]
     ct  = ci["test"]
-    ytr = ci["train"]["consumption_kwh"]
 
-    upper    = float(ytr.quantile(0.99))
+    upper    = ci["clip"][1]
     raw_pred = np.clip(ci["model"].predict(ct[ci["features"]]), 0, upper)
     last_val = ct["consumption_kwh"].shift(1).bfill().values
     y_pc     = 0.7 * raw_pred + 0.3 * last_val
@@ -417,29 +592,7 @@ def build_sim_frame(
         preds  = 0.7 * raw_p + 0.3 * last_v
         sim[f"pred_{t}"] = preds[: len(sim)]
 
-    # ── Time features ─────────────────────────────────────────
-    ts = pd.to_datetime(sim["timestamp"])
-    sim["hour"]      = ts.dt.hour
-    sim["dayofweek"] = ts.dt.dayofweek
-    sim["month"]     = ts.dt.month
-
-    # ── PVPC price (mapped from real timestamps) ──────────────
-    price_map             = df_fac.set_index("timestamp")["price_facturacion"]
-    sim["price_eur_kwh"]  = sim["timestamp"].map(price_map).ffill()
-    sim["price_band"]     = sim["price_eur_kwh"].apply(get_price_band)
-    sim["price_weight"]   = sim["price_eur_kwh"].apply(get_price_weight)
-
-    # ── Energy balance ────────────────────────────────────────
-    sim["net_energy_kwh"]   = sim["predicted_solar_kwh"] - sim["predicted_consumption_kwh"]
-    sim["energy_state"]     = sim["net_energy_kwh"].apply(get_energy_state)
-    sim["opportunity_score"]= sim["predicted_solar_kwh"] * sim["price_weight"]
-
-    sim["scenario"], sim["recommendation"] = zip(*sim.apply(
-        lambda r: get_recommendation(r["energy_state"], r["price_band"]), axis=1
-    ))
-
-    sim["is_golden_window"] = (sim["energy_state"] == "SURPLUS") & (sim["price_band"] == "HIGH")
-    sim["is_danger_window"] = (sim["energy_state"] == "DEFICIT") & (sim["price_band"] == "HIGH")
+    sim = enrich_sim_frame(sim, df_fac, bands)
 
     logger.info(
         "sim: %s rows | golden=%d danger=%d",
@@ -450,15 +603,324 @@ def build_sim_frame(
     return sim
 
 
+def history_tables(house_hourly: pd.DataFrame, solar_hourly: pd.DataFrame) -> dict:
+    """Hourly actuals the runtime forecaster (forecast.py) takes its lags from."""
+    cols = ["timestamp"] + [t for t in Config.ALL_TARGETS if t in house_hourly.columns]
+    return {
+        "house_history": house_hourly[cols],
+        "solar_history": solar_hourly[["timestamp", "solar_kwh"]],
+    }
+
+
+# ══════════════════════════════════════════════════════════════════
+# 8 — PARSED INPUTS (content-hashed cache, see input_cache.py)
+# ══════════════════════════════════════════════════════════════════
+
+def price_cache_key(cache: InputCache) -> str:
+    return cache.key("prices", cache.digest(Config.PRICE_FACTURACION))
+
+
+def house_cache_key(cache: InputCache, price_key: str) -> str:
+    return cache.key("house", cache.digest(Config.HOUSE_PATH), price_key)
+
+
+def solar_cache_key(cache: InputCache) -> str:
+    return cache.key("solar", cache.digest(Config.SOLAR_PATH), Config.N_HOUSES)
+
+
+def load_inputs(use_cache: bool = True) -> tuple:
+    """
+    (df_fac, bands, house_hourly, solar_hourly), parsing only the
+    sources whose content changed since the cached copy was written.
+    """
+    if not use_cache:
+        df_fac, bands = load_price_data()
+        return df_fac, bands, load_house_data(df_fac)[0], load_solar_data()[0]
+
+    cache = InputCache()
+
+    def cached(name: str, key: str, parse):
+        hit = cache.load(name, key)
+        if hit is not None:
+            logger.info("Input cache HIT: %s", name)
+            return hit
+        tables, meta = parse()
+        cache.save(name, key, tables, meta)
+        return tables, meta
+
+    def parse_prices():
+        df_fac, bands = load_price_data()
+        return {"df_fac": df_fac}, bands.meta()
+
+    price_key = price_cache_key(cache)
+    tables, meta = cached("prices", price_key, parse_prices)
+    df_fac, bands = tables["df_fac"], PriceBandModel.from_meta(meta)
+
+    def parse_house():
+        house_hourly, units = load_house_data(df_fac)
+        return {"house_hourly": house_hourly}, {"units": units}
+
+    def parse_solar():
+        solar_hourly, units = load_solar_data()
+        return {"solar_hourly": solar_hourly}, {"units": units}
+
+    # house_hourly carries the merged prices → keyed on both files
+    tables, _ = cached("house", house_cache_key(cache, price_key), parse_house)
+    house_hourly = tables["house_hourly"]
+
+    tables, _ = cached("solar", solar_cache_key(cache), parse_solar)
+    solar_hourly = tables["solar_hourly"]
+
+    return df_fac, bands, house_hourly, solar_hourly
+
+
+# ══════════════════════════════════════════════════════════════════
+# 9 — INCREMENTAL UPDATE (new hourly data, no retrain)
+# ══════════════════════════════════════════════════════════════════
+
+# Rows of history the features of a new row reach back to:
+# lag_168h / roll_mean_168h for appliances, solar_lag_24h for solar.
+FEATURE_LOOKBACK = 168
+SOLAR_LOOKBACK   = 24
+
+
+def _new_rows(df: pd.DataFrame, after: pd.Timestamp) -> pd.DataFrame:
+    return df[df["timestamp"] > after].reset_index(drop=True)
+
+
+def _splice(cached: pd.DataFrame, fresh: pd.DataFrame) -> tuple[pd.DataFrame, pd.Timestamp]:
+    """
+    cached with its last hour and everything after it replaced by fresh,
+    which was parsed from that hour on — the last cached hour may have
+    been cut off mid-hour.  Returns (hourly, after): rows later than
+    `after` are new or changed.
+    """
+    last = cached["timestamp"].max()
+    if fresh.empty:
+        return cached, last
+    hourly = pd.concat([cached[cached["timestamp"] < last], fresh], ignore_index=True)
+    redone = fresh[fresh["timestamp"] == last].reset_index(drop=True)
+    tail   = cached.iloc[[-1]].reset_index(drop=True)
+    if len(redone) and redone.reindex(columns=tail.columns).equals(tail):
+        return hourly, last
+    return hourly, last - pd.Timedelta(hours=1)
+
+
+def _continue_xgb(target: str, model, fd: pd.DataFrame, features: list):
+    cfg = {**Config.XGB_CONFIGS.get(target, {}), "n_estimators": Config.UPDATE_BOOST_ROUNDS}
+    new = xgb.XGBRegressor(**cfg)
+    new.fit(fd[features], fd[target], xgb_model=model.get_booster())
+    return new
+
+
+def _continue_solar(booster, sf: pd.DataFrame):
+    return lgb.train(
+        dict(objective="regression", learning_rate=0.05, verbose=-1),
+        lgb.Dataset(sf[Config.SOLAR_FEATURES], sf["solar_kwh"]),
+        num_boost_round=Config.UPDATE_BOOST_ROUNDS,
+        init_model=booster,
+    )
+
+
+def extend_sim_frame(
+    sim: pd.DataFrame,
+    trained_models: dict,
+    new_feats: dict,
+    solar_pred: pd.Series,
+    df_fac: pd.DataFrame,
+    bands: PriceBandModel,
+) -> pd.DataFrame:
+    """
+    Append sim rows for the new consumption feature rows.  Same blend as
+    build_sim_frame() (0.7 · clipped model + 0.3 · previous actual, with
+    lag_1h as the previous actual); appliance and solar predictions are
+    aligned by timestamp.
+    """
+    ci = trained_models["consumption_kwh"]
+    ct = _new_rows(new_feats["consumption_kwh"], sim["timestamp"].max())
+    if ct.empty:
+        return sim
+
+    raw   = np.clip(ci["model"].predict(ct[ci["features"]]), 0, ci["clip"][1])
+    block = pd.DataFrame({
+        "timestamp":                 ct["timestamp"].values,
+        "actual_consumption_kwh":    ct["consumption_kwh"].values,
+        "predicted_consumption_kwh": 0.7 * raw + 0.3 * ct["lag_1h"].values,
+    })
+    block["predicted_solar_kwh"] = block["timestamp"].map(solar_pred).fillna(0.0).values
+
+    for t in ["ac1_kwh", "ac2_kwh", "boiler_kwh", "fridge_kwh", "wm_kwh"]:
+        if t not in trained_models or t not in new_feats:
+            continue
+        info  = trained_models[t]
+        fd    = new_feats[t]
+        raw_p = np.clip(info["model"].predict(fd[info["features"]]), 0, 2.0)
+        preds = pd.Series(0.7 * raw_p + 0.3 * fd["lag_1h"].values, index=fd["timestamp"])
+        block[f"pred_{t}"] = block["timestamp"].map(preds).fillna(0.0).values
+
+    block = enrich_sim_frame(block, df_fac, bands, prev_price=float(sim["price_eur_kwh"].iloc[-1]))
+    return pd.concat([sim, block[sim.columns]], ignore_index=True)
+
+
+def run_update(
+    house_path: Optional[Path] = None,
+    solar_path: Optional[Path] = None,
+) -> None:
+    """
+    Bring new meter data into the existing artefacts without a retrain:
+
+      1. the last cached house_hourly / solar_hourly hour and every hour
+         after it are parsed from house_path / solar_path (default: the
+         configured source files, which may simply have grown) and replace
+         the tail of the input cache, so an hour that was still partial
+         when it was cached is aggregated in full
+      2. lag / rolling features are computed for the new rows only, over
+         FEATURE_LOOKBACK rows of history
+      3. each booster gets UPDATE_BOOST_ROUNDS more rounds on the new rows
+         (fridge stays a constant; clip bounds are kept)
+      4. sim rows are built for the new hours and appended
+    """
+    t_all = time.perf_counter()
+    if not (registry_exists() and ArtefactStore.exists()):
+        raise FileNotFoundError("No trained artefacts — run a full training first.")
+
+    cache  = InputCache()
+    prices = cache.load("prices")
+    house  = cache.load("house")
+    solar  = cache.load("solar")
+    if prices is None or house is None or solar is None:
+        raise FileNotFoundError(
+            "Parsed-input cache missing — run `python -m app.train_models --force` once."
+        )
+
+    logger.info("=== Incremental update START ===")
+    df_fac, pmeta = prices[0]["df_fac"], prices[1]
+    bands         = PriceBandModel.from_meta(pmeta)
+
+    house_hourly, hmeta = house[0]["house_hourly"], house[1]
+    solar_hourly, smeta = solar[0]["solar_hourly"], solar[1]
+    last_house = house_hourly["timestamp"].max()
+
+    new_house, _ = load_house_data(
+        df_fac, path=house_path, since=last_house, units=hmeta["units"],
+    )
+    new_solar, _ = load_solar_data(
+        path=solar_path, since=solar_hourly["timestamp"].max(), units=smeta["units"],
+    )
+    house_hourly, last_house = _splice(house_hourly, new_house)
+    solar_hourly, last_solar = _splice(solar_hourly, new_solar)
+
+    n_house = int((house_hourly["timestamp"] <= last_house).sum())
+    n_solar = int((solar_hourly["timestamp"] <= last_solar).sum())
+    if n_house == len(house_hourly) and n_solar == len(solar_hourly):
+        logger.info("No hours after %s — nothing to update.", last_house)
+        return
+    logger.info(
+        "  new rows: house %d (after %s), solar %d (after %s)",
+        len(house_hourly) - n_house, last_house, len(solar_hourly) - n_solar, last_solar,
+    )
+
+    # ── Features for the new rows only ────────────────────────
+    t0      = time.perf_counter()
+    base    = build_calendar_features(house_hourly.iloc[max(n_house - FEATURE_LOOKBACK, 0):])
+    base_ok = base.notna().all(axis=1).to_numpy()
+
+    trained_models, solar_model = load_registry()
+    new_feats: dict = {}
+    for target in trained_models:
+        if target in base.columns:
+            new_feats[target] = _new_rows(join_target_features(base, target, base_ok), last_house)
+
+    sf_all = build_solar_features(
+        solar_hourly.iloc[max(n_solar - SOLAR_LOOKBACK, 0):]
+    )
+    sf_new = _new_rows(sf_all, last_solar)
+    logger.info("  features: %.2fs", time.perf_counter() - t0)
+
+    # ── Continue boosting ─────────────────────────────────────
+    updated: dict = {}
+    for target, entry in trained_models.items():
+        t0   = time.perf_counter()
+        info = dict(entry)
+        fd   = new_feats.get(target)
+        if fd is not None and len(fd):
+            if not isinstance(entry.model, ConstantPredictor):
+                info["model"] = _continue_xgb(target, entry.model, fd, entry.features)
+            if "test" in info:
+                test         = info["test"][info["test"]["timestamp"] <= last_house]
+                info["test"] = pd.concat([test, fd[test.columns]], ignore_index=True)
+        updated[target] = info
+        logger.info(
+            "  %-20s +%d rows  (%.2fs)",
+            target, 0 if fd is None else len(fd), time.perf_counter() - t0,
+        )
+
+    if solar_model is not None and len(sf_new):
+        t0          = time.perf_counter()
+        solar_model = _continue_solar(solar_model, sf_new)
+        logger.info("  %-20s +%d rows  (%.2fs)", "solar", len(sf_new), time.perf_counter() - t0)
+
+    # ── Sim frame: append the new hours ───────────────────────
+    sim   = ArtefactStore().table("sim_frame", categorical=False)
+    n_sim = len(sim)
+    # a re-read hour is built again from its corrected actuals
+    sim   = sim[sim["timestamp"] <= last_house].reset_index(drop=True)
+    solar_pred = pd.Series(dtype=float)
+    # solar features from the end of the sim frame, which may lag the
+    # solar history when only the house data grew
+    sim_end = sim["timestamp"].max()
+    start   = int(solar_hourly["timestamp"].searchsorted(sim_end, side="right"))
+    sf_pred = _new_rows(
+        build_solar_features(solar_hourly.iloc[max(start - SOLAR_LOOKBACK, 0):]), sim_end,
+    )
+    if solar_model is not None and len(sf_pred):
+        solar_pred = pd.Series(
+            np.clip(solar_model.predict(sf_pred[Config.SOLAR_FEATURES]), 0, None),
+            index=sf_pred["timestamp"],
+        )
+    sim = extend_sim_frame(sim, updated, new_feats, solar_pred, df_fac, bands)
+
+    # ── Persist ───────────────────────────────────────────────
+    def next_key(meta: dict, path: Optional[Path], source: Path, full_key) -> str:
+        # grown source file → same key a full parse would use
+        if path is None or Path(path).resolve() == source.resolve():
+            return full_key()
+        return cache.key(meta["key"], "append", cache.digest(path))
+
+    cache.save(
+        "house",
+        next_key(hmeta, house_path, Config.HOUSE_PATH,
+                 lambda: house_cache_key(cache, pmeta["key"])),
+        {"house_hourly": house_hourly}, {"units": hmeta["units"]},
+    )
+    cache.save(
+        "solar",
+        next_key(smeta, solar_path, Config.SOLAR_PATH, lambda: solar_cache_key(cache)),
+        {"solar_hourly": solar_hourly}, {"units": smeta["units"]},
+    )
+    registry = save_registry(updated, solar_model)
+    manifest = save_store(
+        {"sim_frame": sim, "df_fac": df_fac, **history_tables(house_hourly, solar_hourly)},
+        bands.meta(),
+    )
+
+    logger.info(
+        "=== Incremental update COMPLETE in %.1fs: sim %d → %d rows ===",
+        time.perf_counter() - t_all, n_sim, len(sim),
+    )
+    logger.info("  %s", registry)
+    logger.info("  %s", manifest)
+
+
 # ══════════════════════════════════════════════════════════════════
 # ENTRY POINT
 # ══════════════════════════════════════════════════════════════════
 
-def run_training(force: bool = False) -> None:
+def run_training(force: bool = False, use_input_cache: bool = True) -> None:
     Config.MODELS_DIR.mkdir(parents=True, exist_ok=True)
     Config.LOG_DIR.mkdir(parents=True, exist_ok=True)
 
-    if not force and Config.SIM_FRAME_PATH.exists():
+    if not force and ArtefactStore.exists():
         logger.info(
             "Artefacts already present at %s. Use --force to retrain.",
             Config.MODELS_DIR,
@@ -475,28 +937,34 @@ def run_training(force: bool = False) -> None:
                 "Place your CSV/XLSX files in the data/ directory."
             )
 
-    df_fac, p33, p67  = load_price_data()
-    house_hourly       = load_house_data(df_fac)
-    solar_hourly       = load_solar_data()
+    df_fac, bands, house_hourly, solar_hourly = load_inputs(use_input_cache)
     trained_models     = train_all_models(house_hourly)
     solar_model, _, s_te, sp = train_solar_model(solar_hourly)
-    sim = build_sim_frame(trained_models, sp, df_fac)
+    sim = build_sim_frame(trained_models, sp, df_fac, bands)
 
     logger.info("Persisting artefacts …")
-    joblib.dump(trained_models, Config.TRAINED_MODELS_PATH, compress=3)
-    joblib.dump(solar_model,    Config.SOLAR_MODEL_PATH,    compress=3)
-    joblib.dump(sim,            Config.SIM_FRAME_PATH,      compress=3)
-    joblib.dump({"p33": p33, "p67": p67, "df_fac": df_fac}, Config.PRICE_META_PATH, compress=3)
+    registry = save_registry(trained_models, solar_model)
+    manifest = save_store(
+        {"sim_frame": sim, "df_fac": df_fac, **history_tables(house_hourly, solar_hourly)},
+        bands.meta(),
+    )
 
     logger.info("=== Training pipeline COMPLETE ===")
-    logger.info("  %s", Config.TRAINED_MODELS_PATH)
-    logger.info("  %s", Config.SOLAR_MODEL_PATH)
-    logger.info("  %s", Config.SIM_FRAME_PATH)
-    logger.info("  %s", Config.PRICE_META_PATH)
+    logger.info("  %s", registry)
+    logger.info("  %s", manifest)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Train energy-optimisation models")
     parser.add_argument("--force", action="store_true", help="Retrain even if artefacts exist")
+    parser.add_argument("--reparse", action="store_true",
+                        help="Ignore the parsed-input cache and re-read every source file")
+    parser.add_argument("--update", action="store_true",
+                        help="Append new hourly data to the existing models instead of retraining")
+    parser.add_argument("--house", type=Path, help="--update: minute-level house CSV with the new rows")
+    parser.add_argument("--solar", type=Path, help="--update: solar CSV with the new rows")
     args = parser.parse_args()
-    run_training(force=args.force)
+    if args.update:
+        run_update(house_path=args.house, solar_path=args.solar)
+    else:
+        run_training(force=args.force, use_input_cache=not args.reparse)
@@ -3,17 +3,26 @@ utils.py — shared helpers used by every other module.
 
 Includes:
   - ConstantPredictor  (sklearn-compatible; used for near-flat fridge load)
-  - price-band logic   (thresholds loaded once from price_meta.pkl)
+  - PriceBandModel     (p33 / p67 thresholds of one tariff)
   - sub-hourly time helpers
   - JSON serialisation
   - 9-scenario recommendation engine
+  - sim-frame enrichment (bands, energy state, scenarios per row)
 """
 from __future__ import annotations
 
+import json
 import logging
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Optional, Tuple
 
 import numpy as np
+import pandas as pd
+
+try:                                    # optional: faster JSON encoding
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
@@ -34,48 +43,98 @@ class ConstantPredictor:
 
 # ══════════════════════════════════════════════════════════════════
 # Price-band logic
-# Module-level variables are set once at startup via set_price_thresholds().
+# One PriceBandModel per tariff / market, passed explicitly to whatever
+# classifies prices — no module-level thresholds, so one process can
+# serve several markets at once.
 # ══════════════════════════════════════════════════════════════════
 
-_P33: float = 0.0
-_P67: float = 0.0
-
-def get_price_band_from_price(price: float) -> str:
-    return get_price_band(price)
-
-
-def get_price_weight_from_price(price: float) -> int:
-    return get_price_weight(price)
-
-def set_price_thresholds(p33: float, p67: float) -> None:
-    """Call once after loading price_meta.pkl."""
-    global _P33, _P67
-    _P33, _P67 = float(p33), float(p67)
-    logger.info(
-        "Price thresholds — LOW < €%.4f  MEDIUM < €%.4f  HIGH ≥ €%.4f",
-        p33, p67, p67,
-    )
-
-
-def get_p33() -> float:
-    return _P33
+# Band codes index into PRICE_BANDS.
+BAND_LOW, BAND_MEDIUM, BAND_HIGH = 0, 1, 2
+PRICE_BANDS = np.array(["LOW", "MEDIUM", "HIGH"], dtype=object)
 
 
-def get_p67() -> float:
-    return _P67
-
-
-def get_price_band(price: float) -> str:
-    if price >= _P67:
-        return "HIGH"
-    if price >= _P33:
-        return "MEDIUM"
-    return "LOW"
-
+@dataclass(frozen=True)
+class PriceBandModel:
+    """
+    p33 / p67 thresholds of one tariff:  LOW < p33 ≤ MEDIUM < p67 ≤ HIGH.
 
-def get_price_weight(price: float) -> int:
-    band = get_price_band(price)
-    return 3 if band == "HIGH" else 2 if band == "MEDIUM" else 1
+    Immutable and hashable — safe to share between request threads,
+    pickle into worker processes and use as (part of) a cache key.
+    """
+    p33:  float
+    p67:  float
+    name: str = "default"
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "p33", float(self.p33))
+        object.__setattr__(self, "p67", float(self.p67))
+
+    @classmethod
+    def from_prices(cls, prices, name: str = "default") -> "PriceBandModel":
+        """Thresholds at the 33rd / 67th percentile of a price series."""
+        s = pd.Series(prices, dtype=float)
+        return cls(s.quantile(0.33), s.quantile(0.67), name)
+
+    @classmethod
+    def from_meta(cls, meta: dict, name: str = "default") -> "PriceBandModel":
+        """From a {p33, p67} dict (artefact-store meta / legacy price_meta.pkl)."""
+        return cls(meta["p33"], meta["p67"], name)
+
+    def meta(self) -> dict:
+        return {"p33": self.p33, "p67": self.p67}
+
+    @property
+    def key(self) -> tuple:
+        """Thresholds only — markets with equal thresholds band identically."""
+        return (self.p33, self.p67)
+
+    # ── Scalar ────────────────────────────────────────────────
+
+    def band(self, price: float) -> str:
+        if price >= self.p67:
+            return "HIGH"
+        if price >= self.p33:
+            return "MEDIUM"
+        return "LOW"
+
+    def weight(self, price: float) -> int:
+        band = self.band(price)
+        return 3 if band == "HIGH" else 2 if band == "MEDIUM" else 1
+
+    # ── Vectorised ────────────────────────────────────────────
+
+    def codes(self, prices) -> np.ndarray:
+        """int8 band code per price (0=LOW, 1=MEDIUM, 2=HIGH; NaN → LOW)."""
+        prices = np.asarray(prices, dtype=float)
+        return np.select(
+            [prices >= self.p67, prices >= self.p33],
+            [BAND_HIGH, BAND_MEDIUM],
+            default=BAND_LOW,
+        ).astype(np.int8)
+
+    def names(self, prices) -> np.ndarray:
+        """Band name per price (object array)."""
+        return PRICE_BANDS[self.codes(prices)]
+
+    def weights(self, prices) -> np.ndarray:
+        """Price weight per price (LOW=1 … HIGH=3)."""
+        return self.codes(prices).astype(np.int64) + 1
+
+
+def price_markets(default: PriceBandModel, spec: str = "") -> dict:
+    """
+    {market: PriceBandModel} — `default` plus the tariffs of a
+    Config.PRICE_MARKETS JSON string ({"pt": {"p33": …, "p67": …}, …}).
+    """
+    markets = {default.name: default}
+    if not spec.strip():
+        return markets
+    try:
+        for name, meta in json.loads(spec).items():
+            markets[name] = PriceBandModel.from_meta(meta, name=name)
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        raise ValueError(f"Invalid PRICE_MARKETS: {exc}") from exc
+    return markets
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -146,15 +205,72 @@ def get_hour_slots_with_weights(start_time, end_time) -> dict:
     return {h: mins / total for h, mins in slots.items()}
 
 
+# Horizons are arrays of slot start times in decimal hours (11.25 = 11:15),
+# one per sim-frame row, at whatever resolution the frame has.
+
+def slot_label(h):
+    """Slot start for payloads: 11 for whole hours, 11.25 otherwise."""
+    h = round(float(h), 4)
+    return int(h) if h.is_integer() else h
+
+
+def format_hhmm(h) -> str:
+    """11.25 → "11:15" (clock time; wraps past midnight)."""
+    m = int(round(float(h) * 60)) % 1440
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def infer_slot_hours(hours) -> float:
+    """Slot length (h) of a horizon's slot starts; 1.0 if it cannot tell."""
+    d = np.diff(np.asarray(hours, dtype=float)) % 24
+    d = d[d > 1e-9]
+    return float(d.min()) if len(d) else 1.0
+
+
+def first_day(values: np.ndarray, slot_hours: float) -> np.ndarray:
+    """values with everything a day or more after the first non-zero slot zeroed."""
+    nz = np.flatnonzero(values)
+    if len(nz):
+        values[nz[0] + int(round(24 / slot_hours)):] = 0
+    return values
+
+
+def get_slot_weights(start_time, end_time, hours, slot_hours: float = 1.0) -> np.ndarray:
+    """
+    get_hour_slots_with_weights() for the slots of a horizon, minute-exact:
+    the share of [start_time, end_time) inside each slot [h, h + slot_hours),
+    relative to the whole window.  An end at or before the start in the same
+    hour means that full hour; an end earlier on the clock runs past midnight.
+    Only the first day on which the window occurs counts.
+    Example (hourly): "11:30" → "13:45" over 11, 12, 13 → 0.22, 0.44, 0.33
+    """
+    s = time_to_decimal(start_time)
+    e = time_to_decimal(end_time)
+    if e <= s and int(e) == int(s):
+        s, e = float(int(s)), float(int(s) + 1)
+    elif e <= s:
+        e += 24
+
+    lo = np.asarray(hours, dtype=float) % 24
+    hi = lo + slot_hours
+    ov = (np.clip(np.minimum(hi, e) - np.maximum(lo, s), 0, None)
+          + np.clip(np.minimum(hi, e - 24) - np.maximum(lo, s - 24), 0, None))
+    return first_day(ov, slot_hours) / (e - s)
+
+
 # ══════════════════════════════════════════════════════════════════
 # JSON serialisation
 # ══════════════════════════════════════════════════════════════════
 
+# Solver internals kept in schedule dicts but never sent to clients
+_PRIVATE_KEYS = {"lp_results_raw", "lp_model"}
+
+
 def make_serializable(obj):
-    """Recursively convert numpy types and strip lp_results_raw."""
+    """Recursively convert numpy types and strip lp_results_raw / lp_model."""
     if isinstance(obj, dict):
         return {k: make_serializable(v) for k, v in obj.items()
-                if k != "lp_results_raw"}
+                if k not in _PRIVATE_KEYS}
     if isinstance(obj, list):
         return [make_serializable(i) for i in obj]
     if isinstance(obj, np.integer):   return int(obj)
@@ -164,6 +280,34 @@ def make_serializable(obj):
     return obj
 
 
+class _NumpyJSONEncoder(json.JSONEncoder):
+    """Converts numpy values as the encoder meets them (no pre-walk)."""
+
+    def default(self, o):
+        if isinstance(o, np.integer):   return int(o)
+        if isinstance(o, np.floating):  return float(o)
+        if isinstance(o, np.ndarray):   return o.tolist()
+        if isinstance(o, np.bool_):     return bool(o)
+        return super().default(o)
+
+
+_ENCODER = _NumpyJSONEncoder(separators=(",", ":"))
+
+
+def dumps_json(obj) -> bytes:
+    """
+    JSON bytes of a response body in a single encoder pass — the
+    make_serializable conversions without copying the structure first.
+    Private keys are dropped at the top level, the only place they occur.
+    Uses orjson when installed.
+    """
+    if isinstance(obj, dict) and not _PRIVATE_KEYS.isdisjoint(obj):
+        obj = {k: v for k, v in obj.items() if k not in _PRIVATE_KEYS}
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return _ENCODER.encode(obj).encode()
+
+
 # ══════════════════════════════════════════════════════════════════
 # Energy-state helper
 # ══════════════════════════════════════════════════════════════════
@@ -175,6 +319,21 @@ def get_energy_state(net: float) -> str:
     return "BALANCED"
 
 
+# Vectorised form: int8 state codes index into ENERGY_STATES.
+STATE_SURPLUS, STATE_DEFICIT, STATE_BALANCED = 0, 1, 2
+ENERGY_STATES = np.array(["SURPLUS", "DEFICIT", "BALANCED"], dtype=object)
+
+
+def get_energy_state_codes(net) -> np.ndarray:
+    """Array version of get_energy_state() → int8 codes (NaN → BALANCED)."""
+    net = np.asarray(net, dtype=float)
+    return np.select(
+        [net > 0.1, net < -0.1],
+        [STATE_SURPLUS, STATE_DEFICIT],
+        default=STATE_BALANCED,
+    ).astype(np.int8)
+
+
 # ══════════════════════════════════════════════════════════════════
 # 9-scenario recommendation engine
 # ══════════════════════════════════════════════════════════════════
@@ -197,3 +356,111 @@ def get_recommendation(energy_state: str, price_band: str) -> Tuple[str, str]:
         (energy_state, price_band),
         ("UNKNOWN", "🔍 Monitoring…"),
     )
+
+
+# Vectorised lookup: _SCENARIO_CODES[state_code, band_code] → index into
+# SCENARIO_NAMES / SCENARIO_TEXTS (same order as _SCENARIOS).
+SCENARIO_NAMES = [name for name, _ in _SCENARIOS.values()]
+SCENARIO_TEXTS = [text for _, text in _SCENARIOS.values()]
+_SCENARIO_CODES = np.zeros((len(ENERGY_STATES), len(PRICE_BANDS)), dtype=np.int8)
+for _i, (_state, _band) in enumerate(_SCENARIOS):
+    _SCENARIO_CODES[
+        ENERGY_STATES.tolist().index(_state), PRICE_BANDS.tolist().index(_band)
+    ] = _i
+
+
+def get_scenario_codes(state_codes, band_codes) -> np.ndarray:
+    """Array version of get_recommendation() → scenario index per row."""
+    return _SCENARIO_CODES[np.asarray(state_codes), np.asarray(band_codes)]
+
+
+# ══════════════════════════════════════════════════════════════════
+# Sim-frame enrichment — shared by train_models and forecast
+# ══════════════════════════════════════════════════════════════════
+
+def enrich_sim_frame(
+    sim: pd.DataFrame,
+    df_fac: pd.DataFrame,
+    bands: PriceBandModel,
+    prev_price: Optional[float] = None,
+    slot_hours: float = 1.0,
+) -> pd.DataFrame:
+    """
+    Time, price, energy-balance and recommendation columns derived from
+    the prediction columns, banded with `bands`.  prev_price seeds the
+    forward fill when sim is a block appended to an existing frame.
+    Energy states compare net energy per hour, so rows of slot_hours < 1
+    classify like the hour they belong to would.
+
+    Fully vectorised: bands / states / scenarios are int8 codes turned
+    into categoricals, so a multi-year frame holds one small code per row
+    instead of repeated strings.
+    """
+    # ── Time features ─────────────────────────────────────────
+    ts = pd.to_datetime(sim["timestamp"])
+    sim["hour"]      = ts.dt.hour
+    sim["dayofweek"] = ts.dt.dayofweek
+    sim["month"]     = ts.dt.month
+
+    # ── PVPC price (mapped from real timestamps) ──────────────
+    price_map             = df_fac.set_index("timestamp")["price_facturacion"]
+    sim["price_eur_kwh"]  = sim["timestamp"].map(price_map).ffill()
+    if prev_price is not None:
+        sim["price_eur_kwh"] = sim["price_eur_kwh"].fillna(prev_price)
+    band                  = bands.codes(sim["price_eur_kwh"])
+    sim["price_band"]     = pd.Categorical.from_codes(band, categories=PRICE_BANDS)
+    sim["price_weight"]   = band.astype(np.int64) + 1          # LOW=1 … HIGH=3
+
+    # ── Energy balance ────────────────────────────────────────
+    sim["net_energy_kwh"]   = sim["predicted_solar_kwh"] - sim["predicted_consumption_kwh"]
+    state                   = get_energy_state_codes(sim["net_energy_kwh"] / slot_hours)
+    sim["energy_state"]     = pd.Categorical.from_codes(state, categories=ENERGY_STATES)
+    sim["opportunity_score"]= sim["predicted_solar_kwh"] * sim["price_weight"]
+
+    # ── 9-scenario matrix (categoricals, one code per row) ────
+    scen = get_scenario_codes(state, band)
+    sim["scenario"]       = pd.Categorical.from_codes(scen, categories=SCENARIO_NAMES)
+    sim["recommendation"] = pd.Categorical.from_codes(scen, categories=SCENARIO_TEXTS)
+
+    sim["is_golden_window"] = (state == STATE_SURPLUS) & (band == BAND_HIGH)
+    sim["is_danger_window"] = (state == STATE_DEFICIT) & (band == BAND_HIGH)
+    return sim
+
+
+def resample_sim_frame(
+    sim:          pd.DataFrame,
+    slot_minutes: int,
+    bands:        PriceBandModel,
+    df_fac:       Optional[pd.DataFrame] = None,
+) -> pd.DataFrame:
+    """
+    An hourly sim frame at slot_minutes resolution (a divisor of 60).
+
+    Every hour becomes 60 / slot_minutes rows with its energy columns
+    (*_kwh) split evenly.  A slot is priced from df_fac where df_fac has
+    its timestamp (e.g. a PT15M day-ahead feed) and at its hour's price
+    otherwise; the derived columns are recomputed by enrich_sim_frame.
+    A frame already at that resolution is returned as is.
+    """
+    if slot_minutes <= 0 or 60 % slot_minutes:
+        raise ValueError(f"slot_minutes must divide 60, got {slot_minutes}")
+    ts      = pd.to_datetime(sim["timestamp"])
+    current = (int(round(ts.diff().median() / pd.Timedelta(minutes=1)))
+               if len(ts) > 1 else 60)
+    if current == slot_minutes:
+        return sim
+    if current != 60:
+        raise ValueError(f"Only hourly frames can be resampled (this one is {current} min)")
+
+    k    = 60 // slot_minutes
+    kwh  = [c for c in sim.columns if c.endswith("_kwh") and c != "net_energy_kwh"]
+    out  = pd.DataFrame({c: np.repeat(sim[c].to_numpy(dtype=float) / k, k) for c in kwh})
+    step = np.timedelta64(slot_minutes, "m")
+    out.insert(0, "timestamp",
+               np.repeat(ts.to_numpy(), k) + np.tile(np.arange(k) * step, len(sim)))
+
+    prices = pd.DataFrame({"timestamp": ts.to_numpy(), "price_facturacion": sim["price_eur_kwh"].to_numpy()})
+    if df_fac is not None:
+        prices = (pd.concat([prices, df_fac[["timestamp", "price_facturacion"]]])
+                  .drop_duplicates("timestamp", keep="last"))
+    return enrich_sim_frame(out, prices, bands, slot_hours=slot_minutes / 60)